@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+ContextCacheManager 基准
+
+1. 满缓存下的 put 吞吐：对比每次驱逐都排序所有低优先级项的旧实现与按优先级
+   LRU 队列 O(1) 驱逐。
+2. 命中率：按 memory.load 的访问方式（get 未命中则 put）回放查询序列，对比
+   "lru" 与 "tinylfu" 策略。``--replay`` 读取查询日志（每行一个 JSON 对象，取
+   query 或 params.query 字段；非 JSON 行整行作为查询），否则使用 Zipf 分布的
+   热点查询混合一次性查询的合成序列。
+
+用法:
+    python benchmarks/bench_cache.py [--size 100000] [--ops 20000]
+    python benchmarks/bench_cache.py --replay queries.jsonl [--cache-size 100]
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from solo_mcp.tools.memory import ContextCacheManager, Priority
+
+
+class SortedEvictionCache(ContextCacheManager):
+    """旧的驱逐策略：收集并排序所有低优先级项，只驱逐第一个"""
+
+    def _candidates(self, new_priority: Priority) -> List[str]:
+        candidates = []
+        for priority in Priority:
+            if priority.value >= new_priority.value:
+                break
+            items = list(self.priority_index[priority].items())
+            items.sort(key=lambda x: (x[1].last_accessed, x[1].access_count))
+            candidates.extend(key for key, _ in items)
+        return candidates
+
+    def _evict_one(self, new_priority: Priority) -> int:
+        candidates = self._candidates(new_priority)
+        if not candidates:
+            return -1
+        item = self.cache[candidates[0]]
+        self._remove_item(item.key)
+        self.stats["evictions"] += 1
+        return item.size
+
+
+def fill(cache: ContextCacheManager, size: int, rng: random.Random) -> None:
+    """用低/中优先级项填满缓存"""
+    for i in range(size):
+        cache.put(f"seed{i}", f"value {i}", rng.choice([Priority.LOW, Priority.MEDIUM]))
+
+
+def bench(label: str, cache: ContextCacheManager, ops: int, seed: int) -> float:
+    rng = random.Random(seed)
+    priorities = [Priority.MEDIUM, Priority.HIGH, Priority.CRITICAL]
+    start = time.perf_counter()
+    for i in range(ops):
+        cache.put(f"key{i}", f"value {i}", rng.choice(priorities))
+        if i % 4 == 0:
+            cache.get(f"seed{rng.randrange(ops)}")
+    elapsed = time.perf_counter() - start
+    rate = ops / elapsed
+    print(f"  {label:<24} {rate:12.0f} puts/s  ({cache.stats['evictions']} evictions)")
+    return rate
+
+
+def load_queries(path: Path) -> List[str]:
+    queries = []
+    for line in path.read_text(encoding="utf-8").splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            entry = json.loads(line)
+        except ValueError:
+            queries.append(line)
+            continue
+        if isinstance(entry, dict):
+            query = entry.get("query") or (entry.get("params") or {}).get("query")
+            if query:
+                queries.append(str(query))
+    return queries
+
+
+def synthetic_queries(n: int, seed: int) -> List[str]:
+    """60% 来自 Zipf 分布的 5000 个热点查询，40% 为一次性查询"""
+    rng = random.Random(seed)
+    vocab = [f"q{i}" for i in range(5000)]
+    weights = [1.0 / (i + 1) for i in range(len(vocab))]
+    hot = iter(rng.choices(vocab, weights=weights, k=n))
+    return [next(hot) if rng.random() < 0.6 else f"once{i}" for i in range(n)]
+
+
+def replay(queries: List[str], cache_size: int) -> None:
+    print(f"Hit rate over {len(queries)} queries (cache size {cache_size}):")
+    for policy in ContextCacheManager.POLICIES:
+        cache = ContextCacheManager(max_size=cache_size, policy=policy)
+        start = time.perf_counter()
+        for query in queries:
+            if cache.get(query) is None:
+                cache.put(query, [query], Priority.HIGH, ttl_hours=1)
+        elapsed = (time.perf_counter() - start) / len(queries) * 1e6
+        stats = cache.get_stats()
+        print(
+            f"  {policy:<24} {stats['hit_rate']:8.2%}  ({elapsed:.1f} us/query)"
+        )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--ops", type=int, default=20000)
+    parser.add_argument("--legacy-ops", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--replay", type=Path)
+    parser.add_argument("--queries", type=int, default=200000)
+    parser.add_argument("--cache-size", type=int, default=100)
+    args = parser.parse_args()
+
+    if args.replay:
+        replay(load_queries(args.replay), args.cache_size)
+        return
+
+    print(f"Full cache of {args.size} entries:")
+    rates = []
+    for label, cls, ops in (
+        ("sorted candidates", SortedEvictionCache, args.legacy_ops),
+        ("per-priority LRU", ContextCacheManager, args.ops),
+    ):
+        cache = cls(max_size=args.size, max_memory_mb=1024)
+        fill(cache, args.size, random.Random(args.seed))
+        rates.append(bench(label, cache, ops, args.seed))
+    print(f"  speedup                  {rates[1] / max(rates[0], 1e-9):12.1f}x")
+    print()
+    replay(synthetic_queries(args.queries, args.seed), args.cache_size)
+
+
+if __name__ == "__main__":
+    main()
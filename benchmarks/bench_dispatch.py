@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+SoloServer.handle 分发开销基准：if 链 + json.dumps 计量 vs. 注册表 + 单一计量包装
+
+两种分发都调用同一个注册在表末尾的空操作工具（返回一个类似 index.search 的
+结果），统计每次调用相对直接调用处理函数多出的开销。默认关闭事件日志以隔离
+分发本身的开销，``--with-log`` 打开。
+
+用法:
+    python benchmarks/bench_dispatch.py [--calls 20000] [--hits 10] [--content-kb 0] [--with-log]
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Any
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from solo_mcp.config import SoloConfig
+from solo_mcp.server import SoloServer, ToolSpec
+
+LEGACY_CHAIN = [
+    "fs.read",
+    "fs.write",
+    "fs.list",
+    "memory.store",
+    "memory.load",
+    "memory.summarize",
+    "index.build",
+    "index.search",
+    "index.stats",
+    "context.collect",
+    "roles.evaluate",
+    "orchestrator.run_round",
+    "proc.exec",
+    "credits.get",
+    "credits.add",
+]
+
+
+class LegacyDispatchServer(SoloServer):
+    """旧的分发方式：逐个比较工具名，结果用 json.dumps 计量大小"""
+
+    async def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        tool = request.get("tool")
+        params = request.get("params", {})
+        if tool not in {"credits.get", "credits.add", "bench.noop"}:
+            if not self.credits.consume(1):
+                return {"error": "INSUFFICIENT_CREDITS"}
+        start = time.perf_counter()
+        try:
+            for name in LEGACY_CHAIN:
+                if tool == name:
+                    break
+            if tool == "bench.noop":
+                res = self.tools[tool].handler(params)
+                ret = {"result": res}
+                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(res, ensure_ascii=False)), None)
+                return ret
+        except Exception as e:
+            self._log_event(tool or "", params, start, time.perf_counter(), False, 0, str(e))
+            return {"error": str(e)}
+        return {"error": f"Unknown tool: {tool}"}
+
+
+def make_result(hits: int, content_kb: int) -> dict[str, Any]:
+    return {
+        "ok": True,
+        "content": "x = compute(value)\n" * (content_kb * 1024 // 19),
+        "hits": [
+            {
+                "path": f"solo_mcp/tools/module_{i}.py",
+                "score": 12.5 - i * 0.25,
+                "preview": "def handler(params):\n    return search(params['query'])\n" * 4,
+                "line": 40 + i,
+            }
+            for i in range(hits)
+        ],
+    }
+
+
+def prepare(server: SoloServer, result: dict[str, Any], with_log: bool) -> None:
+    server.tools["bench.noop"] = ToolSpec(lambda p: result, free=True)
+    server.credits.add(10**9)
+    if not with_log:
+        server._log_event = lambda *args, **kwargs: None
+
+
+async def time_calls(server: SoloServer, calls: int) -> float:
+    request = {"tool": "bench.noop", "params": {"query": "handler", "k": 10}}
+    handle = server.handle
+    start = time.perf_counter()
+    for _ in range(calls):
+        await handle(request)
+    return (time.perf_counter() - start) / calls
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SoloServer dispatch benchmark")
+    parser.add_argument("--calls", type=int, default=20000)
+    parser.add_argument("--hits", type=int, default=10, help="结果中的命中条数")
+    parser.add_argument(
+        "--content-kb", type=int, default=0, help="结果中附带的正文大小（KB），模拟 fs.read/context.collect"
+    )
+    parser.add_argument("--with-log", action="store_true", help="保留事件日志写入")
+    args = parser.parse_args()
+
+    result = make_result(args.hits, args.content_kb)
+    with tempfile.TemporaryDirectory() as tmp:
+        config = SoloConfig.load(Path(tmp))
+        legacy = LegacyDispatchServer(config)
+        registry = SoloServer(config)
+        prepare(legacy, result, args.with_log)
+        prepare(registry, result, args.with_log)
+
+        handler = registry.tools["bench.noop"].handler
+        start = time.perf_counter()
+        for _ in range(args.calls):
+            handler({})
+        direct = (time.perf_counter() - start) / args.calls
+
+        legacy_t = asyncio.run(time_calls(legacy, args.calls))
+        registry_t = asyncio.run(time_calls(registry, args.calls))
+        legacy.memory.close()
+        registry.memory.close()
+
+    print(f"calls={args.calls} hits={args.hits} content={args.content_kb}KB log={'on' if args.with_log else 'off'}")
+    print(f"  direct call:          {direct * 1e6:8.2f} us")
+    print(f"  if-chain + json.dumps: {(legacy_t - direct) * 1e6:8.2f} us/call overhead")
+    print(f"  registry + walker:     {(registry_t - direct) * 1e6:8.2f} us/call overhead")
+
+
+if __name__ == "__main__":
+    main()
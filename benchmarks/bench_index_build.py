@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+IndexTool 全量构建基准：不同 worker 数量下的扩展性（线程池 / 进程池）
+
+用法:
+    python benchmarks/bench_index_build.py [--files 5000] [--root PATH]
+
+未指定 --root 时在临时目录中生成合成源码树。
+"""
+
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from solo_mcp.config import SoloConfig
+from solo_mcp.tools.index import IndexTool
+
+
+def make_tree(root: Path, n_files: int, seed: int) -> None:
+    rng = random.Random(seed)
+    vocab = [f"ident{i}" for i in range(5000)] + ["def", "return", "self", "import"]
+    for i in range(n_files):
+        p = root / f"pkg{i % 50}" / f"mod{i}.py"
+        p.parent.mkdir(parents=True, exist_ok=True)
+        lines = [
+            " ".join(rng.choice(vocab) for _ in range(rng.randint(4, 12)))
+            for _ in range(rng.randint(20, 200))
+        ]
+        p.write_text("\n".join(lines), encoding="utf-8")
+
+
+def worker_counts() -> list[int]:
+    cpus = os.cpu_count() or 1
+    counts = [1]
+    while counts[-1] * 2 <= cpus:
+        counts.append(counts[-1] * 2)
+    if counts[-1] != cpus:
+        counts.append(cpus)
+    return counts
+
+
+def run(root: Path, workers: int, use_processes: bool) -> tuple[float, int]:
+    tool = IndexTool(
+        SoloConfig.load(root=root), workers=workers, use_processes=use_processes
+    )
+    start = time.perf_counter()
+    res = asyncio.run(tool.build(full=True))
+    elapsed = time.perf_counter() - start
+    tool.close()
+    return elapsed, res["docs"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--root")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(args.root).resolve() if args.root else Path(tmp)
+        if not args.root:
+            print(f"Generating {args.files} files under {root}")
+            make_tree(root, args.files, args.seed)
+
+        for label, use_processes in (("threads", False), ("processes", True)):
+            print(f"Full build with {label}:")
+            baseline = None
+            for workers in worker_counts():
+                elapsed, docs = run(root, workers, use_processes)
+                baseline = baseline or elapsed
+                print(
+                    f"  workers={workers:<3} {elapsed:7.2f} s  "
+                    f"{docs / elapsed:9.0f} docs/s  "
+                    f"speedup {baseline / elapsed:5.2f}x"
+                )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+IndexTool 检索基准：全量打分排序 vs. MaxScore top-k
+
+用法:
+    python benchmarks/bench_index_search.py [--docs 40000] [--k 10]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+# 添加项目根目录到 Python 路径
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from solo_mcp.tools.index import _BM25Lite
+
+
+def make_corpus(n_docs: int, vocab_size: int, seed: int) -> list[list[str]]:
+    """按 Zipf 分布生成合成语料，近似源码仓库的词频分布"""
+    rng = random.Random(seed)
+    vocab = [f"w{i}" for i in range(vocab_size)]
+    weights = [1.0 / (i + 1) for i in range(vocab_size)]
+    return [
+        rng.choices(vocab, weights=weights, k=rng.randint(50, 400))
+        for _ in range(n_docs)
+    ]
+
+
+def make_queries(n: int, vocab_size: int, seed: int) -> list[list[str]]:
+    """每个查询包含一个高频词（如 self/def）和若干中低频标识符"""
+    rng = random.Random(seed + 1)
+    return [
+        [f"w{rng.randint(0, 20)}"]
+        + [f"w{rng.randint(50, vocab_size // 4)}" for _ in range(rng.randint(1, 3))]
+        for _ in range(n)
+    ]
+
+
+def bench(label: str, fn, queries: list[list[str]]) -> float:
+    start = time.perf_counter()
+    for q in queries:
+        fn(q)
+    elapsed = (time.perf_counter() - start) / len(queries) * 1000.0
+    print(f"  {label:<24} {elapsed:8.2f} ms/query")
+    return elapsed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=40000)
+    parser.add_argument("--vocab", type=int, default=20000)
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    print(f"Building corpus: {args.docs} docs, vocab {args.vocab}")
+    corpus = make_corpus(args.docs, args.vocab, args.seed)
+    start = time.perf_counter()
+    bm25 = _BM25Lite(corpus)
+    print(f"  index build              {time.perf_counter() - start:8.2f} s")
+    queries = make_queries(args.queries, args.vocab, args.seed)
+
+    k = args.k
+
+    def exhaustive(q):
+        scores = bm25.score(q)
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+
+    print(f"Query latency (k={k}):")
+    full = bench("score + full sort", exhaustive, queries)
+    topk = bench("MaxScore top-k", lambda q: bm25.top_k(q, k), queries)
+    print(f"  speedup                  {full / max(topk, 1e-9):8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
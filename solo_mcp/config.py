@@ -11,6 +11,8 @@ class SoloConfig:
     enable_vector_search: bool = False
     model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
     max_context_tokens: int = 8000
+    # shim stdio server: requests handled concurrently
+    max_concurrent_requests: int = 8
     # simple credit counter
     credits_path: Path | None = None
 
@@ -0,0 +1,222 @@
+"""
+工具请求分发
+
+``ToolDispatcher`` 按工具名查注册表（``ToolSpec``）执行处理函数，统一负责积分扣除、
+必填参数校验、计时和事件记录；``SoloServer`` 在此之上注册具体工具。``serve``
+从 stdin 逐行读取请求并发处理（shim 服务器）。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import time
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from .tools.credits import CreditsManager
+from .utils.size_utils import result_size
+
+
+@dataclass(frozen=True)
+class ToolSpec:
+    """注册表中的一个工具：处理函数、必填参数、是否异步、是否免积分"""
+
+    handler: Callable[[dict[str, Any]], Any]
+    required: tuple[str, ...] = ()
+    is_async: bool = False
+    free: bool = False
+
+
+class ToolDispatcher:
+    """注册表驱动的请求分发：每个工具只执行一次，由同一个包装负责计时与记录
+
+    Args:
+        tools: 工具名 -> ToolSpec
+        credits: 积分管理器，非免费工具每次调用扣 1 分
+    """
+
+    def __init__(self, tools: dict[str, ToolSpec], credits: CreditsManager):
+        self.tools = tools
+        self.credits = credits
+
+    def _log_event(
+        self,
+        tool: str,
+        params: dict[str, Any],
+        start: float,
+        end: float,
+        ok: bool,
+        result_size: int,
+        error: str | None,
+    ) -> None:
+        """记录一次调用（默认不记录，由子类实现）"""
+
+    def _cost(self, request: dict[str, Any]) -> int:
+        spec = self.tools.get(request.get("tool"))
+        return 0 if spec is not None and spec.free else 1
+
+    async def handle(self, request: dict[str, Any]) -> dict[str, Any]:
+        # credit check (lightweight)
+        if not self.credits.consume(self._cost(request)):
+            return {"error": "INSUFFICIENT_CREDITS"}
+        return await self._dispatch(request)
+
+    async def handle_batch(self, requests: list[Any]) -> list[dict[str, Any]]:
+        """处理批量请求：积分按整批一次扣除，各请求并发执行，按原顺序返回
+
+        每个请求都有对应的响应；只有显式的 JSON-RPC 通知（带 ``jsonrpc``
+        但没有 ``id``）照常执行但不返回响应，全部是通知时返回空列表。
+        非对象的元素返回 INVALID_REQUEST；积分不足时整批都不执行，各请求
+        返回 INSUFFICIENT_CREDITS。
+        """
+        valid = [r for r in requests if isinstance(r, dict)]
+        if not self.credits.consume(sum(self._cost(r) for r in valid)):
+            results = iter([{"error": "INSUFFICIENT_CREDITS"}] * len(valid))
+        else:
+            results = iter(await asyncio.gather(*(self._dispatch(r) for r in valid)))
+        out: list[dict[str, Any]] = []
+        for request in requests:
+            if not isinstance(request, dict):
+                out.append({"error": "INVALID_REQUEST"})
+                continue
+            response = next(results)
+            if not is_notification(request):
+                out.append(with_request_id(request, response))
+        return out
+
+    async def _dispatch(self, request: dict[str, Any]) -> dict[str, Any]:
+        tool = request.get("tool")
+        params = request.get("params") or {}
+        spec = self.tools.get(tool)
+        start = time.perf_counter()
+        if spec is None:
+            self._log_event(
+                tool or "", params, start, time.perf_counter(), False, 0, "Unknown tool"
+            )
+            return {"error": f"Unknown tool: {tool}"}
+        try:
+            for name in spec.required:
+                if name not in params:
+                    raise ValueError(f"Missing required parameter: {name}")
+            res = spec.handler(params)
+            if spec.is_async:
+                res = await res
+        except Exception as e:
+            self._log_event(tool, params, start, time.perf_counter(), False, 0, str(e))
+            return {"error": str(e)}
+        self._log_event(
+            tool, params, start, time.perf_counter(), True, result_size(res), None
+        )
+        return {"result": res}
+
+
+# 单行请求的最大字节数（StreamReader 的缓冲上限）
+MAX_REQUEST_BYTES = 16 * 1024 * 1024
+# 保持 stdin 泵任务的引用，避免被回收
+_stdin_tasks: set[asyncio.Task] = set()
+
+
+async def open_stdin_reader() -> asyncio.StreamReader:
+    """以 StreamReader 读取 stdin
+
+    事件循环不支持管道时（如 Windows 控制台）改用线程喂数据。
+    """
+    loop = asyncio.get_running_loop()
+    reader = asyncio.StreamReader(limit=MAX_REQUEST_BYTES)
+    try:
+        await loop.connect_read_pipe(
+            lambda: asyncio.StreamReaderProtocol(reader), sys.stdin
+        )
+    except (NotImplementedError, OSError, ValueError):
+
+        async def pump() -> None:
+            stdin = sys.stdin.buffer
+            while True:
+                chunk = await loop.run_in_executor(None, stdin.readline)
+                if not chunk:
+                    reader.feed_eof()
+                    return
+                reader.feed_data(chunk)
+
+        task = loop.create_task(pump())
+        _stdin_tasks.add(task)
+        task.add_done_callback(_stdin_tasks.discard)
+    return reader
+
+
+def is_notification(request: dict[str, Any]) -> bool:
+    """JSON-RPC 通知：声明了 ``jsonrpc`` 且没有 ``id``（普通请求不要求 id）"""
+    return "jsonrpc" in request and "id" not in request
+
+
+def with_request_id(
+    request: dict[str, Any], response: dict[str, Any]
+) -> dict[str, Any]:
+    """响应带上请求的 id（若有），便于客户端匹配乱序返回的响应"""
+    if "id" in request:
+        return {"id": request["id"], **response}
+    return response
+
+
+def write_response(response: Any) -> None:
+    sys.stdout.write(json.dumps(response, ensure_ascii=False) + "\n")
+    sys.stdout.flush()
+
+
+async def serve(
+    server: ToolDispatcher,
+    reader: asyncio.StreamReader,
+    write: Callable[[Any], None] = write_response,
+    max_concurrency: int = 8,
+) -> None:
+    """逐行读取请求，每个请求作为独立任务并发处理，完成即写回
+
+    响应带上请求的 ``id``（JSON-RPC 风格），因此可以乱序返回；同时处理的
+    请求数达到 ``max_concurrency`` 时暂停读取。一行也可以是请求数组（批量），
+    整批占一个并发名额，返回一个响应数组（全是 JSON-RPC 通知时不返回）。读到 EOF 后
+    等待在途请求完成。
+    """
+    semaphore = asyncio.Semaphore(max_concurrency)
+    pending: set[asyncio.Task] = set()
+
+    async def run(request: dict[str, Any] | list[Any]) -> None:
+        try:
+            if isinstance(request, list):
+                resp: Any = await server.handle_batch(request)
+            else:
+                resp = with_request_id(request, await server.handle(request))
+        except Exception as e:
+            resp = {"error": str(e)}
+        finally:
+            semaphore.release()
+        if resp != []:
+            write(resp)
+
+    while True:
+        try:
+            line = await reader.readline()
+        except ValueError:
+            # 单行超过 MAX_REQUEST_BYTES，超出部分已被丢弃
+            write({"error": "REQUEST_TOO_LARGE"})
+            continue
+        if not line:
+            break
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            request = json.loads(line)
+        except Exception:
+            write({"error": "INVALID_JSON"})
+            continue
+        if not isinstance(request, (dict, list)) or request == []:
+            write({"error": "INVALID_REQUEST"})
+            continue
+        await semaphore.acquire()
+        task = asyncio.create_task(run(request))
+        pending.add(task)
+        task.add_done_callback(pending.discard)
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
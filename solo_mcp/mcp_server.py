@@ -14,8 +14,10 @@ import asyncio
 import json
 import logging
 import sys
+import threading
+from contextlib import asynccontextmanager
 from pathlib import Path
-from typing import Any, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Optional
 
 from mcp.server.fastmcp import FastMCP
 from mcp.types import TextContent, Tool, Resource, Prompt
@@ -46,14 +48,47 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# 创建 FastMCP 实例
-mcp = FastMCP("Solo MCP Server", dependencies=["sentence-transformers", "requests"])
+# 进程内唯一的 SoloServer：记忆、学习状态和 BM25 索引在所有工具调用间共享
+_solo_server: Optional[SoloServer] = None
+_solo_server_lock = threading.Lock()
+
+
+def get_solo_server() -> SoloServer:
+    """获取进程内共享的 SoloServer 实例（首次调用时创建，使用项目根目录）"""
+    global _solo_server
+    server = _solo_server
+    if server is None:
+        with _solo_server_lock:
+            if _solo_server is None:
+                config = SoloConfig.load(enable_vector=True)  # 启用向量搜索
+                _solo_server = SoloServer(config)
+            server = _solo_server
+    return server
+
+
+@asynccontextmanager
+async def lifespan(app: FastMCP) -> AsyncIterator[SoloServer]:
+    """服务器生命周期：启动时创建共享实例和后台任务，退出时关闭并落盘"""
+    global _solo_server
+    server = get_solo_server()
+    await server.start()
+    logger.info("Solo server initialized (root=%s)", server.config.root)
+    try:
+        yield server
+    finally:
+        await server.aclose()
+        with _solo_server_lock:
+            if _solo_server is server:
+                _solo_server = None
+        logger.info("Solo server shut down")
 
 
-def get_solo_server():
-    """获取 SoloServer 实例，使用项目根目录"""
-    config = SoloConfig.load(enable_vector=True)  # 启用向量搜索
-    return SoloServer(config)
+# 创建 FastMCP 实例
+mcp = FastMCP(
+    "Solo MCP Server",
+    dependencies=["sentence-transformers", "requests"],
+    lifespan=lifespan,
+)
 
 
 # =============================================================================
@@ -184,36 +219,49 @@ async def memory_summarize(key: str) -> str:
 
 
 @mcp.tool()
-async def index_build() -> str:
+async def index_build(full: bool = False) -> str:
     """
     构建项目文件的搜索索引（BM25 + 可选向量搜索）
 
+    Args:
+        full: 是否强制全量重建（默认仅增量更新变更文件）
+
     Returns:
         索引构建结果
     """
     try:
         server = get_solo_server()
-        result = await server.index.build()
-        return f"Successfully built index with {result['docs']} documents"
+        result = await server.index.build(full=full)
+        if result.get("incremental"):
+            return (
+                f"Index updated: {result['docs']} documents "
+                f"(+{result['added']} ~{result['updated']} -{result['removed']}), "
+                f"{result['memory_mb']} MB in memory"
+            )
+        return (
+            f"Successfully built index with {result['docs']} documents, "
+            f"{result['memory_mb']} MB in memory"
+        )
     except Exception as e:
         return f"Error building index: {str(e)}"
 
 
 @mcp.tool()
-async def index_search(query: str, k: int = 10) -> str:
+async def index_search(query: str, k: int = 10, mode: str = "bm25") -> str:
     """
     搜索项目文件内容
 
     Args:
         query: 搜索查询
         k: 返回结果数量
+        mode: 检索方式，"bm25"（关键词）或 "vector"（向量相似度）
 
     Returns:
         搜索结果
     """
     try:
         server = get_solo_server()
-        result = await server.index.search(query, k=k)
+        result = await server.index.search(query, k=k, mode=mode)
 
         if not result.get("hits"):
             return f"No results found for query: '{query}'"
@@ -383,7 +431,7 @@ async def credits_add(amount: int) -> str:
 async def get_project_config() -> str:
     """获取项目配置信息"""
     try:
-        config = SoloConfig.load()
+        config = get_solo_server().config
         return f"""Project Configuration:
 Root: {config.root}
 AI Memory: {config.ai_memory_dir}
@@ -1,12 +1,14 @@
 from __future__ import annotations
 
 import asyncio
+import contextlib
 import json
+import time
 from pathlib import Path
 from typing import Any
-import time
 
 from .config import SoloConfig
+from .dispatch import ToolDispatcher, ToolSpec, open_stdin_reader, serve
 from .tools.credits import CreditsManager
 from .tools.fs import FsTool
 from .tools.index import IndexTool
@@ -15,26 +17,43 @@ from .tools.context import ContextTool
 from .tools.roles import RolesTool
 from .tools.orchestrator import OrchestratorTool
 from .tools.proc import ProcTool
+from .utils.event_log import EventLog
 
-# Placeholder MCP server shim to expose tools as functions callable via MCP.
-# To keep the codebase minimal and stable, we implement a lightweight async RPC loop
-# and leave official MCP server integration as a thin layer to be expanded later.
 
-
-class SoloServer:
+class SoloServer(ToolDispatcher):
     def __init__(self, config: SoloConfig):
         self.config = config
         self.credits = CreditsManager(config)
         self.fs = FsTool(config)
         self.memory = MemoryTool(config)
         self.index = IndexTool(config)
-        self.context = ContextTool(config)
+        self.context = ContextTool(config, index=self.index)
         self.roles = RolesTool(config)
         self.orchestrator = OrchestratorTool(config)
         self.proc = ProcTool(config)
+        ToolDispatcher.__init__(self, self._build_registry(), self.credits)
         self.logs_dir = self.config.ai_memory_dir / "logs"
         self.logs_dir.mkdir(exist_ok=True)
         self.events_path = self.logs_dir / "events.jsonl"
+        # telemetry is buffered and written by a background thread
+        self.events = EventLog(self.events_path)
+
+    async def start(self) -> None:
+        """启动后台任务（缓存与记忆的过期推进），需在事件循环中调用"""
+        self.memory.start_expiry()
+
+    async def aclose(self) -> None:
+        """停止后台任务并落盘记忆、索引
+
+        每项资源都会关闭：某一项失败（如事件日志写盘出错）不会跳过其余各项，
+        异常在全部关闭后抛出。
+        """
+        with contextlib.ExitStack() as stack:
+            # 按注册的逆序执行：事件日志、记忆、索引
+            stack.callback(self.index.close)
+            stack.callback(self.memory.close)
+            stack.callback(self.events.close)
+            await self.memory.timer_wheel.stop()
 
     def _log_event(
         self,
@@ -55,13 +74,13 @@ class SoloServer:
             "error": error,
             "params_keys": sorted(list(params.keys())) if params else [],
         }
+        self.events.append(entry)
+
+    def get_statistics(self, limit: int = 200) -> dict[str, Any]:
         try:
-            with self.events_path.open("a", encoding="utf-8") as f:
-                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.events.flush()
         except Exception:
             pass
-
-    def get_statistics(self, limit: int = 200) -> dict[str, Any]:
         if not self.events_path.exists():
             return {
                 "total": 0,
@@ -128,132 +147,85 @@ class SoloServer:
             "recent": recent,
         }
 
-    async def handle(self, request: dict[str, Any]) -> dict[str, Any]:
-        tool = request.get("tool")
-        params = request.get("params", {})
-        # credit check (lightweight)
-        if tool not in {"credits.get", "credits.add"}:
-            ok = self.credits.consume(1)
-            if not ok:
-                return {"error": "INSUFFICIENT_CREDITS"}
-        start = time.perf_counter()
-        try:
-            if tool == "fs.read":
-                ret = {"result": self.fs.read(params["path"])}
-                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(ret["result"], ensure_ascii=False)), None)
-                return ret
-            if tool == "fs.write":
-                ret = {"result": self.fs.safe_write(params["path"], params["content"])}
-                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(ret["result"], ensure_ascii=False)), None)
-                return ret
-            if tool == "fs.list":
-                ret = {"result": self.fs.list_dir(params.get("path"))}
-                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(ret["result"], ensure_ascii=False)), None)
-                return ret
-            if tool == "memory.store":
-                ret = {
-                    "result": await self.memory.store(
-                        params.get("key"), params.get("data")
-                    )
-                }
-                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(ret["result"], ensure_ascii=False)), None)
-                return ret
-            if tool == "memory.load":
-                res = await self.memory.load(params.get("key"))
-                ret = {"result": res}
-                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(res, ensure_ascii=False)), None)
-                return ret
-            if tool == "memory.summarize":
-                res = await self.memory.summarize(params.get("key"))
-                ret = {"result": res}
-                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(res, ensure_ascii=False)), None)
-                return ret
-            if tool == "index.build":
-                res = await self.index.build()
-                ret = {"result": res}
-                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(res, ensure_ascii=False)), None)
-                return ret
-            if tool == "index.search":
-                res = await self.index.search(
-                    params.get("query"), k=params.get("k", 10)
-                )
-                ret = {
-                    "result": await self.index.search(
-                        params.get("query"), k=params.get("k", 10)
-                    )
-                }
-                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(res, ensure_ascii=False)), None)
-                return ret
-            if tool == "context.collect":
-                res = await self.context.collect(
-                    params.get("query"), limit=params.get("limit", 8000)
-                )
-                ret = {
-                    "result": await self.context.collect(
-                        params.get("query"), limit=params.get("limit", 8000)
-                    )
-                }
-                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(res, ensure_ascii=False)), None)
-                return ret
-            if tool == "roles.evaluate":
-                res = self.roles.evaluate(
-                    params.get("goal"), params.get("stack", [])
-                )
-                ret = {
-                    "result": self.roles.evaluate(
-                        params.get("goal"), params.get("stack", [])
-                    )
-                }
-                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(res, ensure_ascii=False)), None)
-                return ret
-            if tool == "orchestrator.run_round":
-                res = await self.orchestrator.run_round(
-                    params.get("mode", "collab"), params.get("state", {})
-                )
-                ret = {
-                    "result": await self.orchestrator.run_round(
-                        params.get("mode", "collab"), params.get("state", {})
-                    )
-                }
-                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(res, ensure_ascii=False)), None)
-                return ret
-            if tool == "proc.exec":
-                res = await self.proc.exec(params.get("command"))
-                ret = {"result": res}
-                self._log_event(tool, params, start, time.perf_counter(), True, len(json.dumps(res, ensure_ascii=False)), None)
-                return ret
-            if tool == "credits.get":
-                res = self.credits.get_balance()
-                ret = {"result": res}
-                self._log_event(tool, params, start, time.perf_counter(), True, len(str(res)), None)
-                return ret
-            if tool == "credits.add":
-                res = self.credits.add(params.get("amount", 0))
-                ret = {"result": res}
-                self._log_event(tool, params, start, time.perf_counter(), True, len(str(res)), None)
-                return ret
-        except Exception as e:
-            self._log_event(tool or "", params, start, time.perf_counter(), False, 0, str(e))
-            return {"error": str(e)}
-        self._log_event(tool or "", params, start, time.perf_counter(), False, 0, "Unknown tool")
-        return {"error": f"Unknown tool: {tool}"}
+    def _build_registry(self) -> dict[str, ToolSpec]:
+        """工具名 -> 处理函数；处理函数只接收 params 字典"""
+        fs, memory, index, context = self.fs, self.memory, self.index, self.context
+        roles, orchestrator, proc, credits = (
+            self.roles,
+            self.orchestrator,
+            self.proc,
+            self.credits,
+        )
+        return {
+            "fs.read": ToolSpec(lambda p: fs.read(p["path"]), required=("path",)),
+            "fs.write": ToolSpec(
+                lambda p: fs.safe_write(p["path"], p["content"]),
+                required=("path", "content"),
+            ),
+            "fs.list": ToolSpec(lambda p: fs.list_dir(p.get("path"))),
+            "memory.store": ToolSpec(
+                lambda p: memory.store(
+                    p["content"],
+                    memory_type=p.get("memory_type", "context"),
+                    tags=p.get("tags"),
+                    context=p.get("context"),
+                    priority=p.get("priority", "medium"),
+                    expiry_hours=p.get("expiry_hours"),
+                ),
+                required=("content",),
+            ),
+            "memory.load": ToolSpec(
+                lambda p: memory.load(
+                    p["query"],
+                    memory_type=p.get("memory_type"),
+                    tags=p.get("tags"),
+                    limit=p.get("limit", 5),
+                    mode=p.get("mode", "keyword"),
+                ),
+                required=("query",),
+            ),
+            "memory.summarize": ToolSpec(
+                lambda p: memory.get_memory_summary(days=p.get("days", 7))
+            ),
+            "index.build": ToolSpec(
+                lambda p: index.build(full=bool(p.get("full", False))), is_async=True
+            ),
+            "index.search": ToolSpec(
+                lambda p: index.search(
+                    p.get("query"), k=p.get("k", 10), mode=p.get("mode", "bm25")
+                ),
+                is_async=True,
+            ),
+            "index.stats": ToolSpec(lambda p: index.get_stats()),
+            "context.collect": ToolSpec(
+                lambda p: context.collect(p.get("query"), limit=p.get("limit", 8000)),
+                is_async=True,
+            ),
+            "roles.evaluate": ToolSpec(
+                lambda p: roles.evaluate(p.get("goal"), p.get("stack", []))
+            ),
+            "orchestrator.run_round": ToolSpec(
+                lambda p: orchestrator.run_round(
+                    p.get("mode", "collab"), p.get("state", {})
+                ),
+                is_async=True,
+            ),
+            "proc.exec": ToolSpec(lambda p: proc.exec(p.get("command")), is_async=True),
+            "credits.get": ToolSpec(lambda p: credits.get_balance(), free=True),
+            "credits.add": ToolSpec(lambda p: credits.add(p.get("amount", 0)), free=True),
+        }
 
 
 async def main() -> None:
     config = SoloConfig.load()
     server = SoloServer(config)
-    # Very simple stdin/stdout JSON-RPC like loop to be MCP-compatible via a shim
-    while True:
-        line = await asyncio.get_event_loop().run_in_executor(None, input)
-        if not line:
-            continue
-        try:
-            request = json.loads(line)
-        except Exception:
-            print(json.dumps({"error": "INVALID_JSON"}))
-            continue
-        resp = await server.handle(request)
-        print(json.dumps(resp, ensure_ascii=False))
+    await server.start()
+    try:
+        # stdin/stdout JSON-RPC like loop to be MCP-compatible via a shim
+        reader = await open_stdin_reader()
+        await serve(server, reader, max_concurrency=config.max_concurrent_requests)
+    finally:
+        await server.aclose()
 
 
 if __name__ == "__main__":
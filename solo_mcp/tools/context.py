@@ -1,6 +1,15 @@
-# 这个模块管理运行时上下文，提供键值存取与序列化
+# 这个模块管理运行时上下文，提供键值存取与序列化，以及基于混合检索的上下文收集
 from __future__ import annotations
-from typing import Any, Dict
+
+import asyncio
+import heapq
+import time
+from typing import Any, Dict, List, Optional
+
+from ..config import SoloConfig
+from .index import IndexTool
+from .memory import ContextCacheManager, Priority
+
 
 class Context:
     def __init__(self) -> None:
@@ -22,3 +31,130 @@ class Context:
 
     def to_dict(self) -> Dict[str, Any]:
         return dict(self._data)
+
+
+def _estimate_tokens(text: str) -> int:
+    """粗略估算 token 数（约 4 个字符一个 token）"""
+    return (len(text) + 3) // 4
+
+
+class HybridRetriever:
+    """混合检索：BM25 与向量检索并发执行，用倒数排名融合（RRF）合并结果
+
+    每条结果的融合分数为 ``sum(1 / (rrf_k + rank))``，rank 为其在各路结果中的
+    名次（从 1 开始）。融合结果按查询缓存在 ``ContextCacheManager`` 中，索引更新
+    （``IndexTool.generation`` 变化）后自动失效。
+    """
+
+    def __init__(
+        self,
+        index: IndexTool,
+        cache: Optional[ContextCacheManager] = None,
+        rrf_k: int = 60,
+        depth: int = 50,
+    ):
+        self.index = index
+        self.cache = cache
+        self.rrf_k = rrf_k
+        # 每路检索取回的候选数
+        self.depth = depth
+
+    async def search(self, query: str, k: int = 10) -> List[Dict[str, Any]]:
+        if not query:
+            return []
+        cache_key = f"hybrid|{self.index.generation}|{k}|{query}"
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        depth = max(k, self.depth)
+        lexical, semantic = await asyncio.gather(
+            self.index.search(query, k=depth),
+            self.index.search(query, k=depth, mode="vector"),
+        )
+
+        fused: Dict[str, Dict[str, Any]] = {}
+        for source, result in (("bm25", lexical), ("vector", semantic)):
+            for rank, hit in enumerate(result.get("hits", []), 1):
+                entry = fused.get(hit["path"])
+                if entry is None:
+                    # 两路都命中时保留 BM25 的片段（带关键词高亮）
+                    entry = fused[hit["path"]] = {**hit, "score": 0.0, "sources": {}}
+                entry["score"] += 1.0 / (self.rrf_k + rank)
+                entry["sources"][source] = rank
+
+        hits = heapq.nlargest(k, fused.values(), key=lambda h: h["score"])
+        if self.cache is not None:
+            # 检索可能触发了首次建索引，按检索后的版本缓存
+            cache_key = f"hybrid|{self.index.generation}|{k}|{query}"
+            self.cache.put(cache_key, hits, Priority.MEDIUM, ttl_hours=1)
+        return hits
+
+
+class ContextTool:
+    """上下文收集：混合检索相关文件，在 token 预算内拼装片段"""
+
+    def __init__(
+        self,
+        config: SoloConfig,
+        index: Optional[IndexTool] = None,
+        cache_size: int = 128,
+    ):
+        self.config = config
+        self.index = index or IndexTool(config)
+        self.cache = ContextCacheManager(max_size=cache_size, max_memory_mb=20)
+        self.retriever = HybridRetriever(self.index, self.cache)
+        self.stats = {"collections": 0, "total_tokens": 0, "total_time": 0.0}
+
+    async def collect(
+        self, query: Optional[str], limit: Optional[int] = None, k: int = 20
+    ) -> Dict[str, Any]:
+        """收集与 ``query`` 相关的上下文，``limit`` 为 token 预算"""
+        start = time.perf_counter()
+        budget = limit or self.config.max_context_tokens
+        hits = await self.retriever.search(query or "", k=k)
+
+        parts: List[str] = []
+        files: List[Dict[str, Any]] = []
+        tokens = 0
+        for hit in hits:
+            block = f"文件: {hit['path']}\n{hit['preview']}\n"
+            cost = _estimate_tokens(block)
+            if tokens + cost > budget:
+                continue
+            parts.append(block)
+            tokens += cost
+            files.append(
+                {
+                    "path": hit["path"],
+                    "score": hit["score"],
+                    "sources": hit["sources"],
+                }
+            )
+
+        self.stats["collections"] += 1
+        self.stats["total_tokens"] += tokens
+        self.stats["total_time"] += time.perf_counter() - start
+        return {
+            "query": query,
+            "content": "\n".join(parts),
+            "tokens": tokens,
+            "files": files,
+            "summary": f"{len(files)} 个文件片段，约 {tokens} tokens"
+            f"（候选 {len(hits)} 个，预算 {budget}）",
+        }
+
+    async def collect_smart(self, query: str, limit: int = 2000) -> str:
+        """只返回拼装好的上下文文本"""
+        return (await self.collect(query, limit=limit))["content"]
+
+    def get_collection_stats(self) -> Dict[str, Any]:
+        """上下文收集与融合缓存的统计信息"""
+        count = self.stats["collections"]
+        return {
+            "collections": count,
+            "avg_tokens": self.stats["total_tokens"] / max(count, 1),
+            "avg_time": self.stats["total_time"] / max(count, 1),
+            "cache": self.cache.get_stats(),
+        }
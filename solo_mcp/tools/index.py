@@ -1,118 +1,1291 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+import asyncio
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import accumulate, compress
+from operator import sub
 from pathlib import Path
-from typing import Any
+from typing import Any, AsyncIterator, Iterable
 
 from ..config import SoloConfig
+from ..utils.file_utils import DEFAULT_IGNORE_PATTERNS, walk_files
+from ..utils.text_utils import CODE_TOKENIZER, tokenize_code
+from .vector import VectorStore, encode_batched, get_embedder
+
+# On-disk index layout (all sections are raw native-endian arrays):
+#   magic (8s) | header length (I) | header JSON | sections...
+# The header records the byte range of each section relative to the end of
+# the header, so the postings section can be sliced straight out of the mmap.
+_INDEX_MAGIC = b"SOLOBM25"
+_INDEX_VERSION = 8
+_INDEX_PREFIX = struct.Struct("<8sI")
+# files handed to one worker task during a build
+_BUILD_CHUNK = 64
+# file types picked up by the index
+_INDEX_SUFFIXES = (".py", ".js", ".ts", ".json", ".md", ".txt", ".tsx", ".jsx")
+# decoded postings kept around between queries, in number of postings
+_DECODE_CACHE_POSTINGS = 1 << 20
+# search hit snippets: bytes read per hit, and context kept before the
+# first matched term when the window doesn't start at the top of the file
+_SNIPPET_BYTES = 500
+_SNIPPET_LEAD = 80
+# leading bytes of each file embedded for vector search
+_EMBED_BYTES = 4096
 
 
 @dataclass
 class _Corpus:
-    docs: list[list[str]]
-    paths: list[str]
+    # doc id -> path; None marks the slot of a removed document
+    paths: list[str | None]
+    # (st_mtime_ns, st_size, content hash) per doc id at indexing time
+    fingerprints: list[tuple[int, int, str]] = field(default_factory=list)
+
+
+# encodings of the one- and two-byte varints (0 .. 0x3FFF); joining these
+# keeps the common case out of a per-byte Python loop
+_VARINTS = [bytes((v,)) for v in range(0x80)] + [
+    bytes(((v & 0x7F) | 0x80, v >> 7)) for v in range(0x80, 0x4000)
+]
+
+
+def _varint(v: int) -> bytes:
+    out = bytearray()
+    while v >= 0x80:
+        out.append((v & 0x7F) | 0x80)
+        v >>= 7
+    out.append(v)
+    return bytes(out)
+
+
+def _encode_varints(values: Iterable[int], out: bytearray) -> None:
+    if not isinstance(values, list):
+        values = list(values)
+    if not values:
+        return
+    top = max(values)
+    if top < 0x80:
+        out += bytes(values)
+    elif top < 0x4000:
+        out += b"".join(map(_VARINTS.__getitem__, values))
+    else:
+        table = _VARINTS
+        out += b"".join([table[v] if v < 0x4000 else _varint(v) for v in values])
+
+
+def _gaps(values: list[int]) -> list[int]:
+    """Differences between consecutive ``values`` (the first one as is)."""
+    return list(map(sub, values, [0] + values[:-1]))
+
+
+def _decode_varints(data: bytes | bytearray) -> list[int]:
+    # most streams (dense gaps, small tfs) are single-byte varints
+    if not data or max(data) < 0x80:
+        return list(data)
+    out: list[int] = []
+    value = shift = 0
+    for byte in data:
+        if byte & 0x80:
+            value |= (byte & 0x7F) << shift
+            shift += 7
+        else:
+            out.append(value | (byte << shift))
+            value = shift = 0
+    return out
+
+
+def _encode_forward(slots: list[int], offsets: list[int]) -> bytes:
+    """Forward-index entry: the doc's term slots and first byte offsets.
+
+    The slots come first, then the offsets. Terms come in order of first
+    occurrence, so offsets never decrease and are stored as gaps; that half
+    does not depend on the slot numbering and is encoded by the build
+    workers (see ``_index_chunk``).
+    """
+    out = bytearray()
+    _encode_varints(slots, out)
+    _encode_varints(_gaps(offsets), out)
+    return bytes(out)
+
+
+def _decode_forward(data: bytes) -> tuple[list[int], list[int]]:
+    """(term slots, first byte offsets) of a forward-index entry."""
+    values = _decode_varints(data)
+    n = len(values) // 2
+    return values[:n], list(accumulate(values[n:]))
+
+
+class _Postings:
+    """Doc-id ordered ``(doc_id, tf)`` pairs for a single term.
+
+    Stored as one varint stream of interleaved ``(doc id gap, tf)`` pairs,
+    usually one byte each, instead of Python lists of ints. ``decode``
+    expands it on demand; the same bytes are written to and read from the
+    index file as is.
+    """
+
+    __slots__ = ("data", "count", "_last")
+
+    def __init__(
+        self, data: bytes | bytearray = b"", count: int = 0, last: int | None = None
+    ):
+        self.data = data
+        self.count = count
+        # last doc id; None means unknown and is found by decoding on demand
+        self._last: int | None = 0 if count == 0 else last
+
+    @property
+    def last(self) -> int:
+        if self._last is None:
+            doc_ids, _ = self.decode()
+            self._last = doc_ids[-1]
+        return self._last
+
+    def _buffer(self) -> bytearray:
+        if not isinstance(self.data, bytearray):
+            self.data = bytearray(self.data)
+        return self.data
+
+    def add(self, doc_id: int, tf: int) -> None:
+        buf = self._buffer()
+        _encode_varints((doc_id - self.last, tf), buf)
+        self._last = doc_id
+        self.count += 1
+
+    def extend_encoded(
+        self, first: int, rest: bytes, count: int, last: int, offset: int
+    ) -> None:
+        """Append another list whose doc ids are relative to ``offset``.
+
+        ``first`` is its first doc id and ``rest`` its encoded stream after
+        that first gap. Only the gap between the two lists is encoded here;
+        ``rest`` is appended as is.
+        """
+        if not count:
+            return
+        buf = self._buffer()
+        gap = offset + first - self.last
+        if gap < 0x80:
+            buf.append(gap)
+        else:
+            buf += _varint(gap)
+        buf += rest
+        self._last = offset + last
+        self.count += count
+
+    def decode(self) -> tuple[array, array]:
+        values = _decode_varints(self.data)
+        return array("I", accumulate(values[0::2])), array("I", values[1::2])
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __iter__(self):
+        return zip(*self.decode())
+
+    def to_bytes(self) -> bytes:
+        return bytes(self.data)
+
+    @classmethod
+    def from_bytes(
+        cls, data: bytes, count: int, last: int | None = None
+    ) -> "_Postings":
+        return cls(data, count, last)
+
+
+class _IndexFile:
+    """Read-only view of a saved index; postings are sliced from an mmap."""
+
+    def __init__(self, path: Path):
+        self._fh = open(path, "rb")
+        try:
+            self._mm = mmap.mmap(self._fh.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._fh.close()
+            raise
+        try:
+            magic, header_len = _INDEX_PREFIX.unpack_from(self._mm, 0)
+            if magic != _INDEX_MAGIC:
+                raise ValueError("not a solo-mcp index file")
+            start = _INDEX_PREFIX.size
+            self.header: dict[str, Any] = json.loads(
+                self._mm[start : start + header_len].decode("utf-8")
+            )
+            if (
+                self.header.get("version") != _INDEX_VERSION
+                or self.header.get("byteorder") != sys.byteorder
+            ):
+                raise ValueError("incompatible index file")
+            self._base = start + header_len
+            terms_blob = self._section("terms").decode("utf-8")
+            self.terms: list[str] = terms_blob.split("\n") if terms_blob else []
+            self.doc_freq = self._array("I", "doc_freq")
+            # postings per term, including those of removed documents
+            self.counts = self._array("I", "counts")
+            self.last = self._array("I", "last")
+            self.offsets = self._array("Q", "offsets")
+            self.doc_len = self._array("I", "doc_len")
+            self.forward_offsets = self._array("Q", "forward_offsets")
+            # shared with _BM25Lite, which appends new terms past n_terms
+            self.n_terms = len(self.terms)
+            self.slots: dict[str, int] = dict(zip(self.terms, range(self.n_terms)))
+            sections = self.header["sections"]
+            self._postings_start = self._base + sections["postings"][0]
+            self._forward_start = self._base + sections["forward"][0]
+        except Exception:
+            self.close()
+            raise
+
+    def _section(self, name: str) -> bytes:
+        offset, length = self.header["sections"][name]
+        return self._mm[self._base + offset : self._base + offset + length]
+
+    def _array(self, typecode: str, name: str) -> array:
+        values = array(typecode)
+        values.frombytes(self._section(name))
+        return values
+
+    def __contains__(self, term: str) -> bool:
+        slot = self.slots.get(term)
+        return slot is not None and slot < self.n_terms
+
+    def raw(self, term: str) -> bytes:
+        slot = self.slots[term]
+        start = self._postings_start + self.offsets[slot]
+        return self._mm[start : self._postings_start + self.offsets[slot + 1]]
+
+    def load(self, term: str) -> _Postings:
+        slot = self.slots[term]
+        return _Postings.from_bytes(self.raw(term), self.counts[slot], self.last[slot])
+
+    def forward_raw(self, doc_id: int) -> bytes:
+        """Encoded term slots of ``doc_id`` (the forward index)."""
+        start = self._forward_start + self.forward_offsets[doc_id]
+        return self._mm[start : self._forward_start + self.forward_offsets[doc_id + 1]]
+
+    def close(self) -> None:
+        try:
+            self._mm.close()
+        finally:
+            self._fh.close()
+
+
+class _PostingsTable(dict):
+    """term -> _Postings, decoding terms from the index file on first use."""
+
+    def __init__(self, store: _IndexFile | None = None):
+        super().__init__()
+        self.store = store
+
+    def __missing__(self, term: str) -> _Postings:
+        if self.store is None or term not in self.store:
+            raise KeyError(term)
+        plist = self[term] = self.store.load(term)
+        return plist
+
+    def __contains__(self, term: object) -> bool:
+        return dict.__contains__(self, term) or (
+            self.store is not None and term in self.store
+        )
+
+    def get(self, term: str, default: Any = None) -> Any:
+        plist = dict.get(self, term)
+        if plist is None and self.store is not None and term in self.store:
+            plist = self[term]
+        return default if plist is None else plist
+
+    def raw(self, term: str) -> tuple[bytes, int, int]:
+        """Encoded postings, count and last doc id of ``term``, copied from
+        the file when not decoded yet."""
+        if dict.__contains__(self, term) or self.store is None:
+            plist = dict.__getitem__(self, term)
+            return plist.to_bytes(), plist.count, plist.last
+        slot = self.store.slots[term]
+        return self.store.raw(term), self.store.counts[slot], self.store.last[slot]
 
 
 class _BM25Lite:
+    """BM25 over an inverted index built once from the tokenized corpus.
+
+    Scoring only walks the postings of the query terms, so a search costs
+    O(matching postings) instead of O(total tokens x query terms).
+
+    Documents can be added and removed in place. A forward index (doc id ->
+    term slots) tells ``remove_document`` which ``doc_freq`` entries to
+    touch. Removed documents keep their postings, marked by a zero
+    ``doc_len`` and skipped when a list is decoded for scoring, until the
+    next from-scratch build drops them. Removed doc ids are never reused, so
+    postings stay sorted by doc id. Term slots are stable too: a term whose
+    last document is gone keeps its slot until the next from-scratch build.
+    """
+
     def __init__(self, corpus: list[list[str]], k1: float = 1.5, b: float = 0.75):
-        self.corpus = corpus
         self.k1 = k1
         self.b = b
+        self.n_docs = 0
+        self.total_len = 0
+        self.doc_len = array("I")
+        self.terms: list[str] = []
+        self.slots: dict[str, int] = {}
+        self.postings = _PostingsTable()
         self.doc_freq: dict[str, int] = {}
-        self.avgdl = sum(len(doc) for doc in corpus) / max(1, len(corpus))
+        # doc id -> encoded term slots, for docs not (yet) in the index file
+        self._forward: dict[int, bytes] = {}
+        self._store: _IndexFile | None = None
+        self.refresh()
         for doc in corpus:
-            seen = set()
-            for w in doc:
-                if w in seen:
-                    continue
-                self.doc_freq[w] = self.doc_freq.get(w, 0) + 1
-                seen.add(w)
+            self.add_document(doc)
+        self.refresh()
+
+    @classmethod
+    def from_file(cls, store: _IndexFile) -> "_BM25Lite":
+        """Warm-start from a saved index without touching the postings."""
+        header = store.header
+        bm25 = cls.__new__(cls)
+        bm25.k1 = float(header["k1"])
+        bm25.b = float(header["b"])
+        bm25.doc_len = store.doc_len
+        bm25.n_docs = int(header["n_docs"])
+        bm25.total_len = sum(bm25.doc_len)
+        bm25.terms = store.terms
+        bm25.slots = store.slots
+        bm25.postings = _PostingsTable(store)
+        bm25.doc_freq = {t: df for t, df in zip(store.terms, store.doc_freq) if df}
+        bm25._forward = {}
+        bm25._store = store
+        bm25.refresh()
+        return bm25
+
+    def add_document(
+        self, tokens: list[str], first: dict[str, int] | None = None
+    ) -> int:
+        """Append a document; call ``refresh`` once a batch is done.
+
+        ``first`` maps each term to the byte offset of its first occurrence,
+        used to cut search snippets; without it offsets are recorded as 0.
+        """
+        doc_id = len(self.doc_len)
+        slots: list[int] = []
+        offsets: list[int] = []
+        for term, tf in Counter(tokens).items():
+            slot = self.slots.get(term)
+            if slot is None:
+                slot = self.slots[term] = len(self.terms)
+                self.terms.append(term)
+            plist = self.postings.get(term)
+            if plist is None:
+                plist = self.postings[term] = _Postings()
+            plist.add(doc_id, tf)
+            self.doc_freq[term] = self.doc_freq.get(term, 0) + 1
+            slots.append(slot)
+            offsets.append(first[term] if first else 0)
+        self._forward[doc_id] = _encode_forward(slots, offsets)
+        # searches running between incremental additions and the next
+        # refresh() may already see this doc id in the postings
+        self._norm.append(
+            self.k1 * (1 - self.b + self.b * len(tokens) / max(1.0, self.avgdl))
+        )
+        self.doc_len.append(len(tokens))
+        self.total_len += len(tokens)
+        self.n_docs += 1
+        return doc_id
+
+    def add_partial(self, part: "_Partial") -> None:
+        """Merge a worker's chunk; its docs get the next consecutive ids.
+
+        Runs once per (term, chunk) pair on a full build, so it sticks to
+        appending the chunk's encoded bytes.
+        """
+        offset = len(self.doc_len)
+        slots, terms, doc_freq = self.slots, self.terms, self.doc_freq
+        postings = self.postings
+        # skip the file lookup of _PostingsTable.get on a fresh index
+        get = dict.get if postings.store is None else _PostingsTable.get
+        slot_map: list[int] = []
+        for term, (first, rest, count, last) in zip(part.terms, part.postings):
+            slot = slots.get(term)
+            if slot is None:
+                slot = slots[term] = len(terms)
+                terms.append(term)
+            slot_map.append(slot)
+            plist = get(postings, term)
+            if plist is None:
+                plist = postings[term] = _Postings()
+            plist.extend_encoded(first, rest, count, last, offset)
+            doc_freq[term] = doc_freq.get(term, 0) + count
+        to_slot = slot_map.__getitem__
+        forward = self._forward
+        for doc_id, (local, offsets) in enumerate(part.forward, offset):
+            entry = bytearray()
+            _encode_varints(list(map(to_slot, local)), entry)
+            entry += offsets
+            forward[doc_id] = bytes(entry)
+        self.doc_len.extend(part.doc_len)
+        self.total_len += sum(part.doc_len)
+        self.n_docs += len(part.doc_len)
+
+    def remove_document(self, doc_id: int) -> None:
+        """Drop ``doc_id`` from ``doc_freq``; call ``refresh``.
+
+        Its postings are left in place, so a removal costs O(terms of the
+        doc) rather than re-encoding every postings list it appears in.
+        """
+        for slot in self._doc_slots(doc_id):
+            term = self.terms[slot]
+            df = self.doc_freq[term] - 1
+            if df:
+                self.doc_freq[term] = df
+            else:
+                del self.doc_freq[term]
+        self._forward[doc_id] = b""
+        self.total_len -= self.doc_len[doc_id]
+        self.doc_len[doc_id] = 0
+        self.n_docs -= 1
+
+    def _doc_slots(self, doc_id: int) -> list[int]:
+        return _decode_forward(self.forward_raw(doc_id))[0]
+
+    def first_offsets(self, doc_id: int, terms: Iterable[str]) -> dict[str, int]:
+        """Byte offset of the first occurrence of each of ``terms`` in a doc."""
+        wanted = {}
+        for term in terms:
+            slot = self.slots.get(term)
+            if slot is not None:
+                wanted[slot] = term
+        if not wanted:
+            return {}
+        slots, offsets = _decode_forward(self.forward_raw(doc_id))
+        return {
+            wanted[slot]: offset
+            for slot, offset in zip(slots, offsets)
+            if slot in wanted
+        }
+
+    def forward_raw(self, doc_id: int) -> bytes:
+        data = self._forward.get(doc_id)
+        if data is not None or self._store is None:
+            return data or b""
+        return self._store.forward_raw(doc_id)
+
+    def _decoded(self, term: str) -> tuple[array, array]:
+        """(doc ids, tfs) of ``term``, through a small LRU of decoded lists."""
+        cache = self._decode_cache
+        hit = cache.get(term)
+        if hit is not None:
+            cache.move_to_end(term)
+            return hit
+        doc_ids, tfs = self.postings[term].decode()
+        if self.n_docs < len(self.doc_len):
+            # skip the postings of removed documents (doc_len 0)
+            live = list(map(self.doc_len.__getitem__, doc_ids))
+            doc_ids = array("I", compress(doc_ids, live))
+            tfs = array("I", compress(tfs, live))
+        decoded = doc_ids, tfs
+        cache[term] = decoded
+        self._decoded_postings += len(decoded[0])
+        while self._decoded_postings > _DECODE_CACHE_POSTINGS and len(cache) > 1:
+            _, (doc_ids, _) = cache.popitem(last=False)
+            self._decoded_postings -= len(doc_ids)
+        return decoded
+
+    def refresh(self) -> None:
+        """Recompute corpus-level statistics after adding/removing docs."""
+        self.avgdl = self.total_len / max(1, self.n_docs)
+        # k1 * (1 - b + b * dl / avgdl) only depends on the document
+        avgdl = max(1.0, self.avgdl)
+        k1, b = self.k1, self.b
+        self._norm: list[float] = [
+            k1 * (1 - b + b * dl / avgdl) for dl in self.doc_len
+        ]
+        self._idf_cache: dict[str, float] = {}
+        self._max_score_cache: dict[str, float] = {}
+        self._decode_cache: OrderedDict[str, tuple[array, array]] = OrderedDict()
+        self._decoded_postings = 0
 
     def _idf(self, term: str) -> float:
-        import math
+        idf = self._idf_cache.get(term)
+        if idf is None:
+            # Lucene-style idf: always positive, so terms present in most
+            # documents of a small corpus still contribute to the score.
+            n = self.n_docs
+            df = self.doc_freq.get(term, 0)
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            self._idf_cache[term] = idf
+        return idf
+
+    def _max_score(self, term: str) -> float:
+        """Upper bound of a single occurrence-weight of ``term`` in any doc."""
+        ub = self._max_score_cache.get(term)
+        if ub is None:
+            doc_ids, tfs = self._decoded(term)
+            k1_plus_1 = self.k1 + 1
+            norm = self._norm
+            best = max(tf / (tf + norm[doc_id]) for doc_id, tf in zip(doc_ids, tfs))
+            ub = self._idf(term) * k1_plus_1 * best
+            self._max_score_cache[term] = ub
+        return ub
+
+    def score(self, query_tokens: list[str]) -> dict[int, float]:
+        """Sparse BM25 scores for every document matching a query term."""
+        scores: dict[int, float] = {}
+        k1_plus_1 = self.k1 + 1
+        norm = self._norm
+        for q in query_tokens:
+            if q not in self.doc_freq:
+                continue
+            idf = self._idf(q)
+            for doc_id, tf in zip(*self._decoded(q)):
+                contrib = idf * (tf * k1_plus_1) / (tf + norm[doc_id])
+                scores[doc_id] = scores.get(doc_id, 0.0) + contrib
+        return scores
+
+    def top_k(self, query_tokens: list[str], k: int) -> list[tuple[int, float]]:
+        """Best ``k`` documents by BM25 with MaxScore-style pruning.
 
-        n = len(self.corpus)
-        df = self.doc_freq.get(term, 0) + 0.5
-        return max(0.0, math.log((n - df + 0.5) / df))
+        Terms are processed in descending order of their score upper bound,
+        so rare, high-IDF terms seed the accumulators first. As soon as the
+        k-th best score reaches the summed bounds of the remaining terms, no
+        unseen document can enter the top ``k``: candidates that can no
+        longer reach the threshold are dropped and the remaining (usually
+        very frequent) terms are only probed for the surviving candidates by
+        binary search instead of walking their whole postings.
+        """
+        if k <= 0:
+            return []
+        weights = Counter(q for q in query_tokens if q in self.doc_freq)
+        if not weights:
+            return []
+        terms = sorted(
+            (
+                (self._max_score(q) * qtf, self._idf(q) * qtf, self._decoded(q))
+                for q, qtf in weights.items()
+            ),
+            key=lambda t: t[0],
+            reverse=True,
+        )
+        remaining = [0.0] * (len(terms) + 1)
+        for i in range(len(terms) - 1, -1, -1):
+            remaining[i] = remaining[i + 1] + terms[i][0]
+
+        k1_plus_1 = self.k1 + 1
+        norm = self._norm
+        acc: dict[int, float] = {}
+        for i, (_, weight, (doc_ids, tfs)) in enumerate(terms):
+            threshold = 0.0
+            if len(acc) >= k:
+                threshold = heapq.nlargest(k, acc.values())[-1]
+            if len(acc) < k or threshold <= remaining[i]:
+                for doc_id, tf in zip(doc_ids, tfs):
+                    contrib = weight * tf * k1_plus_1 / (tf + norm[doc_id])
+                    acc[doc_id] = acc.get(doc_id, 0.0) + contrib
+                continue
+            # no new document can make it: prune and probe the survivors
+            bound = remaining[i]
+            acc = {d: s for d, s in acc.items() if s + bound >= threshold}
+            if len(acc) * 4 < len(doc_ids):
+                n = len(doc_ids)
+                for doc_id in acc:
+                    pos = bisect_left(doc_ids, doc_id)
+                    if pos < n and doc_ids[pos] == doc_id:
+                        tf = tfs[pos]
+                        acc[doc_id] += weight * tf * k1_plus_1 / (tf + norm[doc_id])
+            else:
+                for doc_id, tf in zip(doc_ids, tfs):
+                    if doc_id in acc:
+                        acc[doc_id] += weight * tf * k1_plus_1 / (tf + norm[doc_id])
+
+        return heapq.nsmallest(k, acc.items(), key=lambda x: (-x[1], x[0]))
+
+    def memory_usage(self) -> dict[str, int]:
+        """Approximate heap bytes held by the index, by component.
+
+        Postings still sitting in the mmapped file are not counted as heap
+        (``mapped``); the page cache can drop them at any time.
+        """
+        getsizeof = sys.getsizeof
+        postings = getsizeof(self.postings) + sum(
+            getsizeof(p) + getsizeof(p.data) for p in dict.values(self.postings)
+        )
+        forward = getsizeof(self._forward) + sum(map(getsizeof, self._forward.values()))
+        terms = getsizeof(self.terms) + getsizeof(self.slots) + getsizeof(self.doc_freq)
+        terms += sum(map(getsizeof, self.terms))
+        if self._store is not None and self.slots is not self._store.slots:
+            terms += getsizeof(self._store.slots)
+        docs = getsizeof(self.doc_len) + getsizeof(self._norm) + 24 * len(self._norm)
+        cache = sum(
+            getsizeof(doc_ids) + getsizeof(tfs)
+            for doc_ids, tfs in self._decode_cache.values()
+        )
+        return {
+            "postings": postings,
+            "forward": forward,
+            "terms": terms,
+            "docs": docs,
+            "decode_cache": cache,
+            "total": postings + forward + terms + docs + cache,
+            "mapped": len(self._store._mm) if self._store is not None else 0,
+        }
 
     def get_scores(self, query_tokens: list[str]) -> list[float]:
-        scores: list[float] = []
-        for doc in self.corpus:
-            score = 0.0
-            dl = len(doc)
-            for q in query_tokens:
-                tf = sum(1 for t in doc if t == q)
-                if tf == 0:
-                    continue
-                idf = self._idf(q)
-                denom = tf + self.k1 * (1 - self.b + self.b * dl / max(1, self.avgdl))
-                score += idf * (tf * (self.k1 + 1)) / denom
-            scores.append(score)
+        scores = [0.0] * self.n_docs
+        for doc_id, score in self.score(query_tokens).items():
+            scores[doc_id] = score
         return scores
 
 
+def _write_index(path: Path, bm25: _BM25Lite, corpus: _Corpus) -> None:
+    """Serialize ``bm25``/``corpus`` to ``path``.
+
+    Postings and forward entries that were never decoded are copied as raw
+    bytes from the currently mapped file, so rewriting after a small
+    incremental update does not decode the whole index.
+    """
+    terms = bm25.terms
+    doc_freq = array("I", (bm25.doc_freq.get(t, 0) for t in terms))
+    counts = array("I")
+    last = array("I")
+    offsets = array("Q", [0])
+    chunks: list[bytes] = []
+    pos = 0
+    for term, df in zip(terms, doc_freq):
+        # lists whose documents are all gone are dropped here
+        data, count, last_id = bm25.postings.raw(term) if df else (b"", 0, 0)
+        chunks.append(data)
+        counts.append(count)
+        last.append(last_id)
+        pos += len(data)
+        offsets.append(pos)
+    forward_offsets = array("Q", [0])
+    forward: list[bytes] = []
+    fpos = 0
+    for doc_id in range(len(bm25.doc_len)):
+        data = bm25.forward_raw(doc_id)
+        forward.append(data)
+        fpos += len(data)
+        forward_offsets.append(fpos)
+    sections: list[tuple[str, bytes]] = [
+        ("terms", "\n".join(terms).encode("utf-8")),
+        ("doc_freq", doc_freq.tobytes()),
+        ("counts", counts.tobytes()),
+        ("last", last.tobytes()),
+        ("offsets", offsets.tobytes()),
+        ("doc_len", bm25.doc_len.tobytes()),
+        ("forward_offsets", forward_offsets.tobytes()),
+    ]
+    layout: dict[str, list[int]] = {}
+    cursor = 0
+    for name, data in sections:
+        layout[name] = [cursor, len(data)]
+        cursor += len(data)
+    layout["forward"] = [cursor, fpos]
+    layout["postings"] = [cursor + fpos, pos]
+    header = json.dumps(
+        {
+            "version": _INDEX_VERSION,
+            "byteorder": sys.byteorder,
+            "k1": bm25.k1,
+            "b": bm25.b,
+            "n_docs": bm25.n_docs,
+            "paths": corpus.paths,
+            "fingerprints": corpus.fingerprints,
+            "sections": layout,
+        },
+        ensure_ascii=False,
+    ).encode("utf-8")
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(_INDEX_PREFIX.pack(_INDEX_MAGIC, len(header)))
+        f.write(header)
+        for _, data in sections:
+            f.write(data)
+        for data in forward:
+            f.write(data)
+        for data in chunks:
+            f.write(data)
+
+
+def _read_document(
+    path: str,
+) -> tuple[list[str], dict[str, int], tuple[int, int, str]] | None:
+    """Tokens, first byte offset per term and fingerprint of ``path``."""
+    try:
+        st = os.stat(path)
+        with open(path, "rb") as f:
+            data = f.read()
+    except Exception:
+        return None
+    # surrogateescape keeps one character per undecodable byte, so the
+    # text encodes back to exactly ``data``
+    text = data.decode("utf-8", errors="surrogateescape")
+    tokens, first = CODE_TOKENIZER.tokenize_with_offsets(text)
+    if not data.isascii():
+        first = _byte_offsets(text, first)
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    return tokens, first, (st.st_mtime_ns, st.st_size, digest)
+
+
+def _byte_offsets(text: str, first: dict[str, int]) -> dict[str, int]:
+    """Map the character offsets in ``first`` to UTF-8 byte offsets."""
+    to_byte: dict[int, int] = {}
+    pos = byte = 0
+    for start in sorted(set(first.values())):
+        byte += len(text[pos:start].encode("utf-8", errors="surrogateescape"))
+        pos = start
+        to_byte[start] = byte
+    return {term: to_byte[start] for term, start in first.items()}
+
+
+def _snippet_start(offsets: list[tuple[int, float]]) -> int:
+    """Start of the ``_SNIPPET_BYTES`` window covering the most query weight.
+
+    ``offsets`` holds (first byte offset, weight) per matched query term.
+    """
+    offsets = sorted(offsets)
+    best_start, best_weight = 0, -1.0
+    weight = 0.0
+    j = 0
+    for i, (start, _) in enumerate(offsets):
+        while j < len(offsets) and offsets[j][0] < start + _SNIPPET_BYTES - _SNIPPET_LEAD:
+            weight += offsets[j][1]
+            j += 1
+        if weight > best_weight:
+            best_start, best_weight = start, weight
+        weight -= offsets[i][1]
+    return best_start
+
+
+def _read_head(path: str) -> str:
+    try:
+        with open(path, "rb") as f:
+            return f.read(_EMBED_BYTES).decode("utf-8", errors="ignore")
+    except OSError:
+        return ""
+
+
+def _read_snippet(path: str, anchor: int) -> tuple[int, str]:
+    """Read the snippet window around byte ``anchor`` with a single seek.
+
+    Returns the byte offset of the snippet in the file and its text.
+    """
+    start = max(0, anchor - _SNIPPET_LEAD)
+    try:
+        with open(path, "rb") as f:
+            f.seek(start)
+            data = f.read(_SNIPPET_BYTES)
+    except Exception:
+        return 0, ""
+    if start:
+        # begin at a line boundary when one is close to the first match
+        newline = data.rfind(b"\n", 0, anchor - start)
+        if newline >= 0:
+            start += newline + 1
+            data = data[newline + 1 :]
+        else:
+            # never start in the middle of a UTF-8 sequence
+            while data and 0x80 <= data[0] < 0xC0:
+                start += 1
+                data = data[1:]
+    return start, data.decode("utf-8", errors="ignore")
+
+
+def _highlights(text: str, query_tokens: Iterable[str]) -> list[list[int]]:
+    """[start, end) character spans of words in ``text`` matching the query."""
+    wanted = set(query_tokens)
+    return [
+        [start, end]
+        for start, end, tokens in CODE_TOKENIZER.spans(text)
+        if not wanted.isdisjoint(tokens)
+    ]
+
+
+@dataclass
+class _Partial:
+    """Postings of one build chunk, with chunk-local doc ids and term slots."""
+
+    paths: list[str] = field(default_factory=list)
+    fingerprints: list[tuple[int, int, str]] = field(default_factory=list)
+    doc_len: list[int] = field(default_factory=list)
+    terms: list[str] = field(default_factory=list)
+    # per local term slot: (first local doc id, varint postings after the
+    # first doc id gap, count, last local doc id)
+    postings: list[tuple[int, bytes, int, int]] = field(default_factory=list)
+    # per local doc: (local term slots, encoded first byte offset gaps)
+    forward: list[tuple[list[int], bytes]] = field(default_factory=list)
+
+
+def _index_chunk(paths: list[str]) -> _Partial:
+    """Read and tokenize ``paths``; runs in a worker thread or process."""
+    part = _Partial()
+    local: dict[str, int] = {}
+    lists: list[tuple[list[int], list[int]]] = []
+    for path in paths:
+        doc = _read_document(path)
+        if doc is None:
+            continue
+        tokens, first, fingerprint = doc
+        doc_id = len(part.paths)
+        slots: list[int] = []
+        offsets: list[int] = []
+        for term, tf in Counter(tokens).items():
+            slot = local.get(term)
+            if slot is None:
+                slot = local[term] = len(part.terms)
+                part.terms.append(term)
+                lists.append(([], []))
+            doc_ids, tfs = lists[slot]
+            doc_ids.append(doc_id)
+            tfs.append(tf)
+            slots.append(slot)
+            offsets.append(first[term])
+        encoded = bytearray()
+        _encode_varints(_gaps(offsets), encoded)
+        part.paths.append(path)
+        part.fingerprints.append(fingerprint)
+        part.doc_len.append(len(tokens))
+        part.forward.append((slots, bytes(encoded)))
+    for doc_ids, tfs in lists:
+        # interleaved (doc id gap, tf) pairs, minus the leading doc id
+        values = [0] * (2 * len(doc_ids))
+        values[0::2] = _gaps(doc_ids)
+        values[1::2] = tfs
+        encoded = bytearray()
+        _encode_varints(values[1:], encoded)
+        part.postings.append((doc_ids[0], bytes(encoded), len(doc_ids), doc_ids[-1]))
+    return part
+
+
+def _stat_changes(
+    files: list[Path], corpus: _Corpus
+) -> tuple[dict[str, int], list[tuple[str, int | None]]]:
+    """Compare ``files`` against the fingerprints in ``corpus``.
+
+    Returns the indexed paths missing from ``files`` (or that can't be
+    stat'ed right now) and the (path, doc id or None) pairs to re-read.
+    """
+    known = {path: i for i, path in enumerate(corpus.paths) if path is not None}
+    candidates: list[tuple[str, int | None]] = []
+    for p in files:
+        path = str(p)
+        doc_id = known.pop(path, None)
+        if doc_id is not None:
+            try:
+                st = p.stat()
+            except OSError:
+                known[path] = doc_id
+                continue
+            mtime_ns, size, _ = corpus.fingerprints[doc_id]
+            if st.st_mtime_ns == mtime_ns and st.st_size == size:
+                continue
+        candidates.append((path, doc_id))
+    return known, candidates
+
+
 class IndexTool:
-    def __init__(self, config: SoloConfig):
+    def __init__(
+        self,
+        config: SoloConfig,
+        workers: int | None = None,
+        use_processes: bool = False,
+    ):
         self.config = config
+        # file reading/tokenizing fan-out; processes sidestep the GIL for
+        # large trees at the cost of pickling each chunk's partial postings
+        self.workers = max(1, workers or min(8, os.cpu_count() or 1))
+        self.use_processes = use_processes
+        # created on the first build and kept until close(), so incremental
+        # rebuilds don't pay the pool start-up (process spawn) each time
+        self._pool: Executor | None = None
+        self._build_lock = asyncio.Lock()
         self._bm25: _BM25Lite | None = None
         self._corpus: _Corpus | None = None
+        self.index_path = config.ai_memory_dir / "index" / "bm25.idx"
+        self._store: _IndexFile | None = None
+        # embeddings of each file's head, keyed by path and tagged with the
+        # content hash; created on the first vector search
+        self._vectors: VectorStore | None = None
+        self._vector_lock = asyncio.Lock()
+        # bumped whenever the searchable index changes; lets callers key
+        # cached search results on it
+        self.generation = 0
+        # path -> doc id of the live corpus, keyed on (corpus, generation)
+        self._doc_ids: tuple[_Corpus, int, dict[str, int]] | None = None
+        self._load()
+
+    def _load(self) -> bool:
+        """Memory-map a previously saved index, if there is a usable one."""
+        if not self.index_path.exists():
+            return False
+        try:
+            store = _IndexFile(self.index_path)
+        except Exception:
+            return False
+        self._close_store()
+        self._store = store
+        self._bm25 = _BM25Lite.from_file(store)
+        self._corpus = _Corpus(
+            list(store.header["paths"]),
+            [tuple(fp) for fp in store.header["fingerprints"]],
+        )
+        return True
+
+    async def _save(self) -> None:
+        self.generation += 1
+        bm25, corpus = self._bm25, self._corpus
+        if not bm25 or not corpus:
+            return
+        tmp = self.index_path.with_name(self.index_path.name + ".tmp")
+        try:
+            # writing only reads the index, so searches keep being served
+            await asyncio.get_running_loop().run_in_executor(
+                None, _write_index, tmp, bm25, corpus
+            )
+        except Exception:
+            try:
+                tmp.unlink()
+            except OSError:
+                pass
+            return
+        if self._store is None:
+            os.replace(tmp, self.index_path)
+            return
+        # the in-memory index may still read lazily from the old mapping;
+        # swap to the file just written (Windows can't replace a mapped file)
+        self._close_store()
+        os.replace(tmp, self.index_path)
+        if not self._load():
+            self._bm25 = None
+            self._corpus = None
+
+    def _close_store(self) -> None:
+        if self._store is not None:
+            self._store.close()
+            self._store = None
+
+    def close(self) -> None:
+        self._close_store()
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+        if self._vectors is not None:
+            self._vectors.close()
+            self._vectors = None
 
     def _iter_files(self) -> list[Path]:
         root = self.config.root
-        files = []
-        for p in root.rglob("*"):
-            if p.is_file() and p.suffix.lower() in {
-                ".py",
-                ".js",
-                ".ts",
-                ".json",
-                ".md",
-                ".txt",
-                ".tsx",
-                ".jsx",
-            }:
-                if str(p).startswith(str(self.config.ai_memory_dir)):
-                    continue
-                files.append(p)
-        return files
-
-    async def build(self) -> dict[str, Any]:
-        files = self._iter_files()
-        tokenized = []
-        paths = []
-        for p in files:
-            try:
-                text = p.read_text(encoding="utf-8", errors="ignore")
-            except Exception:
+        patterns = list(DEFAULT_IGNORE_PATTERNS)
+        try:
+            memory_dir = self.config.ai_memory_dir.relative_to(root)
+            patterns.append(f"/{memory_dir.as_posix()}/")
+        except ValueError:
+            pass
+        return [
+            Path(p)
+            for p in walk_files(root, extensions=_INDEX_SUFFIXES, patterns=patterns)
+        ]
+
+    def _executor(self) -> Executor:
+        if self._pool is None:
+            if self.use_processes and self.workers > 1:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    async def build(self, full: bool = False) -> dict[str, Any]:
+        """Bring the index up to date with the tree.
+
+        By default only files whose (mtime, size) changed are re-read, and
+        only files whose content hash changed are re-tokenized. ``full``
+        forces a from-scratch rebuild, which also happens when there is no
+        index yet or when removed documents outnumber live ones.
+
+        Files are read and tokenized on a worker pool with at most
+        ``2 * workers`` chunks (``2 * workers * _BUILD_CHUNK`` files on an
+        incremental update) in flight. Walking the tree, merging chunks into
+        a from-scratch index and writing the index file run on the default
+        executor, so other requests keep being served while a large tree is
+        indexed.
+        """
+        async with self._build_lock:
+            loop = asyncio.get_running_loop()
+            files = await loop.run_in_executor(None, self._iter_files)
+            bm25, corpus = self._bm25, self._corpus
+            executor = self._executor()
+            if (
+                not full
+                and bm25 is not None
+                and corpus is not None
+                and len(corpus.paths) - bm25.n_docs <= bm25.n_docs
+            ):
+                return await self._update(executor, files, bm25, corpus)
+            return await self._rebuild(executor, files)
+
+    async def _rebuild(self, executor: Executor, files: list[Path]) -> dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        chunks = (
+            [str(p) for p in files[i : i + _BUILD_CHUNK]]
+            for i in range(0, len(files), _BUILD_CHUNK)
+        )
+        bm25 = _BM25Lite([])
+        corpus = _Corpus([], [])
+        pending: deque[asyncio.Future[_Partial]] = deque()
+        # the new index isn't visible to searches yet: merge off the loop
+        for chunk in chunks:
+            pending.append(loop.run_in_executor(executor, _index_chunk, chunk))
+            if len(pending) < 2 * self.workers:
                 continue
-            tokens = [t for t in text.split() if t]
-            tokenized.append(tokens)
-            paths.append(str(p))
-        if not tokenized:
+            part = await pending.popleft()
+            await loop.run_in_executor(None, self._merge, bm25, corpus, part)
+        while pending:
+            part = await pending.popleft()
+            await loop.run_in_executor(None, self._merge, bm25, corpus, part)
+        await loop.run_in_executor(None, bm25.refresh)
+
+        # searches may still be reading the previous index until here
+        self._close_store()
+        if not corpus.paths:
             self._bm25 = None
             self._corpus = _Corpus([], [])
-            return {"ok": True, "docs": 0}
-        bm25 = _BM25Lite(tokenized)
+            try:
+                self.index_path.unlink()
+            except OSError:
+                pass
+            return {"ok": True, "docs": 0, "incremental": False, "memory_mb": 0.0}
         self._bm25 = bm25
-        self._corpus = _Corpus(tokenized, paths)
-        return {"ok": True, "docs": len(paths)}
+        self._corpus = corpus
+        await self._save()
+        return {
+            "ok": True,
+            "docs": bm25.n_docs,
+            "incremental": False,
+            "memory_mb": self._memory_mb(),
+        }
 
-    async def search(self, query: str | None, k: int = 10) -> dict[str, Any]:
+    @staticmethod
+    def _merge(bm25: _BM25Lite, corpus: _Corpus, part: _Partial) -> None:
+        bm25.add_partial(part)
+        corpus.paths.extend(part.paths)
+        corpus.fingerprints.extend(part.fingerprints)
+
+    async def _update(
+        self,
+        executor: Executor,
+        files: list[Path],
+        bm25: _BM25Lite,
+        corpus: _Corpus,
+    ) -> dict[str, Any]:
+        known, candidates = await asyncio.get_running_loop().run_in_executor(
+            None, _stat_changes, files, corpus
+        )
+        added = updated = removed = 0
+        dirty = False
+
+        def drop(doc_id: int) -> None:
+            bm25.remove_document(doc_id)
+            corpus.paths[doc_id] = None
+            corpus.fingerprints[doc_id] = (0, 0, "")
+
+        async for (path, doc_id), doc in self._read_documents(executor, candidates):
+            if doc is None:
+                if doc_id is not None:
+                    known[path] = doc_id
+                continue
+            tokens, first, fingerprint = doc
+            if doc_id is not None:
+                if fingerprint[2] == corpus.fingerprints[doc_id][2]:
+                    # touched but unchanged: just remember the new stat
+                    corpus.fingerprints[doc_id] = fingerprint
+                    dirty = True
+                    continue
+                drop(doc_id)
+                updated += 1
+            else:
+                added += 1
+            bm25.add_document(tokens, first)
+            corpus.paths.append(path)
+            corpus.fingerprints.append(fingerprint)
+
+        for doc_id in known.values():
+            drop(doc_id)
+            removed += 1
+
+        if added or updated or removed:
+            bm25.refresh()
+            dirty = True
+        if dirty:
+            await self._save()
+        return {
+            "ok": True,
+            "docs": bm25.n_docs,
+            "incremental": True,
+            "added": added,
+            "updated": updated,
+            "removed": removed,
+            "memory_mb": self._memory_mb(),
+        }
+
+    async def _read_documents(
+        self, executor: Executor, candidates: list[tuple[str, int | None]]
+    ) -> AsyncIterator[tuple[tuple[str, int | None], Any]]:
+        """Read ``candidates`` on ``executor``, yielding in order with a
+        bounded number of reads in flight."""
+        loop = asyncio.get_running_loop()
+        limit = 2 * self.workers * _BUILD_CHUNK
+        pending: deque[tuple[tuple[str, int | None], asyncio.Future]] = deque()
+        for candidate in candidates:
+            pending.append(
+                (candidate, loop.run_in_executor(executor, _read_document, candidate[0]))
+            )
+            if len(pending) < limit:
+                continue
+            candidate, future = pending.popleft()
+            yield candidate, await future
+        while pending:
+            candidate, future = pending.popleft()
+            yield candidate, await future
+
+    def _memory_mb(self) -> float:
+        if self._bm25 is None:
+            return 0.0
+        return round(self._bm25.memory_usage()["total"] / (1024 * 1024), 2)
+
+    def get_stats(self) -> dict[str, Any]:
+        """Index size and approximate memory use."""
+        bm25, corpus = self._bm25, self._corpus
+        if bm25 is None or corpus is None:
+            return {"docs": 0, "terms": 0, "memory_mb": 0.0}
+        usage = bm25.memory_usage()
+        mb = 1024 * 1024
+        return {
+            "docs": bm25.n_docs,
+            "removed_slots": len(corpus.paths) - bm25.n_docs,
+            "terms": len(bm25.doc_freq),
+            "index_path": str(self.index_path),
+            "index_file_mb": round(usage["mapped"] / mb, 2),
+            "memory_mb": round(usage["total"] / mb, 2),
+            "memory_breakdown_mb": {
+                name: round(size / mb, 2)
+                for name, size in usage.items()
+                if name not in ("total", "mapped")
+            },
+            "vectors": len(self._vectors) if self._vectors is not None else 0,
+        }
+
+    async def _sync_vectors(self) -> tuple[VectorStore, dict[str, int]]:
+        """Embed files added or changed since the last vector search.
+
+        Returns the store and the doc id of every indexed path.
+        """
+        async with self._vector_lock:
+            corpus = self._corpus
+            embedder = get_embedder(self.config)
+            store = self._vectors
+            if store is None or store.model != embedder.name:
+                store = self._vectors = VectorStore(
+                    self.index_path.with_name("vectors.npy"),
+                    embedder.dim,
+                    embedder.name,
+                )
+            doc_ids = self._path_ids(corpus)
+            for path in [key for key in store.rows if key not in doc_ids]:
+                store.remove(path)
+            stale = [
+                (path, corpus.fingerprints[doc_id][2])
+                for path, doc_id in doc_ids.items()
+                if store.tag(path) != corpus.fingerprints[doc_id][2]
+            ]
+            if stale:
+                paths = [path for path, _ in stale]
+
+                def embed() -> list:
+                    return encode_batched(embedder, [_read_head(p) for p in paths])
+
+                vectors = await asyncio.get_running_loop().run_in_executor(
+                    None, embed
+                )
+                store.upsert(paths, vectors, [digest for _, digest in stale])
+            store.save()
+            return store, doc_ids
+
+    def _path_ids(self, corpus: _Corpus) -> dict[str, int]:
+        """Doc id of every live path in ``corpus`` (cached per index generation)."""
+        cached = self._doc_ids
+        if cached is not None and cached[0] is corpus and cached[1] == self.generation:
+            return cached[2]
+        doc_ids = {
+            path: doc_id for doc_id, path in enumerate(corpus.paths) if path is not None
+        }
+        self._doc_ids = (corpus, self.generation, doc_ids)
+        return doc_ids
+
+    async def _vector_top_k(self, query: str, k: int) -> list[tuple[str, float]]:
+        store, _ = await self._sync_vectors()
+        query_vector = get_embedder(self.config).encode([query])[0]
+        return store.search(query_vector, k)
+
+    async def search(
+        self, query: str | None, k: int = 10, mode: str = "bm25"
+    ) -> dict[str, Any]:
+        """Top ``k`` files for ``query``.
+
+        ``mode`` is "bm25" (lexical, default) or "vector" (cosine similarity
+        of file embeddings; falls back to a hashing embedder offline).
+        """
         if not query:
             return {"ok": True, "hits": []}
         if not self._bm25 or not self._corpus:
-            await self.build()
-        if not self._bm25 or not self._corpus or not self._corpus.docs:
+            if self._build_lock.locked():
+                # a concurrent search already started the first build
+                async with self._build_lock:
+                    pass
+            if not self._bm25 or not self._corpus:
+                await self.build()
+        if not self._bm25 or not self._corpus or not self._corpus.paths:
             return {"ok": True, "hits": []}
-        tokens = [t for t in query.split() if t]
-        scores = self._bm25.get_scores(tokens)
-        ranked = sorted(enumerate(scores), key=lambda x: x[1], reverse=True)[:k]
+        tokens = tokenize_code(query)
+        if mode == "vector":
+            scored = await self._vector_top_k(query, k)
+            # a build may have swapped (and unmapped) the index during the
+            # await: resolve paths against whatever index is live now
+            bm25, corpus = self._bm25, self._corpus
+            if not bm25 or not corpus:
+                return {"ok": True, "hits": []}
+            doc_ids = self._path_ids(corpus)
+            ranked = [(doc_ids[path], score) for path, score in scored if path in doc_ids]
+        else:
+            bm25, corpus = self._bm25, self._corpus
+            ranked = bm25.top_k(tokens, k)
+        terms = set(tokens)
         hits = []
         for idx, score in ranked:
-            path = self._corpus.paths[idx]
-            try:
-                preview = Path(path).read_text(encoding="utf-8", errors="ignore")[:500]
-            except Exception:
-                preview = ""
-            hits.append({"path": path, "score": float(score), "preview": preview})
+            path = corpus.paths[idx]
+            if path is None:
+                # removed by an update still in progress
+                continue
+            first = bm25.first_offsets(idx, terms)
+            anchor = _snippet_start(
+                [(offset, bm25._idf(term)) for term, offset in first.items()]
+            )
+            offset, preview = _read_snippet(path, anchor)
+            hits.append(
+                {
+                    "path": path,
+                    "score": float(score),
+                    "preview": preview,
+                    "offset": offset,
+                    "highlights": _highlights(preview, terms),
+                }
+            )
         return {"ok": True, "hits": hits}
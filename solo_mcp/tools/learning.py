@@ -9,9 +9,9 @@ from enum import Enum
 from datetime import datetime, timedelta
 from collections import defaultdict, deque
 import statistics
-import re
 
 from ..config import SoloConfig
+from ..utils.text_utils import QUERY_KEYWORD_TOKENIZER
 
 # 使用 TYPE_CHECKING 避免循环导入
 if TYPE_CHECKING:
@@ -256,48 +256,7 @@ class PatternAnalyzer:
 
     def _extract_keywords(self, text: str) -> List[str]:
         """提取关键词"""
-        # 简化的关键词提取
-        words = re.findall(r"\b[a-zA-Z_][a-zA-Z0-9_]*\b", text.lower())
-        stop_words = {
-            "the",
-            "a",
-            "an",
-            "and",
-            "or",
-            "but",
-            "in",
-            "on",
-            "at",
-            "to",
-            "for",
-            "of",
-            "with",
-            "by",
-            "is",
-            "are",
-            "was",
-            "were",
-            "be",
-            "been",
-            "have",
-            "has",
-            "had",
-            "do",
-            "does",
-            "did",
-            "will",
-            "would",
-            "could",
-            "should",
-            "how",
-            "what",
-            "when",
-            "where",
-            "why",
-            "who",
-            "which",
-        }
-        return [word for word in words if word not in stop_words and len(word) > 2][:10]
+        return QUERY_KEYWORD_TOKENIZER.tokenize(text)[:10]
 
 
 class LearningEngine:
@@ -1,20 +1,24 @@
 from __future__ import annotations
 
-import json
+import heapq
+import math
 import time
-from pathlib import Path
-from typing import Any, Dict, List, Optional, TYPE_CHECKING
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, TYPE_CHECKING
 from dataclasses import dataclass, asdict
 from enum import Enum
 from datetime import datetime, timedelta
-from collections import defaultdict, deque, OrderedDict
-import statistics
+from collections import Counter, defaultdict, OrderedDict
 import hashlib
-import re
+import pickle
+import sys
 import threading
-from typing import Union
 
 from ..config import SoloConfig
+from ..utils.size_utils import result_size
+from ..utils.text_utils import KEYWORD_TOKENIZER
+from ..utils.timer_wheel import TimerWheel
+from .memory_store import MemoryJournal, SQLiteMemoryStore
+from .vector import VectorStore, encode_batched, get_embedder
 
 # 使用 TYPE_CHECKING 避免循环导入
 if TYPE_CHECKING:
@@ -59,144 +63,223 @@ class MemoryItem:
         if self.metadata is None:
             self.metadata = {}
 
+    def to_dict(self) -> Dict[str, Any]:
+        """转换为可 JSON 序列化的字典（memories.json 的记录格式）"""
+        memory_dict = asdict(self)
+        memory_dict["created_at"] = self.created_at.isoformat()
+        memory_dict["last_accessed"] = self.last_accessed.isoformat()
+        memory_dict["memory_type"] = self.memory_type.value
+        memory_dict["priority"] = self.priority.value
+        if self.expiry_date:
+            memory_dict["expiry_date"] = self.expiry_date.isoformat()
+        return memory_dict
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "MemoryItem":
+        """从 ``to_dict`` 的结果恢复记忆项（不修改传入的字典）"""
+        memory_dict = dict(data)
+        # 转换时间字段
+        memory_dict["created_at"] = datetime.fromisoformat(memory_dict["created_at"])
+        memory_dict["last_accessed"] = datetime.fromisoformat(
+            memory_dict["last_accessed"]
+        )
+        if memory_dict.get("expiry_date"):
+            memory_dict["expiry_date"] = datetime.fromisoformat(
+                memory_dict["expiry_date"]
+            )
+
+        # 转换枚举字段
+        memory_dict["memory_type"] = MemoryType(memory_dict["memory_type"])
+        memory_dict["priority"] = Priority(memory_dict["priority"])
+        return cls(**memory_dict)
+
 
 class MemoryIndex:
-    """记忆索引系统"""
+    """记忆索引系统
+
+    每条记忆分配一个整数句柄，各索引的倒排表是句柄集合；同时按句柄记录该记忆写入了
+    哪些索引键，移除时无需重新分词，也无需在列表中线性查找。
+
+    关键词倒排表额外记录词频（句柄 -> tf），并按句柄保存文档长度，检索时可直接计算
+    BM25 分数，不必再读取记忆正文。
+    """
+
+    # BM25 参数
+    k1 = 1.2
+    b = 0.75
 
     def __init__(self):
-        self.keyword_index: Dict[str, List[str]] = defaultdict(list)
-        self.tag_index: Dict[str, List[str]] = defaultdict(list)
-        self.type_index: Dict[MemoryType, List[str]] = defaultdict(list)
-        self.priority_index: Dict[Priority, List[str]] = defaultdict(list)
-        self.date_index: Dict[str, List[str]] = defaultdict(list)  # YYYY-MM-DD format
+        self.keyword_index: Dict[str, Dict[int, int]] = {}
+        self.tag_index: Dict[str, Set[int]] = {}
+        self.type_index: Dict[MemoryType, Set[int]] = {}
+        self.priority_index: Dict[Priority, Set[int]] = {}
+        self.date_index: Dict[str, Set[int]] = {}  # YYYY-MM-DD format
+
+        # 记忆 id <-> 句柄；移除后句柄回收复用
+        self._handles: Dict[str, int] = {}
+        self._ids: List[Optional[str]] = []
+        self._free: List[int] = []
+        # 句柄 -> 写入过的索引键 (keywords, tags, type, priority, date)
+        self._entries: Dict[int, tuple] = {}
+        # 句柄 -> 关键词总数（BM25 文档长度）
+        self._lengths: List[int] = []
+        self._total_length = 0
+
+    def __len__(self) -> int:
+        return len(self._handles)
+
+    def _acquire(self, memory_id: str) -> int:
+        if self._free:
+            handle = self._free.pop()
+            self._ids[handle] = memory_id
+        else:
+            handle = len(self._ids)
+            self._ids.append(memory_id)
+            self._lengths.append(0)
+        self._handles[memory_id] = handle
+        return handle
+
+    @staticmethod
+    def _post(index: Dict[Any, Set[int]], key: Any, handle: int):
+        bucket = index.get(key)
+        if bucket is None:
+            index[key] = {handle}
+        else:
+            bucket.add(handle)
+
+    @staticmethod
+    def _unpost(index: Dict[Any, Set[int]], key: Any, handle: int):
+        bucket = index.get(key)
+        if bucket is not None:
+            bucket.discard(handle)
+            if not bucket:
+                del index[key]
 
     def add_memory(self, memory: MemoryItem):
-        """添加记忆到索引"""
+        """添加记忆到索引（同一 id 重复添加时先移除旧条目）"""
         memory_id = memory.id
+        if memory_id in self._handles:
+            self.remove_memory(memory_id, memory)
+        handle = self._acquire(memory_id)
+
+        tokens = KEYWORD_TOKENIZER.tokenize(memory.content)
+        keywords = Counter(tokens)
+        self._lengths[handle] = len(tokens)
+        self._total_length += len(tokens)
+        tags = tuple(dict.fromkeys(memory.tags))
+        date_key = memory.created_at.strftime("%Y-%m-%d")
+        self._entries[handle] = (
+            tuple(keywords),
+            tags,
+            memory.memory_type,
+            memory.priority,
+            date_key,
+        )
 
         # 关键词索引
-        keywords = self._extract_keywords(memory.content)
-        for keyword in keywords:
-            self.keyword_index[keyword].append(memory_id)
+        keyword_index = self.keyword_index
+        for keyword, tf in keywords.items():
+            bucket = keyword_index.get(keyword)
+            if bucket is None:
+                keyword_index[keyword] = {handle: tf}
+            else:
+                bucket[handle] = tf
 
         # 标签索引
-        for tag in memory.tags:
-            self.tag_index[tag].append(memory_id)
-
-        # 类型索引
-        self.type_index[memory.memory_type].append(memory_id)
-
-        # 优先级索引
-        self.priority_index[memory.priority].append(memory_id)
+        for tag in tags:
+            self._post(self.tag_index, tag, handle)
 
-        # 日期索引
-        date_key = memory.created_at.strftime("%Y-%m-%d")
-        self.date_index[date_key].append(memory_id)
+        # 类型、优先级、日期索引
+        self._post(self.type_index, memory.memory_type, handle)
+        self._post(self.priority_index, memory.priority, handle)
+        self._post(self.date_index, date_key, handle)
 
-    def remove_memory(self, memory_id: str, memory: MemoryItem):
-        """从索引中移除记忆"""
-        # 从关键词索引移除
-        keywords = self._extract_keywords(memory.content)
+    def remove_memory(self, memory_id: str, memory: Optional[MemoryItem] = None):
+        """从索引中移除记忆（按记录的索引键移除，不依赖 ``memory`` 的当前内容）"""
+        handle = self._handles.pop(memory_id, None)
+        if handle is None:
+            return
+        keywords, tags, memory_type, priority, date_key = self._entries.pop(handle)
         for keyword in keywords:
-            if memory_id in self.keyword_index[keyword]:
-                self.keyword_index[keyword].remove(memory_id)
-
-        # 从标签索引移除
-        for tag in memory.tags:
-            if memory_id in self.tag_index[tag]:
-                self.tag_index[tag].remove(memory_id)
-
-        # 从类型索引移除
-        if memory_id in self.type_index[memory.memory_type]:
-            self.type_index[memory.memory_type].remove(memory_id)
-
-        # 从优先级索引移除
-        if memory_id in self.priority_index[memory.priority]:
-            self.priority_index[memory.priority].remove(memory_id)
+            bucket = self.keyword_index[keyword]
+            del bucket[handle]
+            if not bucket:
+                del self.keyword_index[keyword]
+        self._total_length -= self._lengths[handle]
+        self._lengths[handle] = 0
+        for tag in tags:
+            self._unpost(self.tag_index, tag, handle)
+        self._unpost(self.type_index, memory_type, handle)
+        self._unpost(self.priority_index, priority, handle)
+        self._unpost(self.date_index, date_key, handle)
+        self._ids[handle] = None
+        self._free.append(handle)
 
-        # 从日期索引移除
-        date_key = memory.created_at.strftime("%Y-%m-%d")
-        if memory_id in self.date_index[date_key]:
-            self.date_index[date_key].remove(memory_id)
+    def _to_ids(self, handles: Iterable[int]) -> List[str]:
+        ids = self._ids
+        return [ids[h] for h in handles]
 
     def search_by_keywords(self, keywords: List[str]) -> List[str]:
-        """通过关键词搜索"""
-        result_sets = []
-        for keyword in keywords:
-            if keyword in self.keyword_index:
-                result_sets.append(set(self.keyword_index[keyword]))
-
+        """通过关键词搜索（命中的关键词取交集，未收录的关键词忽略）"""
+        result_sets = [
+            self.keyword_index[k] for k in set(keywords) if k in self.keyword_index
+        ]
         if not result_sets:
             return []
 
-        # 取交集
-        result = result_sets[0]
-        for result_set in result_sets[1:]:
-            result = result.intersection(result_set)
+        # 从最小的倒排表开始取交集
+        result_sets.sort(key=len)
+        smallest, rest = result_sets[0], result_sets[1:]
+        return self._to_ids(
+            h for h in smallest if all(h in postings for postings in rest)
+        )
 
-        return list(result)
+    def score_keywords(self, keywords: List[str]) -> Dict[str, float]:
+        """按 BM25 为命中任一关键词的记忆打分（取并集）
+
+        分数按查询中已收录关键词的理论上限归一化到 [0, 1]，未收录的关键词忽略。
+        """
+        n = len(self._handles)
+        if not n:
+            return {}
+        k1, b = self.k1, self.b
+        avgdl = self._total_length / n or 1.0
+        lengths = self._lengths
+        scores: Dict[int, float] = defaultdict(float)
+        max_score = 0.0
+        for keyword in set(keywords):
+            postings = self.keyword_index.get(keyword)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1.0 + (n - df + 0.5) / (df + 0.5))
+            max_score += idf * (k1 + 1.0)
+            for handle, tf in postings.items():
+                norm = k1 * (1.0 - b + b * lengths[handle] / avgdl)
+                scores[handle] += idf * tf * (k1 + 1.0) / (tf + norm)
+        if not max_score:
+            return {}
+        ids = self._ids
+        return {ids[h]: score / max_score for h, score in scores.items()}
 
     def search_by_tags(self, tags: List[str]) -> List[str]:
-        """通过标签搜索"""
-        result_sets = []
-        for tag in tags:
-            if tag in self.tag_index:
-                result_sets.append(set(self.tag_index[tag]))
-
+        """通过标签搜索（取并集）"""
+        result_sets = [self.tag_index[t] for t in set(tags) if t in self.tag_index]
         if not result_sets:
             return []
-
-        # 取并集
-        result = result_sets[0]
-        for result_set in result_sets[1:]:
-            result = result.union(result_set)
-
-        return list(result)
+        return self._to_ids(set().union(*result_sets))
 
     def search_by_type(self, memory_type: MemoryType) -> List[str]:
         """通过类型搜索"""
-        return list(self.type_index[memory_type])
+        return self._to_ids(self.type_index.get(memory_type, ()))
 
     def search_by_priority(self, priority: Priority) -> List[str]:
         """通过优先级搜索"""
-        return list(self.priority_index[priority])
+        return self._to_ids(self.priority_index.get(priority, ()))
 
     def _extract_keywords(self, text: str) -> List[str]:
         """提取关键词"""
-        words = re.findall(r"\b[a-zA-Z_][a-zA-Z0-9_]*\b", text.lower())
-        stop_words = {
-            "the",
-            "a",
-            "an",
-            "and",
-            "or",
-            "but",
-            "in",
-            "on",
-            "at",
-            "to",
-            "for",
-            "of",
-            "with",
-            "by",
-            "is",
-            "are",
-            "was",
-            "were",
-            "be",
-            "been",
-            "have",
-            "has",
-            "had",
-            "do",
-            "does",
-            "did",
-            "will",
-            "would",
-            "could",
-            "should",
-        }
-        return [word for word in words if word not in stop_words and len(word) > 2][:20]
+        return KEYWORD_TOKENIZER.tokenize(text)[:20]
 
 
 @dataclass
@@ -216,29 +299,212 @@ class CacheItem:
             self.last_accessed = datetime.now()
 
 
+# 计数减半查找表（草图老化用）
+_HALVE = bytes(i >> 1 for i in range(256))
+
+
+class CountMinSketch:
+    """计数最小草图：用 ``depth`` 行 4 位饱和计数器估计键的访问频率
+
+    累计 ``10 * capacity`` 次有效增量后所有计数减半（老化），频率反映近期热度。
+    键的哈希是确定性的，同样的访问序列在每次运行中得到同样的估计。
+    """
+
+    # 各行的乘法-移位哈希种子（64 位奇数）
+    _SEEDS = (
+        0x9E3779B97F4A7C15,
+        0xC2B2AE3D27D4EB4F,
+        0x165667B19E3779F9,
+        0xD6E8FEB86659FD93,
+        0xFF51AFD7ED558CCD,
+        0xC4CEB9FE1A85EC53,
+        0x27D4EB2F165667C5,
+        0x94D049BB133111EB,
+    )
+
+    def __init__(self, capacity: int, depth: int = 4):
+        capacity = max(capacity, 1)
+        bits = max(4, (2 * capacity - 1).bit_length())
+        self.width = 1 << bits
+        self._shift = 64 - bits
+        self.depth = min(depth, len(self._SEEDS))
+        self._seeds = self._SEEDS[: self.depth]
+        self.table = [bytearray(self.width) for _ in range(self.depth)]
+        self.sample_size = 10 * capacity
+        self.additions = 0
+
+    def _slots(self, key: str) -> List[int]:
+        # 不用 hash()：它按进程随机化（PYTHONHASHSEED），准入决策会因运行而异
+        h = int.from_bytes(
+            hashlib.blake2b(
+                key.encode("utf-8", "surrogatepass"), digest_size=8
+            ).digest(),
+            "little",
+        )
+        shift = self._shift
+        return [((h * seed) & 0xFFFFFFFFFFFFFFFF) >> shift for seed in self._seeds]
+
+    def increment(self, key: str):
+        added = False
+        for row, slot in zip(self.table, self._slots(key)):
+            if row[slot] < 15:
+                row[slot] += 1
+                added = True
+        if added:
+            self.additions += 1
+            if self.additions >= self.sample_size:
+                for row in self.table:
+                    row[:] = row.translate(_HALVE)
+                self.additions //= 2
+
+    def estimate(self, key: str) -> int:
+        return min(row[slot] for row, slot in zip(self.table, self._slots(key)))
+
+
+class WTinyLFU:
+    """W-TinyLFU 淘汰策略（只管理键的顺序，值由缓存管理器保存）
+
+    新键先进入约占 1% 容量的窗口 LRU；窗口溢出时，被挤出的候选与主区
+    （分段 LRU：probation 20% / protected 80%）的淘汰者比较草图估计的频率，
+    只有更频繁时才被接纳，否则直接丢弃。一次性查询因此挤不掉热点项。
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max(max_size, 1)
+        self.window_size = max(1, self.max_size // 100)
+        self.main_size = max(1, self.max_size - self.window_size)
+        self.protected_size = max(1, int(self.main_size * 0.8))
+        self.window: OrderedDict[str, None] = OrderedDict()
+        self.probation: OrderedDict[str, None] = OrderedDict()
+        self.protected: OrderedDict[str, None] = OrderedDict()
+        self.sketch = CountMinSketch(self.max_size)
+        self.admitted = 0
+        self.rejected = 0
+
+    def record(self, key: str):
+        """记录一次访问（命中和未命中都计入频率）"""
+        self.sketch.increment(key)
+
+    def on_hit(self, key: str):
+        if key in self.window:
+            self.window.move_to_end(key)
+        elif key in self.probation:
+            # 再次命中：晋升到 protected，溢出的最旧项降回 probation
+            del self.probation[key]
+            self.protected[key] = None
+            if len(self.protected) > self.protected_size:
+                demoted, _ = self.protected.popitem(last=False)
+                self.probation[demoted] = None
+        elif key in self.protected:
+            self.protected.move_to_end(key)
+
+    def insert(self, key: str) -> List[str]:
+        """加入新键，返回需要从缓存中移除的键"""
+        self.window[key] = None
+        if len(self.window) <= self.window_size:
+            return []
+        candidate, _ = self.window.popitem(last=False)
+        if len(self.probation) + len(self.protected) < self.main_size:
+            self.probation[candidate] = None
+            return []
+        victim = next(iter(self.probation or self.protected))
+        if self.sketch.estimate(candidate) > self.sketch.estimate(victim):
+            self.remove(victim)
+            self.probation[candidate] = None
+            self.admitted += 1
+            return [victim]
+        self.rejected += 1
+        return [candidate]
+
+    def victim(self) -> Optional[str]:
+        """内存超限时的下一个淘汰者"""
+        for segment in (self.probation, self.protected, self.window):
+            if segment:
+                return next(iter(segment))
+        return None
+
+    def remove(self, key: str):
+        for segment in (self.window, self.probation, self.protected):
+            if key in segment:
+                del segment[key]
+                return
+
+    def clear(self):
+        self.window.clear()
+        self.probation.clear()
+        self.protected.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "window": len(self.window),
+            "probation": len(self.probation),
+            "protected": len(self.protected),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
+
+
 class ContextCacheManager:
-    """上下文缓存管理器 - 实现 LRU+优先级的缓存策略"""
+    """上下文缓存管理器 - 实现 LRU+优先级的缓存策略
+
+    每个优先级一条 LRU 队列（OrderedDict，最久未访问的在队首）。写入时只驱逐
+    优先级严格低于新项的缓存项，从最低优先级队列的队首开始，每次驱逐 O(1)。
 
-    def __init__(self, max_size: int = 1000, max_memory_mb: int = 100):
+    ``policy="tinylfu"`` 改用 :class:`WTinyLFU` 的准入与淘汰（不再按优先级驱逐，
+    优先级只用于统计）。
+
+    缓存项大小在写入时计算一次并记录在 ``CacheItem.size`` 上。``serialize=True``
+    时值以 pickle（protocol 5）字节串保存：大小即字节数，读取时反序列化，
+    调用方拿到的是副本，修改它不会影响缓存。
+
+    传入 ``timer_wheel`` 时带 TTL 的缓存项登记到时间轮，到期后由时间轮回调删除；
+    否则只在读取时惰性检查，``cleanup_expired`` 扫描全部缓存项。
+    """
+
+    POLICIES = ("lru", "tinylfu")
+
+    def __init__(
+        self,
+        max_size: int = 1000,
+        max_memory_mb: int = 100,
+        policy: str = "lru",
+        serialize: bool = False,
+        timer_wheel: Optional[TimerWheel] = None,
+    ):
+        if policy not in self.POLICIES:
+            raise ValueError(f"未知的缓存策略: {policy}")
+        self.policy = policy
+        self.serialize = serialize
+        self.timer_wheel = timer_wheel
+        self._tinylfu = WTinyLFU(max_size) if policy == "tinylfu" else None
         self.max_size = max_size
         self.max_memory_bytes = max_memory_mb * 1024 * 1024
-        self.cache: OrderedDict[str, CacheItem] = OrderedDict()
-        self.priority_index: Dict[Priority, Set[str]] = {
-            Priority.LOW: set(),
-            Priority.MEDIUM: set(),
-            Priority.HIGH: set(),
-            Priority.CRITICAL: set(),
+        self.cache: Dict[str, CacheItem] = {}
+        self.priority_index: Dict[Priority, OrderedDict[str, CacheItem]] = {
+            priority: OrderedDict() for priority in Priority
+        }
+        # 各优先级队列占用的字节数
+        self._priority_bytes: Dict[Priority, int] = {
+            priority: 0 for priority in Priority
         }
         self.current_memory_usage = 0
         self._lock = threading.RLock()
 
         # 缓存统计
-        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "total_requests": 0}
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "total_requests": 0,
+        }
 
     def get(self, key: str) -> Optional[Any]:
         """获取缓存项"""
         with self._lock:
             self.stats["total_requests"] += 1
+            if self._tinylfu is not None:
+                self._tinylfu.record(key)
 
             if key not in self.cache:
                 self.stats["misses"] += 1
@@ -258,9 +524,14 @@ class ContextCacheManager:
             item.access_count += 1
             item.last_accessed = datetime.now()
 
-            # 移动到末尾（LRU策略）
-            self.cache.move_to_end(key)
+            if self._tinylfu is not None:
+                self._tinylfu.on_hit(key)
+            else:
+                # 移动到所在优先级队列的末尾（LRU策略）
+                self.priority_index[item.priority].move_to_end(key)
 
+            if self.serialize:
+                return pickle.loads(item.value)
             return item.value
 
     def put(
@@ -271,12 +542,19 @@ class ContextCacheManager:
         ttl_hours: Optional[int] = None,
     ) -> bool:
         """存储缓存项"""
+        if self.serialize:
+            value = pickle.dumps(value, protocol=5)
         with self._lock:
             # 计算大小
             size = self._calculate_size(value)
 
+            if self._tinylfu is not None:
+                if size > self.max_memory_bytes:
+                    return False
+                if key in self.cache:
+                    self._remove_item(key)
             # 检查是否需要清理空间
-            if not self._ensure_space(size, priority):
+            elif not self._ensure_space(size, priority):
                 return False
 
             # 设置TTL
@@ -301,8 +579,20 @@ class ContextCacheManager:
 
             # 添加到缓存
             self.cache[key] = item
-            self.priority_index[priority].add(key)
+            self.priority_index[priority][key] = item
+            self._priority_bytes[priority] += size
             self.current_memory_usage += size
+            if ttl is not None and self.timer_wheel is not None:
+                self.timer_wheel.schedule((id(self), key), ttl.timestamp(), self._expire)
+
+            if self._tinylfu is not None:
+                for victim in self._tinylfu.insert(key):
+                    self._remove_item(victim)
+                    self.stats["evictions"] += 1
+                while self.current_memory_usage > self.max_memory_bytes:
+                    self._remove_item(self._tinylfu.victim())
+                    self.stats["evictions"] += 1
+                return key in self.cache
 
             return True
 
@@ -318,9 +608,12 @@ class ContextCacheManager:
         """清空缓存"""
         with self._lock:
             self.cache.clear()
-            for priority_set in self.priority_index.values():
-                priority_set.clear()
+            for priority in Priority:
+                self.priority_index[priority].clear()
+                self._priority_bytes[priority] = 0
             self.current_memory_usage = 0
+            if self._tinylfu is not None:
+                self._tinylfu.clear()
 
     def get_stats(self) -> Dict[str, Any]:
         """获取缓存统计信息"""
@@ -328,7 +621,8 @@ class ContextCacheManager:
             total_requests = self.stats["total_requests"]
             hit_rate = self.stats["hits"] / max(total_requests, 1)
 
-            return {
+            stats = {
+                "policy": self.policy,
                 "size": len(self.cache),
                 "max_size": self.max_size,
                 "memory_usage_mb": self.current_memory_usage / (1024 * 1024),
@@ -338,11 +632,15 @@ class ContextCacheManager:
                 "hits": self.stats["hits"],
                 "misses": self.stats["misses"],
                 "evictions": self.stats["evictions"],
+                "expirations": self.stats["expirations"],
                 "priority_distribution": {
                     priority.name: len(keys)
                     for priority, keys in self.priority_index.items()
                 },
             }
+            if self._tinylfu is not None:
+                stats["tinylfu"] = self._tinylfu.get_stats()
+            return stats
 
     def _ensure_space(self, required_size: int, new_priority: Priority) -> bool:
         """确保有足够空间"""
@@ -359,90 +657,77 @@ class ContextCacheManager:
         return True
 
     def _evict_by_memory(self, required_size: int, new_priority: Priority) -> bool:
-        """基于内存使用进行驱逐"""
-        freed_memory = 0
-        candidates = self._get_eviction_candidates(new_priority)
-
-        for key in candidates:
-            if freed_memory >= required_size:
-                break
-
-            item = self.cache[key]
-            freed_memory += item.size
-            self._remove_item(key)
-            self.stats["evictions"] += 1
+        """基于内存使用进行驱逐（可驱逐的总量不足时不驱逐任何项）"""
+        needed = self.current_memory_usage + required_size - self.max_memory_bytes
+        evictable = sum(
+            self._priority_bytes[p] for p in Priority if p.value < new_priority.value
+        )
+        if evictable < needed:
+            return False
 
-        return freed_memory >= required_size
+        freed_memory = 0
+        while freed_memory < needed:
+            freed_memory += self._evict_one(new_priority)
+        return True
 
     def _evict_by_count(self, new_priority: Priority) -> bool:
         """基于数量进行驱逐"""
-        candidates = self._get_eviction_candidates(new_priority)
-
-        if candidates:
-            key = candidates[0]
-            self._remove_item(key)
-            self.stats["evictions"] += 1
-            return True
-
-        return False
-
-    def _get_eviction_candidates(self, new_priority: Priority) -> List[str]:
-        """获取驱逐候选项（优先级+LRU策略）"""
-        candidates = []
+        return self._evict_one(new_priority) >= 0
 
-        # 按优先级从低到高排序
-        for priority in [
-            Priority.LOW,
-            Priority.MEDIUM,
-            Priority.HIGH,
-            Priority.CRITICAL,
-        ]:
+    def _evict_one(self, new_priority: Priority) -> int:
+        """驱逐优先级低于 ``new_priority`` 的最久未访问项，返回释放的字节数；
+        没有可驱逐项时返回 -1"""
+        for priority in Priority:
             if priority.value >= new_priority.value:
                 break
-
-            # 在同一优先级内按LRU排序（最少使用的在前）
-            priority_keys = list(self.priority_index[priority])
-            priority_items = [
-                (key, self.cache[key]) for key in priority_keys if key in self.cache
-            ]
-
-            # 按访问时间和访问次数排序
-            priority_items.sort(
-                key=lambda x: (
-                    x[1].last_accessed,  # 最后访问时间
-                    x[1].access_count,  # 访问次数
-                )
-            )
-
-            candidates.extend([key for key, _ in priority_items])
-
-        return candidates
+            queue = self.priority_index[priority]
+            if queue:
+                item = next(iter(queue.values()))
+                self._remove_item(item.key)
+                self.stats["evictions"] += 1
+                return item.size
+        return -1
 
     def _remove_item(self, key: str):
         """移除缓存项"""
-        if key in self.cache:
-            item = self.cache[key]
-            del self.cache[key]
-            self.priority_index[item.priority].discard(key)
+        item = self.cache.pop(key, None)
+        if item is not None:
+            del self.priority_index[item.priority][key]
+            self._priority_bytes[item.priority] -= item.size
             self.current_memory_usage -= item.size
+            if self._tinylfu is not None:
+                self._tinylfu.remove(key)
+            if item.ttl is not None and self.timer_wheel is not None:
+                self.timer_wheel.cancel((id(self), key))
+
+    def _expire(self, timer_key: tuple):
+        """时间轮回调：删除到期的缓存项"""
+        key = timer_key[1]
+        with self._lock:
+            item = self.cache.get(key)
+            if item is not None and item.ttl is not None:
+                self._remove_item(key)
+                self.stats["expirations"] += 1
 
     def _calculate_size(self, value: Any) -> int:
-        """计算值的大小（简化实现）"""
+        """估算值的大小（字节）
+
+        已序列化的 bytes 和纯 ASCII 字符串为 O(1)；其他值与分发器记录事件一样用
+        ``result_size`` 按结构估算，不序列化（只有 ``serialize=True`` 时才 pickle，
+        且直接用序列化结果的长度）。
+        """
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            return len(value)
         if isinstance(value, str):
-            return len(value.encode("utf-8"))
-        elif isinstance(value, (list, tuple)):
-            return sum(self._calculate_size(item) for item in value)
-        elif isinstance(value, dict):
-            return sum(
-                self._calculate_size(k) + self._calculate_size(v)
-                for k, v in value.items()
-            )
-        else:
-            # 对于其他类型，使用字符串表示的长度作为近似
-            return len(str(value).encode("utf-8"))
+            # isascii() 读取的是字符串对象上的标志位，不扫描内容
+            return len(value) if value.isascii() else len(value.encode("utf-8"))
+        return result_size(value)
 
     def cleanup_expired(self):
-        """清理过期项"""
+        """清理过期项（有时间轮时只推进时间轮，不扫描缓存）"""
+        if self.timer_wheel is not None:
+            self.timer_wheel.advance()
+            return
         with self._lock:
             now = datetime.now()
             expired_keys = []
@@ -458,17 +743,75 @@ class ContextCacheManager:
 class SmartMemoryManager:
     """智能记忆管理器"""
 
-    def __init__(self, max_memories: int = 10000):
+    def __init__(
+        self,
+        max_memories: int = 10000,
+        backend: Optional[SQLiteMemoryStore] = None,
+        timer_wheel: Optional[TimerWheel] = None,
+    ):
         self.max_memories = max_memories
         self.memories: Dict[str, MemoryItem] = {}
         self.index = MemoryIndex()
 
+        # 可选的按需查询后端：此时 memories 只缓存热点记忆，max_memories 是缓存上限，
+        # 检索和摘要直接查询后端，超出缓存的记忆不会被删除
+        self.backend = backend
+
+        # 可选的时间轮：有过期时间的记忆到期后由时间轮回调清理
+        self.timer_wheel = timer_wheel
+
         # 智能管理参数
         self.relevance_threshold = 0.3
+        self.text_weight = 0.8
         self.access_weight = 0.4
         self.recency_weight = 0.3
         self.priority_weight = 0.3
 
+        # 持久化钩子：记忆被清理/访问时通知存储层（MemoryTool 接入日志）
+        self.on_evict: Optional[Callable[[str], None]] = None
+        self.on_access: Optional[Callable[[MemoryItem], None]] = None
+
+    def _drop(self, memory_id: str):
+        memory = self.memories.pop(memory_id)
+        self.index.remove_memory(memory_id, memory)
+        if memory.expiry_date and self.timer_wheel is not None:
+            self.timer_wheel.cancel((id(self), memory_id))
+
+    def _schedule_expiry(self, memory: MemoryItem):
+        if memory.expiry_date and self.timer_wheel is not None:
+            self.timer_wheel.schedule(
+                (id(self), memory.id), memory.expiry_date.timestamp(), self._expire
+            )
+
+    def _expire(self, timer_key: tuple):
+        """时间轮回调：清理到期的记忆"""
+        memory = self.memories.get(timer_key[1])
+        if memory is not None and memory.expiry_date:
+            self._evict(memory.id)
+
+    def _evict(self, memory_id: str):
+        self._drop(memory_id)
+        if self.on_evict:
+            self.on_evict(memory_id)
+
+    def _cached(self, item: Dict[str, Any]) -> MemoryItem:
+        """后端返回的记忆字典 -> 缓存中的 MemoryItem"""
+        memory = self.memories.get(item["id"])
+        if memory is None:
+            memory = MemoryItem.from_dict(item)
+            if len(self.memories) >= self.max_memories:
+                self._cleanup_memories()
+            self.memories[memory.id] = memory
+            self.index.add_memory(memory)
+            self._schedule_expiry(memory)
+        return memory
+
+    def _touch(self, memory: MemoryItem):
+        memory.last_accessed = datetime.now()
+        memory.access_count += 1
+        if self.on_access:
+            self.on_access(memory)
+
     def store_memory(self, memory: MemoryItem) -> bool:
         """存储记忆"""
         # 检查是否需要清理空间
@@ -478,18 +821,26 @@ class SmartMemoryManager:
         # 存储记忆
         self.memories[memory.id] = memory
         self.index.add_memory(memory)
+        self._schedule_expiry(memory)
 
         return True
 
+    def peek_memory(self, memory_id: str) -> Optional[MemoryItem]:
+        """按 id 取记忆（必要时从后端载入缓存），不更新访问信息"""
+        memory = self.memories.get(memory_id)
+        if memory is None and self.backend is not None:
+            item = self.backend.get(memory_id)
+            if item is not None:
+                memory = self._cached(item)
+        return memory
+
     def retrieve_memory(self, memory_id: str) -> Optional[MemoryItem]:
         """检索记忆"""
-        if memory_id in self.memories:
-            memory = self.memories[memory_id]
+        memory = self.peek_memory(memory_id)
+        if memory is not None:
             # 更新访问信息
-            memory.last_accessed = datetime.now()
-            memory.access_count += 1
-            return memory
-        return None
+            self._touch(memory)
+        return memory
 
     def search_memories(
         self,
@@ -498,48 +849,64 @@ class SmartMemoryManager:
         tags: Optional[List[str]] = None,
         limit: int = 10,
     ) -> List[MemoryItem]:
-        """智能搜索记忆"""
+        """智能搜索记忆
+
+        候选为命中任一关键词（BM25 打分）或任一标签的记忆，叠加访问频率、新近性和
+        优先级加权后用堆取前 ``limit`` 个；按原始分数排序，``relevance_score``
+        上限为 1.0。
+        """
         candidate_ids = set()
 
-        # 关键词搜索
+        # 关键词检索（BM25，取并集）
         keywords = self.index._extract_keywords(query)
-        if keywords:
-            keyword_results = self.index.search_by_keywords(keywords)
-            candidate_ids.update(keyword_results)
+        if self.backend is not None:
+            rows = self.backend.search(
+                keywords,
+                tags=tags,
+                memory_type=memory_type.value if memory_type else None,
+                limit=max(limit * 10, 100),
+            )
+            candidate_ids = {self._cached(row).id for row in rows}
+        text_scores = self.index.score_keywords(keywords) if keywords else {}
+        if self.backend is None:
+            candidate_ids.update(text_scores)
 
         # 标签搜索
-        if tags:
+        if tags and self.backend is None:
             tag_results = self.index.search_by_tags(tags)
             candidate_ids.update(tag_results)
 
         # 类型过滤
-        if memory_type:
+        if memory_type and self.backend is None:
             type_results = self.index.search_by_type(memory_type)
             if candidate_ids:
-                candidate_ids = candidate_ids.intersection(set(type_results))
+                candidate_ids = candidate_ids.intersection(type_results)
             else:
                 candidate_ids = set(type_results)
 
-        # 获取候选记忆
-        candidates = []
+        # 计算相关性分数
+        now = datetime.now()
+        scored = []
         for memory_id in candidate_ids:
-            if memory_id in self.memories:
-                memory = self.memories[memory_id]
-                # 计算相关性分数
-                relevance = self._calculate_relevance(memory, query, keywords)
-                if relevance >= self.relevance_threshold:
-                    memory.relevance_score = relevance
-                    candidates.append(memory)
-
-        # 按相关性排序
-        candidates.sort(key=lambda m: m.relevance_score, reverse=True)
-
-        # 更新访问信息
-        for memory in candidates[:limit]:
-            memory.last_accessed = datetime.now()
-            memory.access_count += 1
+            memory = self.memories.get(memory_id)
+            if memory is None:
+                continue
+            # 已过期但时间轮尚未清理的记忆
+            if memory.expiry_date and memory.expiry_date <= now:
+                continue
+            relevance = self._calculate_relevance(
+                memory, text_scores.get(memory_id, 0.0), now
+            )
+            if relevance >= self.relevance_threshold:
+                scored.append((relevance, memory_id, memory))
 
-        return candidates[:limit]
+        results = []
+        for relevance, _, memory in heapq.nlargest(limit, scored):
+            memory.relevance_score = min(relevance, 1.0)
+            # 更新访问信息
+            self._touch(memory)
+            results.append(memory)
+        return results
 
     def get_summary(
         self, memory_type: Optional[MemoryType] = None, days: int = 7
@@ -548,10 +915,19 @@ class SmartMemoryManager:
         cutoff_date = datetime.now() - timedelta(days=days)
 
         recent_memories = []
-        for memory in self.memories.values():
-            if memory.created_at >= cutoff_date:
-                if memory_type is None or memory.memory_type == memory_type:
-                    recent_memories.append(memory)
+        if self.backend is not None:
+            for item in self.backend.recent(
+                cutoff_date.isoformat(), memory_type.value if memory_type else None
+            ):
+                memory = self.memories.get(item["id"]) or MemoryItem.from_dict(item)
+                recent_memories.append(memory)
+            total_memories = self.backend.count()
+        else:
+            for memory in self.memories.values():
+                if memory.created_at >= cutoff_date:
+                    if memory_type is None or memory.memory_type == memory_type:
+                        recent_memories.append(memory)
+            total_memories = len(self.memories)
 
         # 统计信息
         type_counts = defaultdict(int)
@@ -570,7 +946,7 @@ class SmartMemoryManager:
         )[:5]
 
         return {
-            "total_memories": len(self.memories),
+            "total_memories": total_memories,
             "recent_memories": len(recent_memories),
             "type_distribution": dict(type_counts),
             "priority_distribution": dict(priority_counts),
@@ -591,30 +967,20 @@ class SmartMemoryManager:
         }
 
     def _calculate_relevance(
-        self, memory: MemoryItem, query: str, keywords: List[str]
+        self, memory: MemoryItem, text_score: float, now: Optional[datetime] = None
     ) -> float:
-        """计算记忆相关性"""
-        score = 0.0
-
-        # 关键词匹配分数
-        content_lower = memory.content.lower()
-        query_lower = query.lower()
+        """计算记忆相关性（未截断，``text_score`` 为归一化的 BM25 分数）"""
+        now = now or datetime.now()
 
-        # 直接匹配
-        if query_lower in content_lower:
-            score += 0.5
-
-        # 关键词匹配
-        keyword_matches = sum(1 for keyword in keywords if keyword in content_lower)
-        if keywords:
-            score += (keyword_matches / len(keywords)) * 0.3
+        # 文本匹配分数
+        score = text_score * self.text_weight
 
         # 访问频率分数
         access_score = min(memory.access_count / 10.0, 1.0) * self.access_weight
         score += access_score
 
         # 时间新近性分数
-        days_old = (datetime.now() - memory.created_at).days
+        days_old = (now - memory.created_at).days
         recency_score = max(0, 1 - days_old / 30.0) * self.recency_weight
         score += recency_score
 
@@ -622,10 +988,23 @@ class SmartMemoryManager:
         priority_score = (memory.priority.value / 4.0) * self.priority_weight
         score += priority_score
 
-        return min(score, 1.0)
+        return score
 
     def _cleanup_memories(self):
         """清理记忆空间"""
+        if self.backend is not None:
+            # 后端模式：删除后端中过期的记忆，缓存满时只从缓存中移除
+            for memory_id in self.backend.delete_expired(datetime.now().isoformat()):
+                if memory_id in self.memories:
+                    self._drop(memory_id)
+            if len(self.memories) >= self.max_memories:
+                memory_scores = sorted(
+                    self.memories.values(), key=self._calculate_importance
+                )
+                for memory in memory_scores[: max(1, len(memory_scores) // 5)]:
+                    self._drop(memory.id)
+            return
+
         # 移除过期的记忆
         expired_ids = []
         for memory_id, memory in self.memories.items():
@@ -633,9 +1012,7 @@ class SmartMemoryManager:
                 expired_ids.append(memory_id)
 
         for memory_id in expired_ids:
-            memory = self.memories[memory_id]
-            self.index.remove_memory(memory_id, memory)
-            del self.memories[memory_id]
+            self._evict(memory_id)
 
         # 如果还是太多，移除最不重要的记忆
         if len(self.memories) >= self.max_memories:
@@ -650,9 +1027,7 @@ class SmartMemoryManager:
             remove_count = int(len(memory_scores) * 0.2)
 
             for memory_id, _ in memory_scores[:remove_count]:
-                memory = self.memories[memory_id]
-                self.index.remove_memory(memory_id, memory)
-                del self.memories[memory_id]
+                self._evict(memory_id)
 
     def _calculate_importance(self, memory: MemoryItem) -> float:
         """计算记忆重要性"""
@@ -675,7 +1050,13 @@ class MemoryTool:
     """记忆工具"""
 
     def __init__(
-        self, config: SoloConfig, enable_cache: bool = True, cache_size: int = 100
+        self,
+        config: SoloConfig,
+        enable_cache: bool = True,
+        cache_size: int = 100,
+        storage: str = "journal",
+        cache_policy: str = "lru",
+        cache_serialize: bool = False,
     ):
         self.config = config
         self.memory_dir = config.ai_memory_dir / "memories"
@@ -684,14 +1065,44 @@ class MemoryTool:
         self.memory_file = self.memory_dir / "memories.json"
         self.index_file = self.memory_dir / "index.json"
 
+        # 持久化后端：
+        # - "journal"（默认）：memories.json 快照 + 追加日志，启动时全部载入内存
+        # - "sqlite"：memories.db（WAL + FTS5），按需查询，内存中只缓存热点记忆
+        self.storage_mode = storage
+        if storage == "sqlite":
+            self.storage = SQLiteMemoryStore(self.memory_dir / "memories.db")
+            backend = self.storage
+        else:
+            self.storage = MemoryJournal(
+                self.memory_file, self.memory_dir / "memories.journal"
+            )
+            backend = None
+
+        # 缓存 TTL 与记忆过期共用的时间轮，由 start_expiry() 启动的后台任务推进
+        self.timer_wheel = TimerWheel()
+
         # 智能记忆管理器
-        self.smart_manager = SmartMemoryManager()
+        self.smart_manager = SmartMemoryManager(
+            backend=backend, timer_wheel=self.timer_wheel
+        )
+        self.smart_manager.on_evict = self._on_evict
+        self.smart_manager.on_access = self._persist_access
+
+        # 向量检索（load(mode="vector")）首次使用时才载入嵌入模型和向量文件
+        self.vectors: Optional[VectorStore] = None
+        self._embedder: Optional[Any] = None
 
         # 初始化缓存管理器
         self.enable_cache = enable_cache
         if enable_cache:
+            # cache_policy: "lru"（优先级 + LRU）或 "tinylfu"（W-TinyLFU 准入）
+            # cache_serialize: 以 pickle 字节串缓存 load 结果（大小精确、返回副本）
             self.cache_manager = ContextCacheManager(
-                max_size=cache_size, max_memory_mb=50  # 50MB 缓存限制
+                max_size=cache_size,
+                max_memory_mb=50,  # 50MB 缓存限制
+                policy=cache_policy,
+                serialize=cache_serialize,
+                timer_wheel=self.timer_wheel,
             )
         else:
             self.cache_manager = None
@@ -794,8 +1205,12 @@ class MemoryTool:
             success = self.smart_manager.store_memory(memory)
 
             if success:
-                # 保存到文件
-                self._save_memories()
+                # 持久化（追加一条日志记录 / 写入一行）
+                self.storage.put(memory.to_dict())
+                if self.vectors is not None:
+                    self.vectors.upsert(
+                        [memory.id], self._embedder.encode([memory.content])
+                    )
 
                 # 记录性能指标
                 response_time = time.time() - start_time
@@ -835,15 +1250,22 @@ class MemoryTool:
         memory_type: Optional[str] = None,
         tags: Optional[List[str]] = None,
         limit: int = 5,
+        mode: str = "keyword",
     ) -> List[Dict[str, Any]]:
-        """加载记忆"""
+        """加载记忆
+
+        ``mode`` 为 "keyword"（默认，BM25 + 访问/新近性/优先级加权）或
+        "vector"（嵌入向量的余弦相似度）。
+        """
         start_time = time.time()
 
         try:
             # 检查缓存
             cache_key = None
             if self.cache_manager:
-                cache_key = self._generate_cache_key(query, memory_type, tags, limit)
+                cache_key = self._generate_cache_key(
+                    query, memory_type, tags, limit, mode
+                )
                 cached_result = self.cache_manager.get(cache_key)
                 if cached_result is not None:
                     return cached_result
@@ -877,9 +1299,12 @@ class MemoryTool:
                     pass
 
             # 搜索记忆
-            memories = self.smart_manager.search_memories(
-                query=query, memory_type=mem_type, tags=tags, limit=limit
-            )
+            if mode == "vector":
+                memories = self._vector_search(query, mem_type, tags, limit)
+            else:
+                memories = self.smart_manager.search_memories(
+                    query=query, memory_type=mem_type, tags=tags, limit=limit
+                )
 
             # 转换为字典格式
             result = []
@@ -1029,7 +1454,7 @@ class MemoryTool:
         success_rate = self.operation_stats["successful_operations"] / max(total_ops, 1)
 
         stats = {
-            "total_memories": len(self.smart_manager.memories),
+            "total_memories": len(self.storage),
             "total_operations": total_ops,
             "success_rate": success_rate,
             "avg_response_time": avg_response_time,
@@ -1044,6 +1469,10 @@ class MemoryTool:
         if self.cache_manager:
             stats["cache_stats"] = self.cache_manager.get_stats()
 
+        stats["storage"] = {"mode": self.storage_mode, **self.storage.get_stats()}
+        if self.vectors is not None:
+            stats["vectors"] = {"model": self.vectors.model, "count": len(self.vectors)}
+
         return stats
 
     def get_optimization_recommendations(self) -> List[Dict[str, Any]]:
@@ -1156,9 +1585,12 @@ class MemoryTool:
         memory_type: Optional[str],
         tags: Optional[List[str]],
         limit: int,
+        mode: str = "keyword",
     ) -> str:
         """生成缓存键"""
         key_parts = [query, str(memory_type), str(sorted(tags or [])), str(limit)]
+        if mode != "keyword":
+            key_parts.append(mode)
         key_string = "|".join(key_parts)
         return hashlib.md5(key_string.encode()).hexdigest()
 
@@ -1172,55 +1604,131 @@ class MemoryTool:
         if self.cache_manager:
             self.cache_manager.cleanup_expired()
 
+    def _on_evict(self, memory_id: str):
+        self.storage.delete(memory_id)
+        if self.vectors is not None:
+            self.vectors.remove(memory_id)
+
+    def _vector_store(self) -> VectorStore:
+        """载入向量文件，并为尚无向量的记忆批量计算嵌入"""
+        if self.vectors is not None:
+            return self.vectors
+        embedder = get_embedder(self.config)
+        store = VectorStore(
+            self.memory_dir / "memory_vectors.npy", embedder.dim, embedder.name
+        )
+        if self.smart_manager.backend is not None:
+            ids = self.storage.ids()
+        else:
+            ids = list(self.smart_manager.memories)
+        live = set(ids)
+        for memory_id in [key for key in store.rows if key not in live]:
+            store.remove(memory_id)
+        missing = [memory_id for memory_id in ids if memory_id not in store]
+        if missing:
+            if self.smart_manager.backend is not None:
+                contents = self.storage.get_contents(missing)
+                missing = [m for m in missing if m in contents]
+            else:
+                contents = {m: self.smart_manager.memories[m].content for m in missing}
+        if missing:
+            store.upsert(
+                missing, encode_batched(embedder, [contents[m] for m in missing])
+            )
+        store.save()
+        self._embedder = embedder
+        self.vectors = store
+        return store
+
+    def _vector_search(
+        self,
+        query: str,
+        memory_type: Optional[MemoryType],
+        tags: Optional[List[str]],
+        limit: int,
+    ) -> List[MemoryItem]:
+        """按嵌入向量的余弦相似度检索记忆（有过滤条件时多取候选再过滤）"""
+        store = self._vector_store()
+        query_vector = self._embedder.encode([query])[0]
+        wanted = set(tags or ())
+        fetch = limit * 5 if memory_type or wanted else limit
+        results = []
+        for memory_id, score in store.search(query_vector, fetch):
+            memory = self.smart_manager.peek_memory(memory_id)
+            if memory is None:
+                continue
+            if memory_type and memory.memory_type != memory_type:
+                continue
+            if wanted and wanted.isdisjoint(memory.tags):
+                continue
+            if memory.expiry_date and memory.expiry_date <= datetime.now():
+                continue
+            memory.relevance_score = max(0.0, min(score, 1.0))
+            self.smart_manager._touch(memory)
+            results.append(memory)
+            if len(results) >= limit:
+                break
+        return results
+
+    def _persist_access(self, memory: MemoryItem):
+        self.storage.access(
+            memory.id, memory.last_accessed.isoformat(), memory.access_count
+        )
+
     def _save_memories(self):
-        """保存记忆到文件"""
+        """把日志压缩为 memories.json 快照（SQLite 后端为 WAL checkpoint）"""
         try:
-            memories_data = []
-            for memory in self.smart_manager.memories.values():
-                memory_dict = asdict(memory)
-                memory_dict["created_at"] = memory.created_at.isoformat()
-                memory_dict["last_accessed"] = memory.last_accessed.isoformat()
-                memory_dict["memory_type"] = memory.memory_type.value
-                memory_dict["priority"] = memory.priority.value
-                if memory.expiry_date:
-                    memory_dict["expiry_date"] = memory.expiry_date.isoformat()
-                memories_data.append(memory_dict)
-
-            with open(self.memory_file, "w", encoding="utf-8") as f:
-                json.dump(memories_data, f, ensure_ascii=False, indent=2)
+            self.storage.compact()
+            if self.vectors is not None:
+                self.vectors.save()
         except Exception as e:
-            print(f"Error saving memories: {e}")
+            print(f"Error saving memories: {e}", file=sys.stderr)
 
     def _load_memories(self):
-        """从文件加载记忆"""
-        if not self.memory_file.exists():
+        """从快照和日志加载记忆（SQLite 后端按需查询，不预加载）"""
+        if isinstance(self.storage, SQLiteMemoryStore):
+            self._import_legacy_memories()
+        try:
+            memories_data = self.storage.load()
+        except Exception as e:
+            print(f"Error loading memories: {e}", file=sys.stderr)
             return
 
+        loaded = []
+        for memory_dict in memories_data.values():
+            try:
+                memory = MemoryItem.from_dict(memory_dict)
+            except Exception as e:
+                print(f"Error loading memory: {e}", file=sys.stderr)
+                continue
+            self.smart_manager.memories[memory.id] = memory
+            self.smart_manager.index.add_memory(memory)
+            loaded.append(memory)
+
+        # 已过期的记忆会在登记时立即清理（并写入日志），因此放在遍历之后
+        for memory in loaded:
+            self.smart_manager._schedule_expiry(memory)
+
+    def _import_legacy_memories(self):
+        """首次启用 SQLite 后端时导入已有的 memories.json 快照和日志"""
+        if self.storage.count() or not self.memory_file.exists():
+            return
+        journal = MemoryJournal(self.memory_file, self.memory_dir / "memories.journal")
         try:
-            with open(self.memory_file, "r", encoding="utf-8") as f:
-                memories_data = json.load(f)
-
-            for memory_dict in memories_data:
-                # 转换时间字段
-                memory_dict["created_at"] = datetime.fromisoformat(
-                    memory_dict["created_at"]
-                )
-                memory_dict["last_accessed"] = datetime.fromisoformat(
-                    memory_dict["last_accessed"]
-                )
-                if memory_dict.get("expiry_date"):
-                    memory_dict["expiry_date"] = datetime.fromisoformat(
-                        memory_dict["expiry_date"]
-                    )
-
-                # 转换枚举字段
-                memory_dict["memory_type"] = MemoryType(memory_dict["memory_type"])
-                memory_dict["priority"] = Priority(memory_dict["priority"])
-
-                # 创建记忆对象
-                memory = MemoryItem(**memory_dict)
-                self.smart_manager.memories[memory.id] = memory
-                self.smart_manager.index.add_memory(memory)
-
+            for item in journal.load().values():
+                self.storage.put(item)
         except Exception as e:
-            print(f"Error loading memories: {e}")
+            print(f"Error importing memories: {e}", file=sys.stderr)
+        finally:
+            journal.close(compact=False)
+
+    def start_expiry(self):
+        """在当前事件循环中启动时间轮的后台推进任务"""
+        return self.timer_wheel.start()
+
+    def close(self):
+        """关闭存储：等待后台压缩并写出最终快照"""
+        self.storage.close()
+        if self.vectors is not None:
+            self.vectors.save()
+            self.vectors.close()
@@ -0,0 +1,656 @@
+"""记忆持久化后端
+
+- ``MemoryJournal``：JSON 快照 + 追加写日志（write-ahead journal）。每次存储/删除/访问只向日志
+  追加一行 JSON 记录（O(1)），日志累积到一定条数后在后台线程中压缩为新的 ``memories.json``
+  快照。启动时先读快照再重放日志；进程崩溃时日志末尾可能残留半行记录，重放时丢弃并截断。
+- ``SQLiteMemoryStore``：基于标准库 ``sqlite3``（WAL 模式）的可选后端，FTS5 全文索引 +
+  B-tree 索引，查询时按需读取，启动时不加载全部记忆。
+
+两个后端都只处理记忆字典（``MemoryItem.to_dict`` 的格式），不依赖 MemoryItem。
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import queue
+import sqlite3
+import sys
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from ..utils.text_utils import KEYWORD_TOKENIZER
+
+# 日志记录类型
+OP_PUT = "put"
+OP_DELETE = "del"
+OP_ACCESS = "access"
+
+
+class MemoryJournal:
+    """记忆快照 + 追加日志
+
+    Args:
+        snapshot_path: 快照文件（memories.json）
+        journal_path: 日志文件，默认与快照同目录的 ``memories.journal``
+        compact_threshold: 日志记录数达到该值时触发后台压缩
+        fsync: 每条记录写入后是否 fsync（默认只 flush 到操作系统）
+    """
+
+    def __init__(
+        self,
+        snapshot_path: Path,
+        journal_path: Optional[Path] = None,
+        compact_threshold: int = 1000,
+        fsync: bool = False,
+    ):
+        self.snapshot_path = Path(snapshot_path)
+        self.journal_path = (
+            Path(journal_path)
+            if journal_path
+            else self.snapshot_path.with_name("memories.journal")
+        )
+        # 压缩期间被轮换出来的旧日志；压缩完成前崩溃时仍需重放
+        self.rotated_path = self.journal_path.with_name(self.journal_path.name + ".old")
+        self.compact_threshold = compact_threshold
+        self.fsync = fsync
+
+        self._lock = threading.RLock()
+        # 串行化压缩：快照在锁外写入，两次压缩交错会让旧快照覆盖新快照
+        self._compact_lock = threading.Lock()
+        self._state: Dict[str, Dict[str, Any]] = {}
+        self._fh = None
+        self._pending = 0
+        self._compactor: Optional[threading.Thread] = None
+
+        self.stats = {
+            "records": 0,
+            "replayed": 0,
+            "compactions": 0,
+            "discarded": 0,
+        }
+
+    # ---- 加载 ----
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """读取快照并重放日志，返回 id -> 记忆字典（调用方不应修改返回的字典）"""
+        with self._lock:
+            self._state = {}
+            if self.snapshot_path.exists():
+                try:
+                    with open(self.snapshot_path, "r", encoding="utf-8") as f:
+                        for item in json.load(f):
+                            self._state[item["id"]] = item
+                except Exception as e:
+                    print(f"Error loading memory snapshot: {e}", file=sys.stderr)
+            self._pending = 0
+            for path in (self.rotated_path, self.journal_path):
+                self._pending += self._replay(path)
+            self._open()
+            return self._state
+
+    def _replay(self, path: Path) -> int:
+        if not path.exists():
+            return 0
+        with open(path, "rb") as f:
+            data = f.read()
+        count = 0
+        pos = 0
+        while pos < len(data):
+            end = data.find(b"\n", pos)
+            if end < 0:
+                # 崩溃时写了一半的最后一行：丢弃并截断，避免后续追加拼接到残行上
+                self.stats["discarded"] += 1
+                with open(path, "r+b") as f:
+                    f.truncate(pos)
+                break
+            line = data[pos:end]
+            pos = end + 1
+            if not line.strip():
+                continue
+            try:
+                self._apply(json.loads(line))
+            except Exception:
+                self.stats["discarded"] += 1
+                continue
+            count += 1
+        self.stats["replayed"] += count
+        return count
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        op = record["op"]
+        if op == OP_PUT:
+            item = record["item"]
+            self._state[item["id"]] = item
+        elif op == OP_DELETE:
+            self._state.pop(record["id"], None)
+        elif op == OP_ACCESS:
+            item = self._state.get(record["id"])
+            if item is not None:
+                # 复制后再更新：后台压缩可能正在序列化旧字典
+                item = dict(item)
+                item["last_accessed"] = record["last_accessed"]
+                item["access_count"] = record["access_count"]
+                self._state[record["id"]] = item
+
+    # ---- 写入 ----
+
+    def _open(self) -> None:
+        if self._fh is None:
+            self.journal_path.parent.mkdir(parents=True, exist_ok=True)
+            self._fh = open(self.journal_path, "a", encoding="utf-8")
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+        with self._lock:
+            self._apply(record)
+            self._open()
+            self._fh.write(line + "\n")
+            self._fh.flush()
+            if self.fsync:
+                os.fsync(self._fh.fileno())
+            self.stats["records"] += 1
+            self._pending += 1
+            if self._pending >= self.compact_threshold:
+                self._start_compaction()
+
+    def put(self, item: Dict[str, Any]) -> None:
+        """写入（新增或覆盖）一条记忆"""
+        self._append({"op": OP_PUT, "item": item})
+
+    def delete(self, memory_id: str) -> None:
+        """删除一条记忆"""
+        with self._lock:
+            if memory_id not in self._state:
+                return
+        self._append({"op": OP_DELETE, "id": memory_id})
+
+    def access(self, memory_id: str, last_accessed: str, access_count: int) -> None:
+        """记录一次访问信息更新"""
+        self._append(
+            {
+                "op": OP_ACCESS,
+                "id": memory_id,
+                "last_accessed": last_accessed,
+                "access_count": access_count,
+            }
+        )
+
+    def __len__(self) -> int:
+        return len(self._state)
+
+    # ---- 压缩 ----
+
+    def _start_compaction(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(
+            target=self.compact, name="memory-journal-compactor", daemon=True
+        )
+        self._compactor.start()
+
+    def compact(self) -> bool:
+        """把当前状态写成新快照并清空日志（可在后台线程中调用）"""
+        with self._compact_lock:
+            return self._compact()
+
+    def _compact(self) -> bool:
+        with self._lock:
+            if (
+                self._pending == 0
+                and self.snapshot_path.exists()
+                and not self.rotated_path.exists()
+            ):
+                return True
+            # 轮换日志：之后的记录写入新日志，快照只需覆盖轮换前的状态
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            if self.journal_path.exists():
+                if self.rotated_path.exists():
+                    # 上次压缩未完成（如进程崩溃），两段日志都要保留到新快照写成
+                    self._merge_into_rotated()
+                else:
+                    os.replace(self.journal_path, self.rotated_path)
+            self._open()
+            items = list(self._state.values())
+            self._pending = 0
+
+        tmp = self.snapshot_path.with_name(self.snapshot_path.name + ".tmp")
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(items, f, ensure_ascii=False, indent=2)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.snapshot_path)
+        except Exception as e:
+            print(f"Error compacting memory journal: {e}", file=sys.stderr)
+            return False
+
+        with self._lock:
+            try:
+                self.rotated_path.unlink()
+            except OSError:
+                pass
+            self.stats["compactions"] += 1
+        return True
+
+    def _merge_into_rotated(self) -> None:
+        with open(self.journal_path, "rb") as src, open(self.rotated_path, "ab") as dst:
+            dst.write(src.read())
+        self.journal_path.unlink()
+
+    def wait(self) -> None:
+        """等待正在进行的后台压缩完成"""
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+
+    def close(self, compact: bool = True) -> None:
+        """关闭日志；默认先压缩为快照"""
+        self.wait()
+        if compact:
+            self.compact()
+        with self._lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+
+    def get_stats(self) -> Dict[str, Any]:
+        """日志统计信息"""
+        with self._lock:
+            try:
+                journal_bytes = self.journal_path.stat().st_size
+            except OSError:
+                journal_bytes = 0
+            return {
+                "memories": len(self._state),
+                "pending_records": self._pending,
+                "journal_bytes": journal_bytes,
+                **self.stats,
+            }
+
+
+class SQLiteMemoryStore:
+    """SQLite 记忆存储（WAL 模式 + FTS5）
+
+    与 ``MemoryJournal`` 接口兼容（load/put/delete/access/compact/close），另外提供
+    ``get``/``search``/``recent``/``count`` 等按需查询，调用方只需在内存中缓存热点记忆。
+
+    Args:
+        path: 数据库文件
+        pool_size: 连接池大小（读写共用，写操作由 SQLite 自身串行化）
+        busy_timeout: 等待写锁的秒数
+    """
+
+    _COLUMNS = (
+        "id",
+        "content",
+        "memory_type",
+        "priority",
+        "tags",
+        "context",
+        "created_at",
+        "last_accessed",
+        "access_count",
+        "relevance_score",
+        "expiry_date",
+        "metadata",
+    )
+    # 以 JSON 文本存储的字段
+    _JSON_COLUMNS = ("tags", "context", "metadata")
+    # PRAGMA user_version：1 起 FTS 行的 rowid 与 memories 的 rowid 一致
+    _SCHEMA_VERSION = 1
+    # 单条 SQL 中 IN (...) 的参数个数上限（低于 SQLite 的默认限制）
+    _MAX_PARAMS = 500
+
+    def __init__(self, path: Path, pool_size: int = 4, busy_timeout: float = 5.0):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.busy_timeout = busy_timeout
+        self._pool: "queue.Queue[sqlite3.Connection]" = queue.Queue()
+        self._connections: List[sqlite3.Connection] = []
+        self._closed = False
+        for _ in range(max(1, pool_size)):
+            conn = self._connect()
+            self._connections.append(conn)
+            self._pool.put(conn)
+        self.has_fts = self._init_schema()
+        self.stats = {"puts": 0, "deletes": 0, "accesses": 0, "queries": 0}
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(
+            str(self.path),
+            timeout=self.busy_timeout,
+            check_same_thread=False,
+            isolation_level=None,  # 显式管理事务
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        if self._closed:
+            raise RuntimeError("memory store is closed")
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        with self._connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def _init_schema(self) -> bool:
+        with self._transaction() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS memories (
+                    id TEXT PRIMARY KEY,
+                    content TEXT NOT NULL,
+                    memory_type TEXT NOT NULL,
+                    priority INTEGER NOT NULL,
+                    tags TEXT NOT NULL DEFAULT '[]',
+                    context TEXT NOT NULL DEFAULT '{}',
+                    created_at TEXT NOT NULL,
+                    last_accessed TEXT NOT NULL,
+                    access_count INTEGER NOT NULL DEFAULT 0,
+                    relevance_score REAL NOT NULL DEFAULT 0,
+                    expiry_date TEXT,
+                    metadata TEXT NOT NULL DEFAULT '{}'
+                )
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_memories_type ON memories(memory_type)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_memories_priority ON memories(priority)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_memories_created ON memories(created_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_memories_expiry ON memories(expiry_date)"
+                " WHERE expiry_date IS NOT NULL"
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS memory_tags (
+                    memory_id TEXT NOT NULL,
+                    tag TEXT NOT NULL,
+                    PRIMARY KEY (tag, memory_id)
+                ) WITHOUT ROWID
+                """
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_memory_tags_id ON memory_tags(memory_id)"
+            )
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+            try:
+                # 写入前用与内存索引相同的分词器切词，FTS5 只按空白切分并保留下划线。
+                # FTS 行的 rowid 取对应 memories 行的 rowid，更新/删除按 rowid 定位，
+                # 不必扫描 UNINDEXED 的 id 列
+                conn.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS memories_fts USING fts5("
+                    "id UNINDEXED, keywords, tokenize = \"unicode61 tokenchars '_'\")"
+                )
+                has_fts = True
+            except sqlite3.OperationalError:
+                # SQLite 未编译 FTS5：退化为 LIKE 查询
+                has_fts = False
+            if version < self._SCHEMA_VERSION:
+                if has_fts:
+                    self._rebuild_fts(conn)
+                conn.execute(f"PRAGMA user_version = {self._SCHEMA_VERSION}")
+            return has_fts
+
+    @staticmethod
+    def _fts_row(rowid: int, memory_id: str, content: str) -> Tuple[int, str, str]:
+        return rowid, memory_id, " ".join(KEYWORD_TOKENIZER.tokenize(content))
+
+    def _rebuild_fts(self, conn: sqlite3.Connection) -> None:
+        """按 memories 的 rowid 重建全文索引（旧库迁移）"""
+        conn.execute("DELETE FROM memories_fts")
+        conn.executemany(
+            "INSERT INTO memories_fts (rowid, id, keywords) VALUES (?, ?, ?)",
+            (
+                self._fts_row(*row)
+                for row in conn.execute("SELECT rowid, id, content FROM memories")
+            ),
+        )
+
+    # ---- 与 MemoryJournal 兼容的接口 ----
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """按需查询的后端不预加载记忆"""
+        return {}
+
+    def put(self, item: Dict[str, Any]) -> None:
+        """写入（新增或覆盖）一条记忆"""
+        row = [
+            json.dumps(item.get(col), ensure_ascii=False)
+            if col in self._JSON_COLUMNS
+            else item.get(col)
+            for col in self._COLUMNS
+        ]
+        memory_id = item["id"]
+        with self._transaction() as conn:
+            if self.has_fts:
+                # REPLACE 会换新 rowid，先按旧 rowid 删掉全文索引行
+                conn.execute(
+                    "DELETE FROM memories_fts WHERE rowid = "
+                    "(SELECT rowid FROM memories WHERE id = ?)",
+                    (memory_id,),
+                )
+            cursor = conn.execute(
+                f"INSERT OR REPLACE INTO memories ({', '.join(self._COLUMNS)}) "
+                f"VALUES ({', '.join('?' * len(self._COLUMNS))})",
+                row,
+            )
+            conn.execute("DELETE FROM memory_tags WHERE memory_id = ?", (memory_id,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO memory_tags (memory_id, tag) VALUES (?, ?)",
+                [(memory_id, tag) for tag in item.get("tags") or []],
+            )
+            if self.has_fts:
+                conn.execute(
+                    "INSERT INTO memories_fts (rowid, id, keywords) VALUES (?, ?, ?)",
+                    self._fts_row(cursor.lastrowid, memory_id, item["content"]),
+                )
+        self.stats["puts"] += 1
+
+    def delete(self, memory_id: str) -> None:
+        """删除一条记忆"""
+        with self._transaction() as conn:
+            self._delete(conn, [memory_id])
+        self.stats["deletes"] += 1
+
+    def _delete(self, conn: sqlite3.Connection, ids: List[str]) -> None:
+        params = [(memory_id,) for memory_id in ids]
+        if self.has_fts:
+            conn.executemany(
+                "DELETE FROM memories_fts WHERE rowid = "
+                "(SELECT rowid FROM memories WHERE id = ?)",
+                params,
+            )
+        conn.executemany("DELETE FROM memories WHERE id = ?", params)
+        conn.executemany("DELETE FROM memory_tags WHERE memory_id = ?", params)
+
+    def access(self, memory_id: str, last_accessed: str, access_count: int) -> None:
+        """记录一次访问信息更新"""
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE memories SET last_accessed = ?, access_count = ? WHERE id = ?",
+                (last_accessed, access_count, memory_id),
+            )
+        self.stats["accesses"] += 1
+
+    def compact(self) -> bool:
+        """把 WAL 合并回主库"""
+        with self._connection() as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        return True
+
+    def close(self, compact: bool = True) -> None:
+        if self._closed:
+            return
+        if compact:
+            try:
+                self.compact()
+            except sqlite3.Error:
+                pass
+        self._closed = True
+        for conn in self._connections:
+            conn.close()
+
+    # ---- 按需查询 ----
+
+    def _row_to_item(self, row: sqlite3.Row) -> Dict[str, Any]:
+        item = {col: row[col] for col in self._COLUMNS}
+        for col in self._JSON_COLUMNS:
+            item[col] = json.loads(item[col]) if item[col] else None
+        return item
+
+    def get(self, memory_id: str) -> Optional[Dict[str, Any]]:
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM memories WHERE id = ?", (memory_id,)
+            ).fetchone()
+        return self._row_to_item(row) if row else None
+
+    def search(
+        self,
+        keywords: List[str],
+        tags: Optional[List[str]] = None,
+        memory_type: Optional[str] = None,
+        limit: int = 100,
+    ) -> List[Dict[str, Any]]:
+        """关键词（任一命中，按 FTS5 bm25 排序）或标签命中的记忆，可按类型过滤"""
+        self.stats["queries"] += 1
+        selects: List[str] = []
+        params: List[Any] = []
+        if keywords:
+            if self.has_fts:
+                match = " OR ".join('"' + k.replace('"', '""') + '"' for k in keywords)
+                selects.append(
+                    "SELECT id, rank FROM memories_fts "
+                    "WHERE memories_fts MATCH ?"
+                )
+                params.append(match)
+            else:
+                selects.append(
+                    "SELECT id, 0.0 AS rank FROM memories WHERE "
+                    + " OR ".join("content LIKE ?" for _ in keywords)
+                )
+                params.extend(f"%{k}%" for k in keywords)
+        if tags:
+            selects.append(
+                "SELECT memory_id AS id, 0.0 AS rank FROM memory_tags WHERE tag IN "
+                f"({', '.join('?' * len(tags))})"
+            )
+            params.extend(tags)
+        if selects:
+            sql = (
+                "SELECT m.* FROM (SELECT id, MIN(rank) AS rank FROM ("
+                + " UNION ALL ".join(selects)
+                + ") GROUP BY id) AS hits JOIN memories AS m ON m.id = hits.id"
+            )
+            if memory_type:
+                sql += " WHERE m.memory_type = ?"
+                params.append(memory_type)
+            sql += " ORDER BY hits.rank LIMIT ?"
+        elif memory_type:
+            sql = (
+                "SELECT * FROM memories WHERE memory_type = ? "
+                "ORDER BY created_at DESC LIMIT ?"
+            )
+            params.append(memory_type)
+        else:
+            return []
+        params.append(limit)
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def ids(self) -> List[str]:
+        """所有记忆的 id（只读主键索引）"""
+        with self._connection() as conn:
+            return [row[0] for row in conn.execute("SELECT id FROM memories")]
+
+    def get_contents(self, ids: Iterable[str]) -> Dict[str, str]:
+        """按 id 批量取记忆正文，不存在的 id 被忽略"""
+        ids = list(ids)
+        out: Dict[str, str] = {}
+        with self._connection() as conn:
+            for i in range(0, len(ids), self._MAX_PARAMS):
+                chunk = ids[i : i + self._MAX_PARAMS]
+                out.update(
+                    conn.execute(
+                        "SELECT id, content FROM memories "
+                        f"WHERE id IN ({', '.join('?' * len(chunk))})",
+                        chunk,
+                    ).fetchall()
+                )
+        return out
+
+    def recent(
+        self, since: str, memory_type: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """创建时间不早于 ``since``（ISO 格式）的记忆"""
+        sql = "SELECT * FROM memories WHERE created_at >= ?"
+        params: List[Any] = [since]
+        if memory_type:
+            sql += " AND memory_type = ?"
+            params.append(memory_type)
+        with self._connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [self._row_to_item(row) for row in rows]
+
+    def delete_expired(self, now: str) -> List[str]:
+        """删除已过期的记忆，返回被删除的 id"""
+        with self._transaction() as conn:
+            ids = [
+                row[0]
+                for row in conn.execute(
+                    "SELECT id FROM memories "
+                    "WHERE expiry_date IS NOT NULL AND expiry_date < ?",
+                    (now,),
+                )
+            ]
+            if ids:
+                self._delete(conn, ids)
+        self.stats["deletes"] += len(ids)
+        return ids
+
+    def count(self) -> int:
+        with self._connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM memories").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self.count()
+
+    def get_stats(self) -> Dict[str, Any]:
+        try:
+            db_bytes = self.path.stat().st_size
+        except OSError:
+            db_bytes = 0
+        return {
+            "memories": self.count(),
+            "db_bytes": db_bytes,
+            "fts5": self.has_fts,
+            "pool_size": len(self._connections),
+            **self.stats,
+        }
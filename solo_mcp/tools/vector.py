@@ -0,0 +1,449 @@
+from __future__ import annotations
+
+import ast
+import hashlib
+import heapq
+import json
+import math
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections import Counter
+from functools import lru_cache
+from operator import mul
+from pathlib import Path
+from typing import Any, Callable, Iterable, Sequence
+
+from ..config import SoloConfig
+from ..utils.text_utils import CODE_TOKENIZER
+
+# Embeddings are stored as a float32 matrix in a version 1.0 .npy file so the
+# file can be memory-mapped with or without numpy, plus a JSON sidecar with
+# the row keys. Every vector is L2-normalized, so a dot product is the cosine.
+_NPY_MAGIC = b"\x93NUMPY\x01\x00"
+_NPY_ALIGN = 64
+_BIG_ENDIAN = sys.byteorder == "big"
+_HASHING_DIM = 256
+# below this many rows a full scan is cheaper than probing an IVF index
+_IVF_MIN_ROWS = 1024
+# rebuild the IVF index once this fraction of rows was added since the last build
+_IVF_REBUILD_RATIO = 0.25
+_IVF_ITERATIONS = 8
+
+
+@lru_cache(maxsize=None)
+def _numpy() -> Any:
+    """numpy if it is installed, else None.
+
+    Optional (vectorized scoring and the IVF index) and imported on first use,
+    so importing the index or memory tools doesn't load it.
+    """
+    try:
+        import numpy
+    except ImportError:  # pragma: no cover - depends on the environment
+        return None
+    return numpy
+
+
+def write_npy(path: Path, rows: Iterable[Sequence[float]], n_rows: int, dim: int) -> None:
+    """Write a C-order little-endian float32 matrix as a .npy file."""
+    header = "{'descr': '<f4', 'fortran_order': False, 'shape': (%d, %d), }" % (
+        n_rows,
+        dim,
+    )
+    prefix = len(_NPY_MAGIC) + 2
+    pad = -(prefix + len(header) + 1) % _NPY_ALIGN
+    header_bytes = (header + " " * pad + "\n").encode("latin-1")
+    written = 0
+    with open(path, "wb") as f:
+        f.write(_NPY_MAGIC)
+        f.write(struct.pack("<H", len(header_bytes)))
+        f.write(header_bytes)
+        for row in rows:
+            if len(row) != dim:
+                raise ValueError(f"expected {dim} values per row, got {len(row)}")
+            if isinstance(row, memoryview):
+                # already little-endian: sliced out of a mapped .npy file
+                f.write(row.tobytes())
+            else:
+                vec = array("f", row)
+                if _BIG_ENDIAN:
+                    vec.byteswap()
+                f.write(vec.tobytes())
+            written += 1
+    if written != n_rows:
+        raise ValueError(f"expected {n_rows} rows, wrote {written}")
+
+
+def _read_npy_header(buf: mmap.mmap) -> tuple[tuple[int, int], int]:
+    if buf[: len(_NPY_MAGIC)] != _NPY_MAGIC:
+        raise ValueError("not a version 1.0 .npy file")
+    start = len(_NPY_MAGIC) + 2
+    (header_len,) = struct.unpack("<H", buf[len(_NPY_MAGIC) : start])
+    header = ast.literal_eval(buf[start : start + header_len].decode("latin-1"))
+    if header["descr"] != "<f4" or header["fortran_order"]:
+        raise ValueError("expected a C-order little-endian float32 matrix")
+    n_rows, dim = header["shape"]
+    return (n_rows, dim), start + header_len
+
+
+class _MappedMatrix:
+    """Read-only float32 matrix backed by a memory-mapped .npy file."""
+
+    def __init__(self, path: Path):
+        self._file = open(path, "rb")
+        try:
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except Exception:
+            self._file.close()
+            raise
+        (self.rows, self.dim), offset = _read_npy_header(self._mmap)
+        self._view = memoryview(self._mmap)[
+            offset : offset + self.rows * self.dim * 4
+        ].cast("f")
+        self.array = None
+        np = _numpy()
+        if np is not None:
+            self.array = np.frombuffer(
+                self._mmap, dtype="<f4", count=self.rows * self.dim, offset=offset
+            ).reshape(self.rows, self.dim)
+
+    def row(self, i: int) -> memoryview:
+        return self._view[i * self.dim : (i + 1) * self.dim]
+
+    def close(self) -> None:
+        self.array = None
+        self._view.release()
+        self._mmap.close()
+        self._file.close()
+
+
+def _normalize(vec: array) -> array:
+    norm = math.sqrt(sum(map(mul, vec, vec)))
+    if norm > 0.0:
+        inv = 1.0 / norm
+        return array("f", [v * inv for v in vec])
+    return vec
+
+
+def _hash(feature: str) -> int:
+    digest = hashlib.blake2b(feature.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+@lru_cache(maxsize=1 << 16)
+def _features(token: str, dim: int) -> tuple[tuple[int, float], ...]:
+    """(bucket, signed weight) of a token and of its character trigrams.
+
+    The trigrams make near-identical words (plurals, casing variants) overlap
+    and keep one unlucky bucket collision from cancelling a whole token.
+    """
+    out = []
+    padded = f"#{token.lower()}#"
+    grams = [padded[i : i + 3] for i in range(len(padded) - 2)]
+    for feature, weight in [(token, 1.0)] + [(g, 0.5 / len(grams)) for g in grams]:
+        value = _hash(feature)
+        out.append(((value >> 1) % dim, weight if value & 1 else -weight))
+    return tuple(out)
+
+
+class HashingEmbedder:
+    """Deterministic bag-of-words embedder using the signed hashing trick.
+
+    Needs no model download, so vector search keeps working offline and in
+    tests; it only captures lexical overlap, not semantics. Tokens come from
+    the shared Unicode pipeline (CJK runs as bigrams), so Chinese memories
+    and queries embed like English ones.
+    """
+
+    def __init__(self, dim: int = _HASHING_DIM):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+        self.batch_size = 256
+
+    def encode(self, texts: Sequence[str]) -> list[array]:
+        dim = self.dim
+        out = []
+        for text in texts:
+            vec = array("f", bytes(4 * dim))
+            for token, tf in Counter(CODE_TOKENIZER.tokenize(text)).items():
+                scale = 1.0 + math.log(tf)
+                for bucket, weight in _features(token, dim):
+                    vec[bucket] += weight * scale
+            out.append(_normalize(vec))
+        return out
+
+
+class SentenceTransformerEmbedder:
+    """sentence-transformers model (loaded when the embedder is created)."""
+
+    def __init__(self, model_name: str, batch_size: int = 32):
+        from sentence_transformers import SentenceTransformer
+
+        self._model = SentenceTransformer(model_name)
+        self.dim = int(self._model.get_sentence_embedding_dimension())
+        self.name = model_name
+        self.batch_size = batch_size
+
+    def encode(self, texts: Sequence[str]) -> list[array]:
+        if not texts:
+            return []
+        matrix = self._model.encode(
+            list(texts),
+            batch_size=self.batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True,
+            show_progress_bar=False,
+        )
+        matrix = matrix.astype("<f4", copy=False)
+        return [array("f", row.tobytes()) for row in matrix]
+
+
+_EMBEDDERS: dict[str, Any] = {}
+
+
+def get_embedder(config: SoloConfig) -> HashingEmbedder | SentenceTransformerEmbedder:
+    """The configured embedding model, or the hashing embedder as a fallback.
+
+    The model is only loaded when ``enable_vector_search`` is set; loading
+    failures (missing package, no network for the download) fall back to
+    :class:`HashingEmbedder`. Instances are shared per model name.
+    """
+    name = config.model_name if config.enable_vector_search else ""
+    embedder = _EMBEDDERS.get(name)
+    if embedder is None:
+        embedder = HashingEmbedder()
+        if name:
+            try:
+                embedder = SentenceTransformerEmbedder(name)
+            except Exception:
+                pass
+        _EMBEDDERS[name] = embedder
+    return embedder
+
+
+def encode_batched(embedder: Any, texts: Sequence[str]) -> list[array]:
+    out: list[array] = []
+    step = max(1, embedder.batch_size)
+    for i in range(0, len(texts), step):
+        out.extend(embedder.encode(texts[i : i + step]))
+    return out
+
+
+class _IVFIndex:
+    """Inverted-file index: rows bucketed by their nearest k-means centroid."""
+
+    def __init__(self, matrix: Any, rows: int):
+        np = _numpy()
+        n_lists = max(1, int(math.sqrt(rows)))
+        data = matrix[:rows]
+        # deterministic init: evenly spaced rows
+        centroids = data[np.linspace(0, rows - 1, n_lists).astype(np.int64)].copy()
+        for _ in range(_IVF_ITERATIONS):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            filled = norms[:, 0] > 0
+            centroids[filled] = sums[filled] / norms[filled]
+        order = np.argsort(assign, kind="stable")
+        bounds = np.searchsorted(assign[order], np.arange(n_lists + 1))
+        self.centroids = centroids
+        self.lists = [order[bounds[i] : bounds[i + 1]] for i in range(n_lists)]
+        self.rows = rows
+        self.n_probe = max(1, min(n_lists, max(4, n_lists // 8)))
+
+    def candidates(self, query: Any) -> Any:
+        np = _numpy()
+        sims = self.centroids @ query
+        n_probe = self.n_probe
+        if n_probe < len(self.lists):
+            probe = np.argpartition(-sims, n_probe - 1)[:n_probe]
+        else:
+            probe = range(len(self.lists))
+        return np.concatenate([self.lists[i] for i in probe])
+
+
+class VectorStore:
+    """Keyed, persistent embedding matrix with top-k cosine search.
+
+    Rows loaded from disk stay memory-mapped; rows added since the last
+    :meth:`save` live in an in-memory tail. Removing a key only frees its row,
+    saving compacts the matrix. With numpy installed, stores of at least
+    ``_IVF_MIN_ROWS`` rows are searched through an IVF index (approximate);
+    otherwise every row is scanned.
+    """
+
+    def __init__(self, path: Path, dim: int, model: str):
+        self.path = path
+        self.meta_path = path.with_suffix(".json")
+        self.dim = dim
+        self.model = model
+        self.keys: list[str | None] = []
+        self.tags: list[str] = []
+        self.rows: dict[str, int] = {}
+        self._base: _MappedMatrix | None = None
+        self._tail = array("f")
+        self._dirty = False
+        self._dense = None
+        self._ivf: _IVFIndex | None = None
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.rows
+
+    def _load(self) -> None:
+        if not self.path.exists() or not self.meta_path.exists():
+            return
+        try:
+            meta = json.loads(self.meta_path.read_text(encoding="utf-8"))
+            if meta.get("model") != self.model or meta.get("dim") != self.dim:
+                return
+            base = _MappedMatrix(self.path)
+        except Exception:
+            return
+        if base.dim != self.dim or base.rows != len(meta["keys"]):
+            base.close()
+            return
+        self._base = base
+        self.keys = list(meta["keys"])
+        self.tags = list(meta.get("tags") or [""] * len(self.keys))
+        self.rows = {key: i for i, key in enumerate(self.keys)}
+
+    def _base_rows(self) -> int:
+        return self._base.rows if self._base is not None else 0
+
+    def _row(self, i: int) -> Sequence[float]:
+        base_rows = self._base_rows()
+        if i < base_rows:
+            return self._base.row(i)
+        start = (i - base_rows) * self.dim
+        return self._tail[start : start + self.dim]
+
+    def tag(self, key: str) -> str | None:
+        """Caller-defined version tag of ``key`` (e.g. a content hash)."""
+        row = self.rows.get(key)
+        return None if row is None else self.tags[row]
+
+    def upsert(
+        self, keys: Sequence[str], vectors: Sequence[array], tags: Sequence[str] = ()
+    ) -> None:
+        tags = list(tags) or [""] * len(keys)
+        # a numpy view of the tail would block resizing it
+        self._dense = None
+        for key, vec, tag in zip(keys, vectors, tags):
+            if len(vec) != self.dim:
+                raise ValueError(f"expected a {self.dim}-d vector, got {len(vec)}")
+            self.remove(key)
+            self.rows[key] = len(self.keys)
+            self.keys.append(key)
+            self.tags.append(tag)
+            self._tail.extend(vec)
+        self._dirty = True
+
+    def remove(self, key: str) -> bool:
+        row = self.rows.pop(key, None)
+        if row is None:
+            return False
+        self.keys[row] = None
+        self._dirty = True
+        return True
+
+    def save(self) -> None:
+        """Write live rows to the .npy file and re-map it."""
+        if not self._dirty:
+            return
+        live = [i for i, key in enumerate(self.keys) if key is not None]
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        write_npy(tmp, (self._row(i) for i in live), len(live), self.dim)
+        meta = {
+            "model": self.model,
+            "dim": self.dim,
+            "keys": [self.keys[i] for i in live],
+            "tags": [self.tags[i] for i in live],
+        }
+        tmp_meta = self.meta_path.with_name(self.meta_path.name + ".tmp")
+        tmp_meta.write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+        # a mapped file can't be replaced on Windows
+        self.close()
+        os.replace(tmp, self.path)
+        os.replace(tmp_meta, self.meta_path)
+        self.keys, self.tags, self.rows = [], [], {}
+        self._tail = array("f")
+        self._dirty = False
+        self._load()
+
+    def close(self) -> None:
+        self._dense = None
+        self._ivf = None
+        if self._base is not None:
+            self._base.close()
+            self._base = None
+
+    def _matrix(self) -> Any:
+        """All rows (live and freed) as one numpy matrix."""
+        if self._dense is None:
+            np = _numpy()
+            if self._tail:
+                tail = np.frombuffer(self._tail, dtype=np.float32)
+            else:
+                tail = np.empty(0, dtype=np.float32)
+            tail = tail.reshape(-1, self.dim)
+            base = self._base.array if self._base is not None else None
+            if base is None or not len(base):
+                self._dense = tail
+            elif not len(tail):
+                self._dense = base
+            else:
+                self._dense = np.vstack([base, tail])
+        return self._dense
+
+    def search(
+        self,
+        query: Sequence[float],
+        k: int = 10,
+        accept: Callable[[str], bool] | None = None,
+    ) -> list[tuple[str, float]]:
+        """Top ``k`` (key, cosine) pairs, best first; ``accept`` filters keys."""
+        if k <= 0 or not self.rows:
+            return []
+        np = _numpy()
+        if np is not None:
+            scored = self._search_numpy(np.asarray(query, dtype=np.float32))
+        else:
+            scored = (
+                (sum(map(mul, query, self._row(i))), i)
+                for i, key in enumerate(self.keys)
+                if key is not None
+            )
+        keys = self.keys
+        if accept is None:
+            pairs = ((s, i) for s, i in scored if keys[i] is not None)
+        else:
+            pairs = (
+                (s, i) for s, i in scored if keys[i] is not None and accept(keys[i])
+            )
+        return [(keys[i], float(s)) for s, i in heapq.nlargest(k, pairs)]
+
+    def _search_numpy(self, query: Any) -> Iterable[tuple[float, int]]:
+        np = _numpy()
+        matrix = self._matrix()
+        n = len(matrix)
+        ivf = self._ivf
+        if n >= _IVF_MIN_ROWS and (
+            ivf is None or n - ivf.rows > ivf.rows * _IVF_REBUILD_RATIO
+        ):
+            ivf = self._ivf = _IVFIndex(matrix, n)
+        if ivf is None:
+            rows = np.arange(n)
+        else:
+            # rows appended after the index was built are always scanned
+            rows = np.concatenate([ivf.candidates(query), np.arange(ivf.rows, n)])
+        scores = matrix[rows] @ query
+        return zip(scores.tolist(), rows.tolist())
@@ -0,0 +1,139 @@
+"""
+批量异步事件日志
+
+请求路径上只把事件追加到内存缓冲；后台线程每攒够 ``flush_every`` 条或每隔
+``flush_interval`` 秒序列化并一次性写入 JSONL 文件，文件超过 ``max_bytes``
+时按 ``events.jsonl.1``、``.2`` ... 轮转。关闭后追加的事件被丢弃并计数。
+"""
+
+from __future__ import annotations
+
+import json
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+
+class EventLog:
+    """后台批量写入的 JSONL 事件日志
+
+    Args:
+        path: 日志文件路径
+        flush_every: 缓冲条数达到该值时立即唤醒后台线程写盘
+        flush_interval: 最长写盘间隔（秒）
+        max_bytes: 单个文件的大小上限，超过后轮转；0 表示不轮转
+        backups: 保留的轮转文件数
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        flush_every: int = 64,
+        flush_interval: float = 0.5,
+        max_bytes: int = 5 * 1024 * 1024,
+        backups: int = 3,
+    ):
+        self.path = Path(path)
+        self.flush_every = flush_every
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._buffer: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        # 串行化写盘与轮转（后台线程和 flush() 调用方之间）
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._closed = False
+        self.written = 0
+        self.rotations = 0
+        self.dropped = 0
+
+    def append(self, event: Dict[str, Any]):
+        """记录一条事件（不做 I/O）；关闭后调用只计入 ``dropped``"""
+        with self._lock:
+            if self._closed:
+                self.dropped += 1
+                return
+            self._buffer.append(event)
+            pending = len(self._buffer)
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="solo-event-log", daemon=True
+                )
+                self._thread.start()
+        if pending >= self.flush_every:
+            self._wake.set()
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Event log flush failed: {e}", file=sys.stderr)
+
+    def flush(self) -> int:
+        """把缓冲中的事件写入文件，返回写入条数
+
+        写入失败时事件放回缓冲（下次刷新或关闭时重试），异常继续抛出。
+        """
+        with self._write_lock:
+            with self._lock:
+                events, self._buffer = self._buffer, []
+            if not events:
+                return 0
+            try:
+                data = "".join(
+                    json.dumps(event, ensure_ascii=False) + "\n" for event in events
+                )
+                if self.max_bytes:
+                    try:
+                        size = self.path.stat().st_size
+                    except FileNotFoundError:
+                        size = 0
+                    if size and size + len(data) > self.max_bytes:
+                        self._rotate()
+                with self.path.open("a", encoding="utf-8") as f:
+                    f.write(data)
+            except BaseException:
+                with self._lock:
+                    self._buffer[:0] = events
+                raise
+            self.written += len(events)
+            return len(events)
+
+    def _rotate(self):
+        """events.jsonl -> events.jsonl.1 -> ... -> events.jsonl.{backups}（最旧的丢弃）"""
+        if self.backups <= 0:
+            self.path.unlink(missing_ok=True)
+        else:
+            for i in range(self.backups - 1, 0, -1):
+                src = self.path.with_name(f"{self.path.name}.{i}")
+                if src.exists():
+                    src.replace(self.path.with_name(f"{self.path.name}.{i + 1}"))
+            self.path.replace(self.path.with_name(f"{self.path.name}.1"))
+        self.rotations += 1
+
+    def close(self):
+        """停止后台线程并写出剩余事件；最后一次写入失败时抛出异常"""
+        with self._lock:
+            self._closed = True
+        self._wake.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+        self.flush()
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._buffer)
+        return {
+            "pending": pending,
+            "written": self.written,
+            "rotations": self.rotations,
+            "dropped": self.dropped,
+        }
@@ -1,12 +1,37 @@
 """文件操作工具函数"""
 
 import os
+import re
 import json
-from typing import Dict, Any, Optional, List
+import fnmatch
+from typing import Dict, Any, Optional, List, Iterable, Iterator, Pattern, Tuple
 from pathlib import Path
 import mimetypes
 from datetime import datetime
 
+# 遍历时默认剪枝的目录/文件（gitignore 语法）：版本控制、依赖、虚拟环境、缓存与构建产物。
+# venv/dist/build 这类常见目录名只在根目录剪枝，避免误伤 src/build/ 之类的源码目录
+DEFAULT_IGNORE_PATTERNS = (
+    ".git/",
+    ".svn/",
+    ".hg/",
+    "node_modules/",
+    "__pycache__/",
+    ".venv/",
+    "/venv/",
+    ".tox/",
+    ".mypy_cache/",
+    ".pytest_cache/",
+    ".ruff_cache/",
+    ".eggs/",
+    "*.egg-info/",
+    "/dist/",
+    "/build/",
+)
+
+# 每个目录中读取的忽略文件，后者优先级更高
+IGNORE_FILES = (".gitignore", ".ignore")
+
 
 def read_file_content(file_path: str, encoding: str = "utf-8") -> str:
     """读取文件内容
@@ -100,8 +125,214 @@ def get_file_info(file_path: str) -> Dict[str, Any]:
         return {"exists": True, "path": file_path, "error": str(e)}
 
 
+def _glob_to_regex(pattern: str) -> str:
+    """把 gitignore 风格的通配符转换为正则（``*``/``?`` 不跨目录，``**`` 跨目录）"""
+    out: List[str] = []
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**/", i):
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+            if pattern.startswith("**", i):
+                out.append(".*")
+                i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1 : end]
+                if body[0] in "!^":
+                    body = "^" + body[1:]
+                out.append("[" + body.replace("\\", "\\\\") + "]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """一组编译好的 gitignore 风格规则
+
+    支持注释、``!`` 取反、结尾 ``/`` 仅匹配目录、含 ``/`` 的模式相对规则所在目录锚定、
+    ``*``/``?``/``[...]``/``**`` 通配。同一组规则中后出现的规则优先。
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        # (正则, 是否取反, 是否仅匹配目录)
+        self._rules: List[Tuple[Pattern[str], bool, bool]] = []
+        for line in patterns:
+            rule = self._parse(line)
+            if rule is not None:
+                self._rules.append(rule)
+        # 没有取反规则时合并为一个正则，匹配一次即可
+        self._file_re: Optional[Pattern[str]] = None
+        self._dir_re: Optional[Pattern[str]] = None
+        self._merged = not any(neg for _, neg, _ in self._rules)
+        if self._merged:
+            file_rules = [rx.pattern for rx, _, dir_only in self._rules if not dir_only]
+            dir_rules = [rx.pattern for rx, _, _ in self._rules]
+            if file_rules:
+                self._file_re = re.compile("|".join(file_rules))
+            if dir_rules:
+                self._dir_re = re.compile("|".join(dir_rules))
+
+    @staticmethod
+    def _parse(line: str) -> Optional[Tuple[Pattern[str], bool, bool]]:
+        line = line.rstrip("\r\n")
+        if not line.endswith("\\ "):
+            line = line.rstrip()
+        if not line or line.startswith("#"):
+            return None
+        negate = line.startswith("!")
+        if negate:
+            line = line[1:]
+        elif line.startswith(("\\#", "\\!")):
+            line = line[1:]
+        dir_only = line.endswith("/")
+        line = line.rstrip("/")
+        if not line:
+            return None
+        anchored = "/" in line
+        line = line.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+        return re.compile(f"(?:{prefix}{_glob_to_regex(line)})$"), negate, dir_only
+
+    @classmethod
+    def from_files(cls, paths: Iterable[str]) -> Optional["IgnoreRules"]:
+        """读取若干忽略文件（按顺序拼接），没有任何规则时返回 None"""
+        lines: List[str] = []
+        for path in paths:
+            try:
+                with open(path, "r", encoding="utf-8", errors="ignore") as f:
+                    lines.extend(f)
+            except OSError:
+                continue
+        rules = cls(lines)
+        return rules if rules else None
+
+    def __bool__(self) -> bool:
+        return bool(self._rules)
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """``rel_path``（相对规则所在目录，``/`` 分隔）命中时返回是否忽略，未命中返回 None"""
+        if self._merged:
+            rx = self._dir_re if is_dir else self._file_re
+            return True if rx is not None and rx.match(rel_path) else None
+        for rx, negate, dir_only in reversed(self._rules):
+            if dir_only and not is_dir:
+                continue
+            if rx.match(rel_path):
+                return not negate
+        return None
+
+
+def _is_ignored(
+    chain: Tuple[Tuple[str, IgnoreRules], ...], rel_path: str, is_dir: bool
+) -> bool:
+    # 越深的忽略文件优先级越高
+    for base, rules in reversed(chain):
+        verdict = rules.match(rel_path[len(base) :], is_dir)
+        if verdict is not None:
+            return verdict
+    return False
+
+
+def walk_files(
+    root: "str | os.PathLike[str]",
+    extensions: Optional[Iterable[str]] = None,
+    patterns: Iterable[str] = DEFAULT_IGNORE_PATTERNS,
+    recursive: bool = True,
+    use_ignore_files: bool = True,
+    max_size: Optional[int] = None,
+) -> Iterator[str]:
+    """基于 ``os.scandir`` 的文件遍历，在进入子目录前剪枝被忽略的目录
+
+    Args:
+        root: 遍历的根目录
+        extensions: 文件扩展名过滤器（如 ['.py']，不区分大小写）
+        patterns: 额外的 gitignore 风格忽略规则，相对根目录
+        recursive: 是否递归进入子目录
+        use_ignore_files: 是否读取各级目录中的 .gitignore/.ignore
+        max_size: 最大文件大小（字节），超过的文件被跳过
+
+    Yields:
+        文件路径（以 ``root`` 为前缀）
+    """
+    top = os.fspath(root)
+    exts = {ext.lower() for ext in extensions} if extensions else None
+    base_rules = IgnoreRules(patterns)
+    chain: Tuple[Tuple[str, IgnoreRules], ...] = (("", base_rules),) if base_rules else ()
+    stack: List[Tuple[str, str, Tuple[Tuple[str, IgnoreRules], ...]]] = [(top, "", chain)]
+    while stack:
+        path, rel_dir, chain = stack.pop()
+        try:
+            with os.scandir(path) as it:
+                entries = list(it)
+        except OSError:
+            continue
+        if use_ignore_files:
+            present = {e.name for e in entries if e.name in IGNORE_FILES}
+            if present:
+                rules = IgnoreRules.from_files(
+                    os.path.join(path, name) for name in IGNORE_FILES if name in present
+                )
+                if rules is not None:
+                    chain = chain + ((rel_dir, rules),)
+        subdirs = []
+        for entry in entries:
+            rel = rel_dir + entry.name
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    if recursive and not _is_ignored(chain, rel, True):
+                        subdirs.append((entry.path, rel + "/", chain))
+                    continue
+                if not entry.is_file():
+                    continue
+            except OSError:
+                continue
+            if exts is not None and os.path.splitext(entry.name)[1].lower() not in exts:
+                continue
+            if chain and _is_ignored(chain, rel, False):
+                continue
+            if max_size is not None:
+                try:
+                    if entry.stat().st_size > max_size:
+                        continue
+                except OSError:
+                    continue
+            yield entry.path
+        # 逆序入栈，保持目录内的遍历顺序
+        stack.extend(reversed(subdirs))
+
+
+def _compile_name_pattern(pattern: str) -> Pattern[str]:
+    flags = re.IGNORECASE if os.name == "nt" else 0
+    return re.compile(fnmatch.translate(pattern), flags)
+
+
+def _walk(directory: str, respect_ignore: bool, **kwargs: Any) -> Iterator[str]:
+    if respect_ignore:
+        return walk_files(directory, **kwargs)
+    return walk_files(directory, patterns=(), use_ignore_files=False, **kwargs)
+
+
 def list_files(
-    directory: str, pattern: str = "*", recursive: bool = False
+    directory: str,
+    pattern: str = "*",
+    recursive: bool = False,
+    respect_ignore: bool = False,
 ) -> List[str]:
     """列出目录中的文件
 
@@ -109,28 +340,38 @@ def list_files(
         directory: 目录路径
         pattern: 文件模式，默认为 '*'
         recursive: 是否递归搜索子目录
+        respect_ignore: 是否跳过默认忽略的目录（DEFAULT_IGNORE_PATTERNS）以及
+            .gitignore/.ignore 中的规则；默认列出所有文件
 
     Returns:
         文件路径列表
     """
     try:
-        path_obj = Path(directory)
-        if not path_obj.exists():
+        if not os.path.isdir(directory):
             return []
 
-        if recursive:
-            files = list(path_obj.rglob(pattern))
-        else:
-            files = list(path_obj.glob(pattern))
-
-        return [str(f) for f in files if f.is_file()]
+        if "/" in pattern or os.sep in pattern:
+            # 带目录的模式仍按 glob 语义处理
+            path_obj = Path(directory)
+            files = path_obj.rglob(pattern) if recursive else path_obj.glob(pattern)
+            return [str(f) for f in files if f.is_file()]
+
+        matcher = _compile_name_pattern(pattern)
+        return [
+            f
+            for f in _walk(directory, respect_ignore, recursive=recursive)
+            if matcher.match(os.path.basename(f))
+        ]
     except Exception as e:
         print(f"列出文件失败: {e}")
         return []
 
 
 def find_files_by_extension(
-    directory: str, extensions: List[str], recursive: bool = True
+    directory: str,
+    extensions: List[str],
+    recursive: bool = True,
+    respect_ignore: bool = False,
 ) -> List[str]:
     """根据扩展名查找文件
 
@@ -138,30 +379,20 @@ def find_files_by_extension(
         directory: 搜索目录
         extensions: 文件扩展名列表（如 ['.py', '.txt']）
         recursive: 是否递归搜索
+        respect_ignore: 是否按忽略规则剪枝（同 ``list_files``）
 
     Returns:
         匹配的文件路径列表
     """
-    files = []
-    extensions = [ext.lower() for ext in extensions]
-
     try:
-        path_obj = Path(directory)
-        if not path_obj.exists():
+        if not os.path.isdir(directory):
             return []
-
-        if recursive:
-            all_files = path_obj.rglob("*")
-        else:
-            all_files = path_obj.glob("*")
-
-        for file_path in all_files:
-            if file_path.is_file() and file_path.suffix.lower() in extensions:
-                files.append(str(file_path))
+        return list(
+            _walk(directory, respect_ignore, extensions=extensions, recursive=recursive)
+        )
     except Exception as e:
         print(f"查找文件失败: {e}")
-
-    return files
+        return []
 
 
 def search_in_files(
@@ -170,6 +401,7 @@ def search_in_files(
     file_extensions: List[str] = None,
     case_sensitive: bool = False,
     recursive: bool = True,
+    respect_ignore: bool = False,
 ) -> List[Dict[str, Any]]:
     """在文件中搜索文本
 
@@ -179,6 +411,7 @@ def search_in_files(
         file_extensions: 限制搜索的文件扩展名
         case_sensitive: 是否区分大小写
         recursive: 是否递归搜索
+        respect_ignore: 是否按忽略规则剪枝（同 ``list_files``）
 
     Returns:
         包含搜索结果的字典列表
@@ -186,9 +419,11 @@ def search_in_files(
     results = []
 
     if file_extensions:
-        files = find_files_by_extension(directory, file_extensions, recursive)
+        files = find_files_by_extension(
+            directory, file_extensions, recursive, respect_ignore=respect_ignore
+        )
     else:
-        files = list_files(directory, recursive=recursive)
+        files = list_files(directory, recursive=recursive, respect_ignore=respect_ignore)
 
     search_text_lower = search_text.lower() if not case_sensitive else search_text
 
@@ -9,7 +9,14 @@ from collections import defaultdict
 import fnmatch
 from datetime import datetime
 
-from .file_utils import read_file_content, get_file_info, _is_text_file
+from .file_utils import (
+    DEFAULT_IGNORE_PATTERNS,
+    IgnoreRules,
+    read_file_content,
+    get_file_info,
+    walk_files,
+    _is_text_file,
+)
 
 
 class SearchResult:
@@ -40,8 +47,8 @@ class FileSearcher:
         self.file_cache: Dict[str, Dict[str, Any]] = {}
         self.content_cache: Dict[str, str] = {}
 
-        # 默认忽略的目录和文件
-        self.ignore_patterns = {
+        # 默认忽略的目录和文件（gitignore 语法，另外会读取各级 .gitignore/.ignore）
+        self.ignore_patterns = set(DEFAULT_IGNORE_PATTERNS) | {
             "__pycache__",
             ".git",
             ".svn",
@@ -55,17 +62,36 @@ class FileSearcher:
             ".DS_Store",
             "Thumbs.db",
         }
+        self._compiled_rules: Optional[Tuple[frozenset, IgnoreRules]] = None
 
     def add_ignore_pattern(self, pattern: str):
         """添加忽略模式"""
         self.ignore_patterns.add(pattern)
 
+    def _ordered_patterns(self) -> List[str]:
+        # 取反规则放在最后，才能覆盖前面的忽略规则
+        return sorted(self.ignore_patterns, key=lambda p: p.startswith("!"))
+
+    def _ignore_rules(self) -> IgnoreRules:
+        """编译后的忽略规则，模式集合变化时才重新编译"""
+        key = frozenset(self.ignore_patterns)
+        if self._compiled_rules is None or self._compiled_rules[0] != key:
+            self._compiled_rules = (key, IgnoreRules(self._ordered_patterns()))
+        return self._compiled_rules[1]
+
     def should_ignore(self, path: Path) -> bool:
-        """检查是否应该忽略该路径"""
-        for pattern in self.ignore_patterns:
-            if fnmatch.fnmatch(path.name, pattern) or fnmatch.fnmatch(
-                str(path), pattern
-            ):
+        """检查是否应该忽略该路径（路径本身或任一上级目录命中规则）"""
+        path = Path(path)
+        try:
+            parts = path.resolve().relative_to(self.root_directory.resolve()).parts
+        except (OSError, ValueError):
+            parts = (path.name,)
+        rules = self._ignore_rules()
+        rel = ""
+        for i, part in enumerate(parts):
+            rel = f"{rel}/{part}" if rel else part
+            is_dir = i < len(parts) - 1 or path.is_dir()
+            if rules.match(rel, is_dir):
                 return True
         return False
 
@@ -84,29 +110,14 @@ class FileSearcher:
         files = []
 
         try:
-            for file_path in self.root_directory.rglob("*"):
-                if not file_path.is_file():
-                    continue
-
-                if self.should_ignore(file_path):
-                    continue
-
-                # 检查文件大小
-                try:
-                    if file_path.stat().st_size > max_size:
-                        continue
-                except OSError:
-                    continue
-
-                # 检查扩展名
-                if extensions:
-                    if file_path.suffix.lower() not in [
-                        ext.lower() for ext in extensions
-                    ]:
-                        continue
-
-                files.append(str(file_path))
-
+            files.extend(
+                walk_files(
+                    self.root_directory,
+                    extensions=extensions,
+                    patterns=self._ordered_patterns(),
+                    max_size=max_size,
+                )
+            )
         except Exception as e:
             print(f"获取文件列表失败: {e}")
 
@@ -128,19 +139,16 @@ class FileSearcher:
             pattern = pattern.lower()
 
         try:
-            for file_path in self.root_directory.rglob("*"):
-                if not file_path.is_file():
-                    continue
-
-                if self.should_ignore(file_path):
-                    continue
-
-                file_name = file_path.name
+            matcher = re.compile(fnmatch.translate(pattern))
+            for file_path in walk_files(
+                self.root_directory, patterns=self._ordered_patterns()
+            ):
+                file_name = os.path.basename(file_path)
                 if not case_sensitive:
                     file_name = file_name.lower()
 
-                if fnmatch.fnmatch(file_name, pattern):
-                    matches.append(str(file_path))
+                if matcher.match(file_name):
+                    matches.append(file_path)
 
         except Exception as e:
             print(f"按名称搜索失败: {e}")
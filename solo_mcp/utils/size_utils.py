@@ -0,0 +1,59 @@
+"""
+结果大小估算
+
+``result_size`` 按 JSON 文本长度估算任意结果的大小，只遍历容器、不做序列化；
+供分发器记录事件和上下文缓存记账共用。
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+
+def result_size(value: Any) -> int:
+    """估算结果序列化后的大小（字符数），只遍历容器、不做序列化
+
+    字符串按长度计，标量按其文本长度计，容器加上括号和分隔符；大段文本
+    （文件内容、上下文）是 O(1) 的。
+    """
+    size = 0
+    stack = [value]
+    pop, push = stack.pop, stack.append
+    while stack:
+        v = pop()
+        t = type(v)
+        if t is str or t is bytes:
+            size += len(v) + 2
+        elif t is dict:
+            size += 2 + 2 * len(v)
+            for k, item in v.items():
+                size += len(k) + 2 if type(k) is str else len(str(k)) + 2
+                it = type(item)
+                if it is str:
+                    size += len(item) + 2
+                elif it is dict or it is list or it is tuple:
+                    push(item)
+                else:
+                    size += _scalar_size(item)
+        elif t is list or t is tuple:
+            size += 2 + len(v)
+            for item in v:
+                if type(item) is str:
+                    size += len(item) + 2
+                else:
+                    push(item)
+        elif isinstance(v, (dict, list, tuple)):
+            push(dict(v) if isinstance(v, dict) else list(v))
+        else:
+            size += _scalar_size(v)
+    return size
+
+
+def _scalar_size(value: Any) -> int:
+    if value is None or value is True:
+        return 4
+    if value is False:
+        return 5
+    if isinstance(value, (str, bytes)):
+        return len(value) + 2
+    return len(str(value))
@@ -0,0 +1,239 @@
+"""文本分词工具函数
+
+搜索索引、记忆索引和行为模式分析共用同一条分词流水线：
+正则切词 → 标识符拆分（camelCase / snake_case）→ 小写化 → 停用词/长度过滤 → 可选词干化。
+代码分词和关键词分词都按 Unicode 切词，中日韩连续字符切成重叠二元组。
+每个原始词的处理结果按实例缓存并驻留（``sys.intern``），重复出现的标识符只处理一次。
+"""
+
+from __future__ import annotations
+
+import re
+import sys
+from typing import Dict, Iterable, List, Tuple
+
+# 代码中的标识符或纯数字；非 ASCII 字符（以及所有标点）都作为分隔符
+_WORD_RE = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+", re.ASCII)
+# 关键词：Unicode 字母词（如 café）、数字，以及单独成段的中日韩连续字符
+_CJK = "\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uac00-\ud7af"
+_UNICODE_WORD_RE = re.compile(rf"[{_CJK}]+|[^\W\d{_CJK}][^\W{_CJK}]*|[0-9]+")
+_CJK_RUN_RE = re.compile(rf"[{_CJK}]+")
+# camelCase / PascalCase / 缩写（HTTPServer → HTTP, Server）/ 数字段
+_CAMEL_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+", re.ASCII)
+_GROUP = re.Match.group
+_START = re.Match.start
+
+STOP_WORDS = frozenset(
+    {
+        "the",
+        "a",
+        "an",
+        "and",
+        "or",
+        "but",
+        "in",
+        "on",
+        "at",
+        "to",
+        "for",
+        "of",
+        "with",
+        "by",
+        "is",
+        "are",
+        "was",
+        "were",
+        "be",
+        "been",
+        "have",
+        "has",
+        "had",
+        "do",
+        "does",
+        "did",
+        "will",
+        "would",
+        "could",
+        "should",
+    }
+)
+
+# 查询语句中额外忽略的疑问词
+QUERY_STOP_WORDS = STOP_WORDS | {"how", "what", "when", "where", "why", "who", "which"}
+
+# 单个分词器缓存的原始词数量上限，超过后整体清空
+_CACHE_LIMIT = 200_000
+
+
+def _stem(word: str) -> str:
+    """轻量 S-stemmer（Harman），只处理英文复数词尾"""
+    if len(word) > 3 and word.endswith("ies") and not word.endswith(("eies", "aies")):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("es") and not word.endswith(("aes", "ees", "oes")):
+        return word[:-1]
+    if len(word) > 2 and word.endswith("s") and not word.endswith(("us", "ss")):
+        return word[:-1]
+    return word
+
+
+class Tokenizer:
+    """可配置的分词流水线
+
+    Args:
+        split_identifiers: 是否拆分 camelCase / snake_case 标识符
+        keep_identifiers: 拆分时是否同时保留完整标识符
+        lowercase: 是否小写化
+        keep_numbers: 是否保留纯数字词
+        min_length: 最小词长（小于该长度的词被丢弃）
+        stop_words: 停用词（按小写比较）
+        stem: 是否做轻量词干化
+        unicode: 按 Unicode 切词（非 ASCII 字母不再作为分隔符），中日韩连续
+            字符切成重叠二元组（不受 ``min_length`` 限制）
+    """
+
+    def __init__(
+        self,
+        *,
+        split_identifiers: bool = True,
+        keep_identifiers: bool = True,
+        lowercase: bool = True,
+        keep_numbers: bool = True,
+        min_length: int = 1,
+        stop_words: Iterable[str] = (),
+        stem: bool = False,
+        unicode: bool = False,
+    ):
+        self.split_identifiers = split_identifiers
+        self.keep_identifiers = keep_identifiers
+        self.lowercase = lowercase
+        self.keep_numbers = keep_numbers
+        self.min_length = min_length
+        self.stop_words = frozenset(stop_words)
+        self.stem = stem
+        self.unicode = unicode
+        self._word_re = _UNICODE_WORD_RE if unicode else _WORD_RE
+        self._cache: dict[str, Tuple[str, ...]] = {}
+
+    def _normalize(self, word: str) -> str | None:
+        if self.lowercase:
+            word = word.lower()
+        if len(word) < self.min_length or word.lower() in self.stop_words:
+            return None
+        if self.stem:
+            word = _stem(word)
+        return sys.intern(word)
+
+    def _expand(self, word: str) -> Tuple[str, ...]:
+        """把一个原始词转换为零个或多个词元（结果会被缓存）"""
+        if self.unicode and _CJK_RUN_RE.fullmatch(word):
+            result = tuple(
+                dict.fromkeys(
+                    sys.intern(word[i : i + 2])
+                    for i in range(max(1, len(word) - 1))
+                    if word[i : i + 2] not in self.stop_words
+                )
+            )
+            if len(self._cache) >= _CACHE_LIMIT:
+                self._cache.clear()
+            self._cache[word] = result
+            return result
+        if word.isdigit() and not self.keep_numbers:
+            pieces: List[str] = []
+        elif self.split_identifiers:
+            # 大小写拆分只认 ASCII，含其他字母的片段整体保留
+            parts = [
+                p
+                for chunk in word.split("_")
+                for p in (_CAMEL_RE.findall(chunk) if chunk.isascii() else [chunk])
+            ]
+            if len(parts) > 1:
+                pieces = [word] + parts if self.keep_identifiers else parts
+            else:
+                pieces = [word]
+        else:
+            pieces = [word]
+
+        out: List[str] = []
+        for piece in pieces:
+            token = self._normalize(piece)
+            if token is not None and token not in out:
+                out.append(token)
+        result = tuple(out)
+        if len(self._cache) >= _CACHE_LIMIT:
+            self._cache.clear()
+        self._cache[word] = result
+        return result
+
+    def tokenize(self, text: str) -> List[str]:
+        """分词，返回词元列表（保持出现顺序，允许重复）"""
+        return self._tokenize_words(self._word_re.findall(text))
+
+    def _tokenize_words(self, words: Iterable[str]) -> List[str]:
+        cache = self._cache
+        expand = self._expand
+        out: List[str] = []
+        for word in words:
+            tokens = cache.get(word)
+            if tokens is None:
+                tokens = expand(word)
+            out += tokens
+        return out
+
+    __call__ = tokenize
+
+    def tokenize_with_offsets(self, text: str) -> Tuple[List[str], Dict[str, int]]:
+        """分词，并返回每个词元首次出现的位置（所在原始词的起始下标）"""
+        matches = list(self._word_re.finditer(text))
+        out = self._tokenize_words(map(_GROUP, matches))
+        # 倒序建字典：同一原始词后写入的是更靠前的位置
+        matches.reverse()
+        starts = dict(zip(map(_GROUP, matches), map(_START, matches)))
+        # 只对不同的原始词计算首次位置，避免逐词元查字典
+        first: Dict[str, int] = {}
+        cache = self._cache
+        for word, start in starts.items():
+            for token in cache.get(word) or self._expand(word):
+                if first.get(token, start) >= start:
+                    first[token] = start
+        return out, first
+
+    def spans(self, text: str) -> List[Tuple[int, int, Tuple[str, ...]]]:
+        """返回 (起始, 结束, 词元) 列表，用于在原文中定位/高亮词元"""
+        cache = self._cache
+        expand = self._expand
+        out: List[Tuple[int, int, Tuple[str, ...]]] = []
+        for m in self._word_re.finditer(text):
+            word = m.group()
+            tokens = cache.get(word)
+            if tokens is None:
+                tokens = expand(word)
+            if tokens:
+                out.append((m.start(), m.end(), tokens))
+        return out
+
+
+# 搜索索引：拆分标识符并保留完整标识符，不过滤停用词（代码查询常含 def/self 等）；
+# 按 Unicode 切词，中文注释和文档同样可检索
+CODE_TOKENIZER = Tokenizer(unicode=True)
+
+# 记忆/行为关键词：保持原有的“完整标识符 + 长度 > 2 + 停用词过滤”语义，
+# 但按 Unicode 切词，中文等非英文内容同样可检索
+KEYWORD_TOKENIZER = Tokenizer(
+    split_identifiers=False,
+    keep_numbers=False,
+    min_length=3,
+    stop_words=STOP_WORDS,
+    unicode=True,
+)
+QUERY_KEYWORD_TOKENIZER = Tokenizer(
+    split_identifiers=False,
+    keep_numbers=False,
+    min_length=3,
+    stop_words=QUERY_STOP_WORDS,
+    unicode=True,
+)
+
+
+def tokenize_code(text: str) -> List[str]:
+    """使用代码分词器切分文本（索引和查询共用）"""
+    return CODE_TOKENIZER.tokenize(text)
@@ -0,0 +1,169 @@
+"""
+分层时间轮
+
+为缓存项 TTL 和记忆过期提供 O(1) 的定时登记/取消，由后台 asyncio 任务按刻度推进，
+到期项逐个回调，不需要扫描全部条目。
+"""
+
+from __future__ import annotations
+
+import asyncio
+import math
+import sys
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Set, Tuple
+
+Callback = Callable[[Hashable], None]
+
+
+class TimerWheel:
+    """分层时间轮（每层 ``slots`` 个槽，第 l 层每槽跨 ``slots ** l`` 个刻度）
+
+    到期刻度距当前越远，定时器放在越高的层；高层的槽转到时把其中的定时器
+    重新分配到低层（级联），最终在第 0 层的槽被处理时触发。登记、取消都是
+    O(1)，推进一个刻度摊还 O(1)。超出最高层范围的定时器放在最高层，级联时
+    按剩余时间重新分配。
+
+    Args:
+        tick: 刻度长度（秒），即过期精度
+        slots: 每层槽数
+        levels: 层数
+        clock: 返回当前时间（秒）的函数，测试时可替换
+    """
+
+    def __init__(
+        self,
+        tick: float = 1.0,
+        slots: int = 64,
+        levels: int = 4,
+        clock: Callable[[], float] = time.time,
+    ):
+        self.tick = tick
+        self.slots = slots
+        self.levels = levels
+        self.clock = clock
+        self._wheels: List[List[Set[Hashable]]] = [
+            [set() for _ in range(slots)] for _ in range(levels)
+        ]
+        # key -> (到期刻度, 回调, 层, 槽)
+        self._timers: Dict[Hashable, Tuple[int, Callback, int, int]] = {}
+        self._current = self._tick_of(clock())
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self.fired = 0
+
+    def __len__(self) -> int:
+        return len(self._timers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._timers
+
+    def _tick_of(self, timestamp: float) -> int:
+        return math.floor(timestamp / self.tick)
+
+    def _place(self, key: Hashable, expires: int, callback: Callback) -> bool:
+        """放入对应的层和槽；已到期返回 False（由调用方触发）"""
+        delta = expires - self._current
+        if delta <= 0:
+            return False
+        slots = self.slots
+        level, span = 0, 1
+        while level < self.levels - 1 and delta >= span * slots:
+            level += 1
+            span *= slots
+        slot = (expires // span) % slots
+        self._wheels[level][slot].add(key)
+        self._timers[key] = (expires, callback, level, slot)
+        return True
+
+    def schedule(self, key: Hashable, deadline: float, callback: Callback):
+        """在时间戳 ``deadline`` 之后调用 ``callback(key)``；同一 key 重复登记时覆盖"""
+        with self._lock:
+            self._cancel(key)
+            expires = math.ceil(deadline / self.tick)
+            if self._place(key, expires, callback):
+                return
+        # 已经到期
+        callback(key)
+
+    def cancel(self, key: Hashable) -> bool:
+        with self._lock:
+            return self._cancel(key)
+
+    def _cancel(self, key: Hashable) -> bool:
+        timer = self._timers.pop(key, None)
+        if timer is None:
+            return False
+        _, _, level, slot = timer
+        self._wheels[level][slot].discard(key)
+        return True
+
+    def advance(self, now: Optional[float] = None) -> int:
+        """推进到 ``now``（默认当前时间），触发到期的回调，返回触发数"""
+        target = self._tick_of(self.clock() if now is None else now)
+        due: List[Tuple[Hashable, Callback]] = []
+        with self._lock:
+            slots = self.slots
+            while self._current < target:
+                if not self._timers:
+                    self._current = target
+                    break
+                self._current += 1
+                current = self._current
+                # 第 0 层转完一圈时依次级联上层
+                level, span = 1, slots
+                while level < self.levels and current % span == 0:
+                    self._cascade(level, (current // span) % slots, due)
+                    level += 1
+                    span *= slots
+                bucket = self._wheels[0][current % slots]
+                for key in bucket:
+                    due.append((key, self._timers.pop(key)[1]))
+                bucket.clear()
+        for key, callback in due:
+            callback(key)
+        self.fired += len(due)
+        return len(due)
+
+    def _cascade(
+        self, level: int, slot: int, due: List[Tuple[Hashable, Callback]]
+    ):
+        bucket = self._wheels[level][slot]
+        self._wheels[level][slot] = set()
+        for key in bucket:
+            expires, callback, _, _ = self._timers.pop(key)
+            if not self._place(key, expires, callback):
+                due.append((key, callback))
+
+    async def run(self):
+        """每个刻度推进一次，直到任务被取消"""
+        while True:
+            await asyncio.sleep(self.tick)
+            try:
+                self.advance()
+            except Exception as e:
+                print(f"Timer wheel callback failed: {e}", file=sys.stderr)
+
+    def start(self) -> asyncio.Task:
+        """在当前事件循环中启动后台推进任务（重复调用返回同一任务）"""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self.run())
+        return self._task
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def get_stats(self) -> Dict[str, float]:
+        return {
+            "timers": len(self._timers),
+            "fired": self.fired,
+            "tick": self.tick,
+            "running": self._task is not None and not self._task.done(),
+        }
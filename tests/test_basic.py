@@ -33,3 +33,62 @@ def test_index_and_search(tmp_path: Path):
     asyncio.run(srv.index.build())
     res = asyncio.run(srv.index.search("add a b", k=5))
     assert any("code.py" in h["path"] for h in res["hits"])
+
+
+def test_memory_tools_through_dispatch(tmp_path: Path):
+    import asyncio
+
+    srv = make_server(tmp_path)
+
+    async def scenario():
+        stored = await srv.handle(
+            {
+                "tool": "memory.store",
+                "params": {"content": "deploy script lives in tools", "tags": ["ops"]},
+            }
+        )
+        loaded = await srv.handle(
+            {"tool": "memory.load", "params": {"query": "deploy script"}}
+        )
+        summary = await srv.handle({"tool": "memory.summarize", "params": {}})
+        missing = await srv.handle({"tool": "memory.load", "params": {}})
+        # a batch of plain (id-less) requests gets one response per entry
+        batch = await srv.handle_batch(
+            [
+                {"tool": "memory.load", "params": {"query": "deploy"}},
+                {"tool": "memory.load", "params": {"query": "script", "limit": 1}},
+            ]
+        )
+        return stored, loaded, summary, missing, batch
+
+    stored, loaded, summary, missing, batch = asyncio.run(scenario())
+    memory_id = stored["result"]
+    assert isinstance(memory_id, str) and memory_id
+    assert [m["id"] for m in loaded["result"]] == [memory_id]
+    assert summary["result"]["total_memories"] == 1
+    assert missing == {"error": "Missing required parameter: query"}
+    assert [[m["id"] for m in r["result"]] for r in batch] == [[memory_id], [memory_id]]
+    srv.memory.close()
+
+
+def test_aclose_closes_everything_when_the_event_log_fails(tmp_path: Path):
+    import asyncio
+
+    srv = make_server(tmp_path)
+    closed = []
+    memory_close, index_close = srv.memory.close, srv.index.close
+
+    def failing_close():
+        closed.append("events")
+        raise OSError("disk full")
+
+    srv.events.close = failing_close
+    srv.memory.close = lambda: closed.append("memory") or memory_close()
+    srv.index.close = lambda: closed.append("index") or index_close()
+    try:
+        asyncio.run(srv.aclose())
+    except OSError as e:
+        assert str(e) == "disk full"
+    else:
+        raise AssertionError("aclose() should re-raise the event log error")
+    assert closed == ["events", "memory", "index"]
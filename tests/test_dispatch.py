@@ -0,0 +1,269 @@
+import asyncio
+import json
+from pathlib import Path
+
+from solo_mcp.config import SoloConfig
+from solo_mcp.dispatch import ToolDispatcher, ToolSpec, result_size, serve
+from solo_mcp.tools.credits import CreditsManager
+
+
+class RecordingDispatcher(ToolDispatcher):
+    def __init__(self, tools, credits):
+        super().__init__(tools, credits)
+        self.events = []
+
+    def _log_event(self, tool, params, start, end, ok, result_size, error):
+        self.events.append((tool, ok, result_size, error))
+
+
+def make_dispatcher(tmp_path: Path, tools: dict) -> RecordingDispatcher:
+    return RecordingDispatcher(tools, CreditsManager(SoloConfig.load(root=tmp_path)))
+
+
+def test_handle_dispatch_runs_tool_once(tmp_path: Path):
+    calls = []
+
+    def evaluate(params):
+        calls.append(params["goal"])
+        return {"goal": params["goal"], "roles": []}
+
+    async def search(params):
+        calls.append(params["query"])
+        return {"hits": [{"path": "a.py", "score": 1.5}]}
+
+    dispatcher = make_dispatcher(
+        tmp_path,
+        {
+            "roles.evaluate": ToolSpec(evaluate),
+            "index.search": ToolSpec(search, is_async=True),
+            "fs.read": ToolSpec(lambda p: p["path"], required=("path",)),
+            "credits.get": ToolSpec(lambda p: "free", free=True),
+        },
+    )
+    balance = dispatcher.credits.get_balance()["balance"]
+
+    res = asyncio.run(dispatcher.handle({"tool": "roles.evaluate", "params": {"goal": "g"}}))
+    assert res == {"result": {"goal": "g", "roles": []}}
+    res = asyncio.run(dispatcher.handle({"tool": "index.search", "params": {"query": "q"}}))
+    assert res["result"]["hits"][0]["path"] == "a.py"
+    assert calls == ["g", "q"]
+
+    missing = asyncio.run(dispatcher.handle({"tool": "fs.read", "params": {}}))
+    assert missing == {"error": "Missing required parameter: path"}
+    unknown = asyncio.run(dispatcher.handle({"tool": "nope"}))
+    assert unknown == {"error": "Unknown tool: nope"}
+    assert asyncio.run(dispatcher.handle({"tool": "credits.get"})) == {"result": "free"}
+
+    # every paid call (including failed and unknown ones) costs one credit
+    assert dispatcher.credits.get_balance()["balance"] == balance - 4
+    assert [(tool, ok) for tool, ok, _, _ in dispatcher.events] == [
+        ("roles.evaluate", True),
+        ("index.search", True),
+        ("fs.read", False),
+        ("nope", False),
+        ("credits.get", True),
+    ]
+    assert dispatcher.events[0][2] > 0
+
+
+def test_handle_reports_insufficient_credits(tmp_path: Path):
+    dispatcher = make_dispatcher(tmp_path, {"t": ToolSpec(lambda p: 1)})
+    dispatcher.credits.consume(dispatcher.credits.get_balance()["balance"])
+    assert asyncio.run(dispatcher.handle({"tool": "t"})) == {"error": "INSUFFICIENT_CREDITS"}
+    assert dispatcher.events == []
+
+
+def test_result_size_approximates_json_length():
+    values = [
+        {"path": "a.py", "content": "x" * 1000, "hits": [{"score": 1.25, "ok": True}]},
+        ["a", 1, None, False, {"k": ["v"]}],
+        "plain",
+        42,
+    ]
+    for value in values:
+        expected = len(json.dumps(value, ensure_ascii=False))
+        assert abs(result_size(value) - expected) <= 0.1 * expected + 4
+
+
+def feed(reader: asyncio.StreamReader, *lines: bytes) -> None:
+    for line in lines:
+        reader.feed_data(line + b"\n")
+    reader.feed_eof()
+
+
+def test_serve_writes_responses_as_they_complete(tmp_path: Path):
+    async def slow(params):
+        await asyncio.sleep(0.2)
+        return "slow"
+
+    dispatcher = make_dispatcher(
+        tmp_path,
+        {
+            "test.slow": ToolSpec(slow, is_async=True, free=True),
+            "test.fast": ToolSpec(lambda p: "fast", free=True),
+        },
+    )
+    out = []
+
+    async def run():
+        reader = asyncio.StreamReader()
+        feed(
+            reader,
+            b'{"id": 1, "tool": "test.slow"}',
+            b'{"id": 2, "tool": "test.fast"}',
+            b"",
+            b"not json",
+            b"[1, 2",
+            b"42",
+        )
+        await serve(dispatcher, reader, out.append, max_concurrency=4)
+
+    asyncio.run(run())
+    assert [r for r in out if "id" not in r] == [
+        {"error": "INVALID_JSON"},
+        {"error": "INVALID_JSON"},
+        {"error": "INVALID_REQUEST"},
+    ]
+    assert [r for r in out if "id" in r] == [
+        {"id": 2, "result": "fast"},
+        {"id": 1, "result": "slow"},
+    ]
+
+
+def test_serve_bounds_concurrent_requests(tmp_path: Path):
+    running = 0
+    peak = 0
+
+    async def work(params):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.01)
+        running -= 1
+        return params["n"]
+
+    dispatcher = make_dispatcher(
+        tmp_path, {"test.work": ToolSpec(work, is_async=True, free=True)}
+    )
+    out = []
+
+    async def run():
+        reader = asyncio.StreamReader()
+        feed(
+            reader,
+            *(
+                json.dumps({"id": n, "tool": "test.work", "params": {"n": n}}).encode()
+                for n in range(20)
+            ),
+        )
+        await serve(dispatcher, reader, out.append, max_concurrency=3)
+
+    asyncio.run(run())
+    assert peak == 3
+    assert sorted(r["result"] for r in out) == list(range(20))
+    assert all(r["id"] == r["result"] for r in out)
+
+
+def test_handle_batch_debits_once_and_keeps_order(tmp_path: Path):
+    async def slow(params):
+        await asyncio.sleep(0.05)
+        return "slow"
+
+    notified = []
+    dispatcher = make_dispatcher(
+        tmp_path,
+        {
+            "test.slow": ToolSpec(slow, is_async=True),
+            "fs.read": ToolSpec(lambda p: p["path"].upper(), required=("path",)),
+            "log": ToolSpec(lambda p: notified.append(p["msg"])),
+            "credits.get": ToolSpec(lambda p: "free", free=True),
+        },
+    )
+    debits = []
+    consume = dispatcher.credits.consume
+    dispatcher.credits.consume = lambda amount: debits.append(amount) or consume(amount)
+    before = dispatcher.credits.get_balance()["balance"]
+
+    out = asyncio.run(
+        dispatcher.handle_batch(
+            [
+                {"id": 1, "tool": "test.slow"},
+                {"id": 2, "tool": "fs.read", "params": {"path": "a"}},
+                "bogus",
+                {"jsonrpc": "2.0", "tool": "log", "params": {"msg": "hi"}},
+                {"id": 3, "tool": "credits.get"},
+                {"tool": "fs.read", "params": {"path": "b"}},
+            ]
+        )
+    )
+    # the JSON-RPC notification gets no response; id-less requests still do
+    assert out == [
+        {"id": 1, "result": "slow"},
+        {"id": 2, "result": "A"},
+        {"error": "INVALID_REQUEST"},
+        {"id": 3, "result": "free"},
+        {"result": "B"},
+    ]
+    assert notified == ["hi"]
+    # one debit for the whole batch: four paid requests, credits.get is free
+    assert debits == [4]
+    assert dispatcher.credits.get_balance()["balance"] == before - 4
+
+
+def test_handle_batch_insufficient_credits_runs_nothing(tmp_path: Path):
+    calls = []
+    dispatcher = make_dispatcher(tmp_path, {"t": ToolSpec(lambda p: calls.append(1))})
+    dispatcher.credits.consume(dispatcher.credits.get_balance()["balance"] - 1)
+    out = asyncio.run(
+        dispatcher.handle_batch([{"id": 1, "tool": "t"}, {"tool": "t"}, {"id": 2, "tool": "t"}])
+    )
+    assert out == [
+        {"id": 1, "error": "INSUFFICIENT_CREDITS"},
+        {"error": "INSUFFICIENT_CREDITS"},
+        {"id": 2, "error": "INSUFFICIENT_CREDITS"},
+    ]
+    assert calls == []
+
+
+def test_serve_batches(tmp_path: Path):
+    seen = []
+    dispatcher = make_dispatcher(
+        tmp_path,
+        {
+            "echo": ToolSpec(lambda p: p["v"], free=True),
+            "note": ToolSpec(lambda p: seen.append(p["v"]), free=True),
+        },
+    )
+    out = []
+
+    async def run():
+        reader = asyncio.StreamReader()
+        feed(
+            reader,
+            b"[]",
+            b'[{"jsonrpc": "2.0", "tool": "note", "params": {"v": 1}}]',
+            b'[{"id": "a", "tool": "echo", "params": {"v": 2}},'
+            b' {"jsonrpc": "2.0", "tool": "note", "params": {"v": 3}}]',
+        )
+        await serve(dispatcher, reader, out.append)
+
+    asyncio.run(run())
+    # empty batch is rejected, an all-notification batch gets no response
+    assert out == [{"error": "INVALID_REQUEST"}, [{"id": "a", "result": 2}]]
+    assert sorted(seen) == [1, 3]
+
+
+def test_serve_answers_id_less_batches(tmp_path: Path):
+    dispatcher = make_dispatcher(
+        tmp_path, {"fs.read": ToolSpec(lambda p: p["path"], required=("path",))}
+    )
+    out = []
+
+    async def run():
+        reader = asyncio.StreamReader()
+        batch = [{"tool": "fs.read", "params": {"path": f"f{i}"}} for i in range(10)]
+        feed(reader, json.dumps(batch).encode())
+        await serve(dispatcher, reader, out.append)
+
+    asyncio.run(run())
+    assert out == [[{"result": f"f{i}"} for i in range(10)]]
@@ -0,0 +1,99 @@
+import json
+import threading
+import time
+
+from solo_mcp.utils.event_log import EventLog
+
+
+def read_events(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_event_log_buffers_until_flush_and_closes_cleanly(tmp_path):
+    path = tmp_path / "events.jsonl"
+    log = EventLog(path, flush_every=1000, flush_interval=60)
+    for i in range(10):
+        log.append({"n": i})
+    assert not path.exists()
+    assert log.get_stats()["pending"] == 10
+
+    log.close()
+    assert [e["n"] for e in read_events(path)] == list(range(10))
+    assert log.get_stats() == {"pending": 0, "written": 10, "rotations": 0, "dropped": 0}
+
+    # appends after close are counted, not silently queued
+    log.append({"n": 10})
+    log.close()
+    assert len(read_events(path)) == 10
+    assert log.get_stats()["dropped"] == 1 and log.get_stats()["pending"] == 0
+
+
+def test_event_log_close_raises_and_keeps_events_when_final_write_fails(tmp_path):
+    path = tmp_path / "events.jsonl"
+    path.mkdir()  # opening a directory for append fails
+    log = EventLog(path, flush_every=1000, flush_interval=60)
+    log.append({"n": 1})
+    log.append({"n": 2})
+    try:
+        log.close()
+    except OSError:
+        pass
+    else:
+        raise AssertionError("close() should report the failed flush")
+    assert log.get_stats()["pending"] == 2 and log.written == 0
+
+    path.rmdir()
+    assert log.flush() == 2
+    assert [e["n"] for e in read_events(path)] == [1, 2]
+
+
+def test_event_log_background_flush_by_count(tmp_path):
+    path = tmp_path / "events.jsonl"
+    log = EventLog(path, flush_every=5, flush_interval=60)
+    for i in range(5):
+        log.append({"n": i})
+    deadline = time.time() + 5
+    while log.written < 5 and time.time() < deadline:
+        time.sleep(0.01)
+    assert len(read_events(path)) == 5
+    log.close()
+
+
+def test_event_log_rotates_by_size(tmp_path):
+    path = tmp_path / "events.jsonl"
+    log = EventLog(path, flush_every=1000, flush_interval=60, max_bytes=200, backups=2)
+    for i in range(20):
+        log.append({"n": i, "pad": "x" * 20})
+        log.flush()
+    log.close()
+
+    assert log.rotations > 2
+    assert not (tmp_path / "events.jsonl.3").exists()
+    kept = []
+    for name in ("events.jsonl.2", "events.jsonl.1", "events.jsonl"):
+        chunk = tmp_path / name
+        assert chunk.stat().st_size <= 200
+        kept += [e["n"] for e in read_events(chunk)]
+    # newest events survive, in order
+    assert kept == list(range(20 - len(kept), 20))
+
+
+def test_event_log_concurrent_appends(tmp_path):
+    path = tmp_path / "events.jsonl"
+    log = EventLog(path, flush_every=16, flush_interval=0.01, max_bytes=0)
+
+    def worker(t):
+        for i in range(200):
+            log.append({"t": t, "i": i})
+
+    threads = [threading.Thread(target=worker, args=(t,)) for t in range(4)]
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    log.close()
+
+    events = read_events(path)
+    assert len(events) == 800
+    for t in range(4):
+        assert [e["i"] for e in events if e["t"] == t] == list(range(200))
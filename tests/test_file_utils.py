@@ -0,0 +1,149 @@
+import os
+from pathlib import Path
+
+from solo_mcp.utils.file_utils import (
+    IgnoreRules,
+    find_files_by_extension,
+    list_files,
+    walk_files,
+)
+from solo_mcp.utils.search_utils import FileSearcher
+
+
+def make_tree(root: Path, files: list[str]) -> None:
+    for name in files:
+        p = root / name
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text("x", encoding="utf-8")
+
+
+def rel(root: Path, paths) -> list[str]:
+    return sorted(Path(p).relative_to(root).as_posix() for p in paths)
+
+
+def test_ignore_rules_follow_gitignore_syntax():
+    rules = IgnoreRules(
+        [
+            "# comment",
+            "*.log",
+            "/top.txt",
+            "out/",
+            "docs/**/*.tmp",
+            "!keep.log",
+            r"\#literal",
+        ]
+    )
+    assert rules.match("a/b/debug.log", False) is True
+    assert rules.match("keep.log", False) is False
+    assert rules.match("top.txt", False) is True
+    assert rules.match("sub/top.txt", False) is None
+    assert rules.match("src/out", True) is True
+    assert rules.match("src/out", False) is None
+    assert rules.match("docs/x.tmp", False) is True
+    assert rules.match("docs/a/b/x.tmp", False) is True
+    assert rules.match("#literal", False) is True
+    assert rules.match("main.py", False) is None
+
+
+def test_walk_prunes_and_honours_ignore_files(tmp_path: Path, monkeypatch):
+    make_tree(
+        tmp_path,
+        [
+            "main.py",
+            "README.md",
+            "node_modules/pkg/index.js",
+            ".git/HEAD",
+            "venv/lib/site.py",
+            "pkg/mod.py",
+            "pkg/gen/out.py",
+            "pkg/debug.log",
+            "pkg/keep.log",
+            "pkg/sub/note.md",
+        ],
+    )
+    (tmp_path / ".gitignore").write_text("*.log\n", encoding="utf-8")
+    (tmp_path / "pkg" / ".gitignore").write_text("gen/\n!keep.log\n", encoding="utf-8")
+    (tmp_path / "pkg" / "sub" / ".ignore").write_text("*.md\n", encoding="utf-8")
+
+    scanned = []
+    real_scandir = os.scandir
+
+    def tracking_scandir(path):
+        scanned.append(Path(path).relative_to(tmp_path).as_posix())
+        return real_scandir(path)
+
+    monkeypatch.setattr(os, "scandir", tracking_scandir)
+    files = rel(tmp_path, walk_files(tmp_path))
+    assert files == [
+        ".gitignore",
+        "README.md",
+        "main.py",
+        "pkg/.gitignore",
+        "pkg/keep.log",
+        "pkg/mod.py",
+        "pkg/sub/.ignore",
+    ]
+    assert sorted(scanned) == [".", "pkg", "pkg/sub"]
+
+    assert rel(tmp_path, walk_files(tmp_path, extensions=[".PY"])) == [
+        "main.py",
+        "pkg/mod.py",
+    ]
+    assert rel(tmp_path, walk_files(tmp_path, recursive=False)) == [
+        ".gitignore",
+        "README.md",
+        "main.py",
+    ]
+    unfiltered = rel(tmp_path, walk_files(tmp_path, patterns=(), use_ignore_files=False))
+    assert "node_modules/pkg/index.js" in unfiltered and len(unfiltered) == 13
+
+
+def test_helpers_share_the_walker(tmp_path: Path):
+    make_tree(
+        tmp_path,
+        [
+            "a.py",
+            "b.txt",
+            "node_modules/c.py",
+            "build/d.py",
+            "src/e.py",
+            "src/f.pyc",
+            "src/build/g.py",
+        ],
+    )
+    (tmp_path / ".gitignore").write_text("*.txt\n", encoding="utf-8")
+
+    # the public helpers list everything unless asked to respect ignore rules
+    assert rel(tmp_path, find_files_by_extension(str(tmp_path), [".py"])) == [
+        "a.py",
+        "build/d.py",
+        "node_modules/c.py",
+        "src/build/g.py",
+        "src/e.py",
+    ]
+    assert rel(tmp_path, list_files(str(tmp_path))) == [".gitignore", "a.py", "b.txt"]
+    # build/ is pruned only at the root; src/build/ is source
+    assert rel(
+        tmp_path, find_files_by_extension(str(tmp_path), [".py"], respect_ignore=True)
+    ) == ["a.py", "src/build/g.py", "src/e.py"]
+    assert rel(
+        tmp_path, list_files(str(tmp_path), "*.py", recursive=True, respect_ignore=True)
+    ) == ["a.py", "src/build/g.py", "src/e.py"]
+    assert rel(tmp_path, list_files(str(tmp_path), respect_ignore=True)) == [
+        ".gitignore",
+        "a.py",
+    ]
+
+    searcher = FileSearcher(str(tmp_path))
+    assert rel(tmp_path, searcher.get_all_files()) == [
+        ".gitignore",
+        "a.py",
+        "src/build/g.py",
+        "src/e.py",
+    ]
+    assert rel(tmp_path, searcher.search_by_name("E.PY")) == ["src/e.py"]
+    assert searcher.should_ignore(tmp_path / "node_modules" / "c.py")
+    assert searcher.should_ignore(tmp_path / "src" / "f.pyc")
+    assert not searcher.should_ignore(tmp_path / "src" / "e.py")
+    searcher.add_ignore_pattern("src/")
+    assert rel(tmp_path, searcher.get_all_files()) == [".gitignore", "a.py"]
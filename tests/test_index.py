@@ -0,0 +1,505 @@
+import asyncio
+from pathlib import Path
+
+from solo_mcp.config import SoloConfig
+from solo_mcp.tools.index import IndexTool, _BM25Lite
+
+
+def make_index(tmp_path: Path, files: dict[str, str]) -> IndexTool:
+    for name, content in files.items():
+        p = tmp_path / name
+        p.parent.mkdir(parents=True, exist_ok=True)
+        p.write_text(content, encoding="utf-8")
+    return IndexTool(SoloConfig.load(root=tmp_path))
+
+
+def test_postings_match_linear_scoring():
+    corpus = [
+        ["def", "add", "a", "b", "add"],
+        ["class", "Foo", "a"],
+        ["return", "a", "b"],
+        [],
+    ]
+    bm25 = _BM25Lite(corpus)
+    assert bm25.doc_freq == {
+        "def": 1,
+        "add": 1,
+        "a": 3,
+        "b": 2,
+        "class": 1,
+        "Foo": 1,
+        "return": 1,
+    }
+    assert list(bm25.postings["a"]) == [(0, 1), (1, 1), (2, 1)]
+    assert list(bm25.postings["add"]) == [(0, 2)]
+
+    query = ["add", "b", "missing"]
+    sparse = bm25.score(query)
+    assert set(sparse) == {0, 2}
+    dense = bm25.get_scores(query)
+    assert len(dense) == 4
+    assert dense[1] == 0.0 and dense[3] == 0.0
+    assert dense[0] > dense[2] > 0.0
+
+
+def test_search_single_document(tmp_path: Path):
+    tool = make_index(tmp_path, {"code.py": "def add(a, b):\n    return a+b\n"})
+    res = asyncio.run(tool.search("def", k=5))
+    assert [Path(h["path"]).name for h in res["hits"]] == ["code.py"]
+    assert res["hits"][0]["score"] > 0
+
+
+def test_search_ranks_and_limits(tmp_path: Path):
+    tool = make_index(
+        tmp_path,
+        {
+            "a.md": "alpha beta gamma",
+            "b.md": "alpha alpha alpha",
+            "c.md": "delta epsilon",
+        },
+    )
+    asyncio.run(tool.build())
+    res = asyncio.run(tool.search("alpha", k=1))
+    assert len(res["hits"]) == 1
+    assert Path(res["hits"][0]["path"]).name == "b.md"
+    res = asyncio.run(tool.search("zeta", k=5))
+    assert res["hits"] == []
+
+
+def test_top_k_matches_exhaustive_ranking():
+    import random
+
+    rng = random.Random(7)
+    vocab = [f"t{i}" for i in range(60)]
+    corpus = [
+        [rng.choice(vocab[: rng.randint(5, 60)]) for _ in range(rng.randint(0, 40))]
+        for _ in range(300)
+    ]
+    bm25 = _BM25Lite(corpus)
+    for _ in range(50):
+        query = [rng.choice(vocab) for _ in range(rng.randint(1, 4))]
+        for k in (1, 5, 10, 500):
+            expected = sorted(
+                bm25.score(query).items(), key=lambda x: (-x[1], x[0])
+            )[:k]
+            got = bm25.top_k(query, k)
+            assert [d for d, _ in got] == [d for d, _ in expected]
+            for (_, s1), (_, s2) in zip(got, expected):
+                assert abs(s1 - s2) < 1e-9
+    assert bm25.top_k(["nope"], 10) == []
+    assert bm25.top_k(["t1"], 0) == []
+
+
+def test_index_persists_and_warm_starts(tmp_path: Path):
+    files = {
+        "a.md": "alpha beta gamma",
+        "b.md": "alpha alpha alpha",
+        "pkg/c.py": "import os\nos.path.join(alpha)",
+    }
+    tool = make_index(tmp_path, files)
+    asyncio.run(tool.build())
+    assert tool.index_path.exists()
+    expected = asyncio.run(tool.search("alpha gamma", k=10))
+    tool.close()
+
+    warm = IndexTool(SoloConfig.load(root=tmp_path))
+
+    def no_rescan():
+        raise AssertionError("warm start must not walk the tree")
+
+    warm._iter_files = no_rescan
+    got = asyncio.run(warm.search("alpha gamma", k=10))
+    assert [h["path"] for h in got["hits"]] == [h["path"] for h in expected["hits"]]
+    for h1, h2 in zip(got["hits"], expected["hits"]):
+        assert abs(h1["score"] - h2["score"]) < 1e-9
+    assert warm._corpus.fingerprints[0][1] > 0
+    warm.close()
+
+
+def test_corrupt_index_file_is_ignored(tmp_path: Path):
+    tool = make_index(tmp_path, {"a.md": "alpha"})
+    tool.index_path.parent.mkdir(parents=True, exist_ok=True)
+    tool.index_path.write_bytes(b"garbage")
+    fresh = IndexTool(SoloConfig.load(root=tmp_path))
+    assert fresh._bm25 is None
+    res = asyncio.run(fresh.search("alpha"))
+    assert len(res["hits"]) == 1
+
+
+def test_incremental_build_matches_full_rebuild(tmp_path: Path, monkeypatch):
+    import os
+
+    from solo_mcp.tools import index as index_module
+
+    files = {f"f{i}.md": f"common word{i} shared{i % 3}" for i in range(12)}
+    tool = make_index(tmp_path, files)
+    first = asyncio.run(tool.build())
+    assert first["incremental"] is False and first["docs"] == 12
+
+    reads = []
+    original = index_module._read_document
+
+    def counting_read(path):
+        reads.append(Path(path).name)
+        return original(path)
+
+    monkeypatch.setattr(index_module, "_read_document", counting_read)
+
+    (tmp_path / "f1.md").write_text("common changed shared1", encoding="utf-8")
+    (tmp_path / "f2.md").unlink()
+    (tmp_path / "new.md").write_text("common brand new", encoding="utf-8")
+    touched = tmp_path / "f3.md"
+    st = touched.stat()
+    os.utime(touched, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+
+    res = asyncio.run(tool.build())
+    assert res["incremental"] is True
+    assert (res["added"], res["updated"], res["removed"]) == (1, 1, 1)
+    assert res["docs"] == 12
+    assert sorted(reads) == ["f1.md", "f3.md", "new.md"]
+
+    fresh = IndexTool(SoloConfig.load(root=tmp_path))
+    asyncio.run(fresh.build(full=True))
+    for query in ("common", "changed word1", "word2", "brand shared0", "word5"):
+        got = asyncio.run(tool.search(query, k=20))["hits"]
+        expected = asyncio.run(fresh.search(query, k=20))["hits"]
+        assert {h["path"]: round(h["score"], 9) for h in got} == {
+            h["path"]: round(h["score"], 9) for h in expected
+        }
+    assert tool._bm25.doc_freq == fresh._bm25.doc_freq
+
+    # nothing changed: no file is read again
+    reads.clear()
+    res = asyncio.run(tool.build())
+    assert (res["added"], res["updated"], res["removed"]) == (0, 0, 0)
+    assert reads == []
+
+
+def test_incremental_update_after_warm_start(tmp_path: Path):
+    tool = make_index(tmp_path, {"a.md": "alpha beta", "b.md": "beta gamma"})
+    asyncio.run(tool.build())
+    tool.close()
+
+    warm = IndexTool(SoloConfig.load(root=tmp_path))
+    (tmp_path / "a.md").write_text("delta only", encoding="utf-8")
+    res = asyncio.run(warm.build())
+    assert res["incremental"] is True and res["updated"] == 1
+    assert asyncio.run(warm.search("alpha"))["hits"] == []
+    hits = asyncio.run(warm.search("delta beta"))["hits"]
+    assert sorted(Path(h["path"]).name for h in hits) == ["a.md", "b.md"]
+    assert warm._bm25.doc_freq.get("beta") == 1
+    warm.close()
+
+    again = IndexTool(SoloConfig.load(root=tmp_path))
+    hits = asyncio.run(again.search("delta"))["hits"]
+    assert [Path(h["path"]).name for h in hits] == ["a.md"]
+    again.close()
+
+
+def test_parallel_build_matches_serial(tmp_path: Path):
+    files = {
+        f"d{i // 50}/f{i}.py": f"def func{i}(x):\n    return x + {i % 7} shared"
+        for i in range(300)
+    }
+    serial = make_index(tmp_path, files)
+    serial.workers = 1
+    asyncio.run(serial.build(full=True))
+    parallel = IndexTool(SoloConfig.load(root=tmp_path), workers=4)
+    asyncio.run(parallel.build(full=True))
+    assert parallel._bm25.doc_freq == serial._bm25.doc_freq
+    assert parallel._bm25.n_docs == 300
+    for query in ("shared", "func42(x):", "return 3"):
+        got = asyncio.run(parallel.search(query, k=5))["hits"]
+        expected = asyncio.run(serial.search(query, k=5))["hits"]
+        assert [(h["path"], h["score"]) for h in got] == [
+            (h["path"], h["score"]) for h in expected
+        ]
+
+
+def test_build_yields_to_event_loop(tmp_path: Path):
+    files = {f"f{i}.md": f"alpha{i} beta" for i in range(400)}
+    tool = make_index(tmp_path, files)
+    tool.workers = 2
+
+    async def scenario():
+        ticks = 0
+        done = asyncio.Event()
+
+        async def ticker():
+            nonlocal ticks
+            while not done.is_set():
+                ticks += 1
+                await asyncio.sleep(0)
+
+        task = asyncio.create_task(ticker())
+        res = await tool.build(full=True)
+        done.set()
+        await task
+        return res, ticks
+
+    res, ticks = asyncio.run(scenario())
+    assert res["docs"] == 400
+    assert ticks > 1
+
+
+def test_build_merges_walks_and_saves_off_the_event_loop(tmp_path: Path, monkeypatch):
+    import threading
+
+    from solo_mcp.tools import index as index_module
+
+    files = {f"f{i}.md": f"alpha{i} beta" for i in range(200)}
+    tool = make_index(tmp_path, files)
+    threads: dict[str, set[int]] = {}
+
+    def record(name, fn):
+        def wrapper(*args, **kwargs):
+            threads.setdefault(name, set()).add(threading.get_ident())
+            return fn(*args, **kwargs)
+
+        return wrapper
+
+    for owner, name in [
+        (index_module._BM25Lite, "add_partial"),
+        (index_module, "_write_index"),
+        (index_module, "walk_files"),
+        (index_module, "_stat_changes"),
+    ]:
+        monkeypatch.setattr(owner, name, record(name, getattr(owner, name)))
+
+    loop_threads = set()
+
+    async def build(**kwargs):
+        loop_threads.add(threading.get_ident())
+        return await tool.build(**kwargs)
+
+    assert asyncio.run(build(full=True))["docs"] == 200
+    (tmp_path / "f1.md").write_text("gamma beta", encoding="utf-8")
+    assert asyncio.run(build())["updated"] == 1
+    assert set(threads) == {"add_partial", "_write_index", "walk_files", "_stat_changes"}
+    assert all(ids.isdisjoint(loop_threads) for ids in threads.values())
+    assert [Path(h["path"]).name for h in asyncio.run(tool.search("gamma"))["hits"]] == [
+        "f1.md"
+    ]
+    tool.close()
+
+
+def test_incremental_reads_are_bounded_and_pool_is_reused(tmp_path: Path, monkeypatch):
+    from solo_mcp.tools import index as index_module
+
+    monkeypatch.setattr(index_module, "_BUILD_CHUNK", 4)
+    files = {f"f{i}.md": f"alpha{i} beta" for i in range(50)}
+    tool = make_index(tmp_path, files)
+    tool.workers = 2
+    asyncio.run(tool.build())
+    pool = tool._pool
+    assert pool is not None
+
+    started = 0
+    consumed = 0
+    in_flight = []
+    original = index_module._read_document
+    add_document = tool._bm25.add_document
+
+    def counting_read(path):
+        nonlocal started
+        started += 1
+        in_flight.append(started - consumed)
+        return original(path)
+
+    def counting_add(*args):
+        nonlocal consumed
+        consumed += 1
+        return add_document(*args)
+
+    monkeypatch.setattr(index_module, "_read_document", counting_read)
+    tool._bm25.add_document = counting_add
+    for i in range(50):
+        (tmp_path / f"f{i}.md").write_text(f"gamma{i} beta", encoding="utf-8")
+
+    res = asyncio.run(tool.build())
+    assert res["incremental"] is True and res["updated"] == 50
+    assert max(in_flight) <= 2 * tool.workers * 4
+    assert tool._pool is pool
+
+    tool.close()
+    assert tool._pool is None
+
+
+def test_removed_documents_leave_postings_in_place(tmp_path: Path, monkeypatch):
+    from solo_mcp.tools import index as index_module
+
+    files = {f"f{i}.md": f"common word{i}" for i in range(20)}
+    tool = make_index(tmp_path, files)
+    asyncio.run(tool.build())
+
+    decoded = []
+    decode = index_module._Postings.decode
+
+    def counting_decode(self):
+        decoded.append(len(self))
+        return decode(self)
+
+    monkeypatch.setattr(index_module._Postings, "decode", counting_decode)
+    (tmp_path / "f3.md").write_text("common changed", encoding="utf-8")
+    (tmp_path / "f4.md").unlink()
+    res = asyncio.run(tool.build())
+    assert (res["updated"], res["removed"]) == (1, 1)
+    # neither the removals nor the appends decode the existing lists
+    assert decoded == []
+    assert tool._bm25.doc_freq["common"] == 19
+    assert len(tool._bm25.postings["common"]) == 21
+
+    def names(index, query):
+        hits = asyncio.run(index.search(query, k=50))["hits"]
+        return sorted(Path(h["path"]).name for h in hits)
+
+    expected = sorted(f"f{i}.md" for i in range(20) if i != 4)
+    assert names(tool, "common") == expected
+    assert names(tool, "changed") == ["f3.md"]
+    assert "f4.md" not in names(tool, "word4")
+    tool.close()
+
+    # removed postings survive a reload and are still skipped
+    warm = IndexTool(SoloConfig.load(root=tmp_path))
+    assert names(warm, "common") == expected
+    # a from-scratch build drops them
+    asyncio.run(warm.build(full=True))
+    assert len(warm._bm25.postings["common"]) == 19
+    warm.close()
+
+
+def test_varint_postings_roundtrip():
+    from solo_mcp.tools.index import (
+        _Postings,
+        _decode_forward,
+        _decode_varints,
+        _encode_forward,
+        _encode_varints,
+    )
+
+    values = [0, 1, 127, 128, 300, 16383, 16384, 2**32 - 1]
+    buf = bytearray()
+    _encode_varints(values, buf)
+    assert _decode_varints(buf) == values
+    entry = _encode_forward([900, 3, 70000, 4], [0, 7, 7, 1 << 20])
+    assert _decode_forward(entry) == ([900, 3, 70000, 4], [0, 7, 7, 1 << 20])
+
+    plist = _Postings()
+    for doc_id, tf in [(0, 1), (5, 2), (200, 300), (70000, 1)]:
+        plist.add(doc_id, tf)
+    assert len(plist.data) < 4 * 2 * 4
+    assert list(plist) == [(0, 1), (5, 2), (200, 300), (70000, 1)]
+
+    # a chunk holding (1, 4), (9, 1): first doc id, then tf 4, gap 8, tf 1
+    rest = bytearray()
+    _encode_varints([4, 8, 1], rest)
+    plist.extend_encoded(1, bytes(rest), 2, 9, 70001)
+    loaded = _Postings.from_bytes(plist.to_bytes(), len(plist))
+    loaded.add(80000, 7)
+    assert list(loaded) == [
+        (0, 1),
+        (5, 2),
+        (200, 300),
+        (70000, 1),
+        (70002, 4),
+        (70010, 1),
+        (80000, 7),
+    ]
+
+
+def test_preview_is_bounded_and_stats_report_memory(tmp_path: Path):
+    body = "alpha " + "x" * 100_000
+    tool = make_index(tmp_path, {"big.md": body})
+    res = asyncio.run(tool.build())
+    assert res["memory_mb"] >= 0.0
+    hit = asyncio.run(tool.search("alpha"))["hits"][0]
+    assert hit["preview"] == body[:500]
+    assert hit["offset"] == 0 and hit["highlights"] == [[0, 5]]
+
+    stats = tool.get_stats()
+    assert stats["docs"] == 1 and stats["terms"] >= 2
+    assert stats["index_file_mb"] >= 0.0
+    assert set(stats["memory_breakdown_mb"]) == {
+        "postings",
+        "forward",
+        "terms",
+        "docs",
+        "decode_cache",
+    }
+    assert tool._bm25.memory_usage()["total"] > 0
+    tool.close()
+
+    warm = IndexTool(SoloConfig.load(root=tmp_path))
+    usage = warm._bm25.memory_usage()
+    assert usage["mapped"] == warm.index_path.stat().st_size
+    assert usage["postings"] < usage["mapped"]
+    warm.close()
+
+
+def test_snippet_is_cut_around_matched_terms(tmp_path: Path):
+    header = "# Licensed under the MIT license\n" * 40
+    body = (
+        header
+        + "def helper():\n    pass\n"
+        + "# 中文注释\n"
+        + "def parseConfig(path):\n    return load_config(path)\n"
+        + "filler line\n" * 100
+    )
+    tool = make_index(tmp_path, {"mod.py": body, "other.py": "config"})
+    asyncio.run(tool.build())
+    hit = asyncio.run(tool.search("parse config", k=1))["hits"][0]
+    assert Path(hit["path"]).name == "mod.py"
+    raw = body.encode("utf-8")
+    assert hit["offset"] == raw.index(b"def parseConfig")
+    assert hit["preview"].startswith("def parseConfig(path):")
+    assert len(hit["preview"].encode("utf-8")) <= 500
+    marked = [hit["preview"][s:e] for s, e in hit["highlights"]]
+    assert marked[:2] == ["parseConfig", "load_config"]
+    assert "License" not in hit["preview"]
+    tool.close()
+
+    # the offsets survive a save / warm start
+    warm = IndexTool(SoloConfig.load(root=tmp_path))
+    again = asyncio.run(warm.search("parse config", k=1))["hits"][0]
+    assert (again["offset"], again["preview"]) == (hit["offset"], hit["preview"])
+    warm.close()
+
+
+def test_non_ascii_text_is_indexed_with_byte_offsets(tmp_path: Path):
+    from solo_mcp.tools.index import _read_document
+
+    body = "# 说明：数据库连接池的配置\n" * 30 + "def open_pool():\n    pass\n"
+    tool = make_index(tmp_path, {"pool.py": body, "README.md": "连接 数据库 说明"})
+    (tmp_path / "broken.txt").write_bytes(b"\xff\xfe bad \xe4\xb8 bytes open_pool")
+    asyncio.run(tool.build())
+
+    hits = asyncio.run(tool.search("数据库", k=5))["hits"]
+    assert sorted(Path(h["path"]).name for h in hits) == ["README.md", "pool.py"]
+    hits = asyncio.run(tool.search("open_pool", k=5))["hits"]
+    hit = next(h for h in hits if Path(h["path"]).name == "pool.py")
+    assert hit["offset"] == body.encode("utf-8").index(b"def open_pool")
+    assert hit["preview"].startswith("def open_pool():")
+
+    # undecodable bytes keep later offsets byte-accurate
+    data = (tmp_path / "broken.txt").read_bytes()
+    tokens, first, _ = _read_document(str(tmp_path / "broken.txt"))
+    assert first["open_pool"] == data.index(b"open_pool")
+    assert "bad" in tokens
+    tool.close()
+
+
+def test_build_skips_ignored_paths(tmp_path: Path):
+    tool = make_index(
+        tmp_path,
+        {
+            "app.py": "alpha",
+            "node_modules/lib/index.js": "alpha",
+            "generated/schema.json": "alpha",
+            ".gitignore": "generated/\n",
+        },
+    )
+    res = asyncio.run(tool.build())
+    assert res["docs"] == 1
+    hits = asyncio.run(tool.search("alpha"))["hits"]
+    assert [Path(h["path"]).name for h in hits] == ["app.py"]
+    assert all(not str(p).startswith(str(tool.index_path.parent)) for p in tool._iter_files())
@@ -0,0 +1,270 @@
+import time
+from datetime import datetime, timedelta
+
+from solo_mcp.config import SoloConfig
+from solo_mcp.tools.memory import (
+    ContextCacheManager,
+    CountMinSketch,
+    MemoryIndex,
+    MemoryItem,
+    MemoryTool,
+    MemoryType,
+    Priority,
+    SmartMemoryManager,
+)
+from solo_mcp.utils.timer_wheel import TimerWheel
+
+
+def make_memory(memory_id: str, content: str, tags=(), memory_type=MemoryType.CONTEXT):
+    now = datetime(2024, 5, 1, 12, 0, 0)
+    return MemoryItem(
+        id=memory_id,
+        content=content,
+        memory_type=memory_type,
+        priority=Priority.MEDIUM,
+        tags=list(tags),
+        context={},
+        created_at=now,
+        last_accessed=now,
+        access_count=0,
+    )
+
+
+def test_memory_index_handles_and_removal():
+    index = MemoryIndex()
+    a = make_memory("a", "deploy script for staging", tags=["ops"])
+    b = make_memory("b", "deploy notes for production", tags=["ops", "prod"])
+    c = make_memory("c", "unit test layout", memory_type=MemoryType.LEARNING)
+    for memory in (a, b, c):
+        index.add_memory(memory)
+
+    assert sorted(index.search_by_keywords(["deploy"])) == ["a", "b"]
+    assert index.search_by_keywords(["deploy", "staging", "unknown"]) == ["a"]
+    assert sorted(index.search_by_tags(["prod", "ops"])) == ["a", "b"]
+    assert index.search_by_type(MemoryType.LEARNING) == ["c"]
+    assert len(index.search_by_priority(Priority.MEDIUM)) == 3
+
+    # re-adding an id replaces its entries instead of duplicating them
+    index.add_memory(make_memory("a", "rollback script", tags=["ops"]))
+    assert index.search_by_keywords(["deploy"]) == ["b"]
+    assert sorted(index.search_by_keywords(["script"])) == ["a"]
+
+    index.remove_memory("b", b)
+    index.remove_memory("b", b)
+    assert index.search_by_keywords(["deploy"]) == []
+    assert "production" not in index.keyword_index
+    assert index.search_by_tags(["prod"]) == []
+    assert len(index) == 2
+
+    # freed handles are reused without leaking old postings
+    index.add_memory(make_memory("d", "fresh deploy"))
+    assert index.search_by_keywords(["deploy"]) == ["d"]
+    assert index.search_by_tags(["ops"]) == ["a"]
+
+
+def test_search_memories_bm25_union_and_ranking():
+    manager = SmartMemoryManager()
+    now = datetime.now()
+    for memory_id, content in (
+        ("deploy", "deploy staging cluster with the deploy script"),
+        ("staging", "staging database credentials rotation"),
+        ("other", "unit test layout for the parser"),
+    ):
+        memory = make_memory(memory_id, content)
+        memory.created_at = memory.last_accessed = now
+        manager.store_memory(memory)
+
+    # multi-word query: no memory contains every word, union still recalls
+    results = manager.search_memories("deploy staging rollback", limit=5)
+    assert [m.id for m in results] == ["deploy", "staging"]
+    assert all(0.0 < m.relevance_score <= 1.0 for m in results)
+    assert results[0].access_count == 1
+
+    assert [m.id for m in manager.search_memories("deploy staging", limit=1)] == [
+        "deploy"
+    ]
+    scores = manager.index.score_keywords(["staging"])
+    assert set(scores) == {"deploy", "staging"}
+    assert max(scores.values()) <= 1.0
+
+
+def test_search_memories_matches_chinese_content():
+    manager = SmartMemoryManager()
+    now = datetime.now()
+    for memory_id, content in (
+        ("pool", "数据库连接池的配置放在 settings 里"),
+        ("cache", "缓存过期时间默认一小时"),
+    ):
+        memory = make_memory(memory_id, content)
+        memory.created_at = memory.last_accessed = now
+        manager.store_memory(memory)
+
+    assert [m.id for m in manager.search_memories("连接池配置", limit=5)] == ["pool"]
+    assert [m.id for m in manager.search_memories("缓存过期", limit=5)] == ["cache"]
+
+
+def test_cache_evicts_lru_of_lowest_lower_priority():
+    cache = ContextCacheManager(max_size=3, max_memory_mb=1)
+    cache.put("low1", "a", Priority.LOW)
+    cache.put("low2", "b", Priority.LOW)
+    cache.put("med", "c", Priority.MEDIUM)
+    assert cache.get("low1") == "a"  # low2 is now the LRU low entry
+
+    assert cache.put("high", "d", Priority.HIGH)
+    assert set(cache.cache) == {"low1", "med", "high"}
+    assert cache.put("high2", "e", Priority.HIGH)
+    assert set(cache.cache) == {"med", "high", "high2"}
+    assert cache.put("crit", "f", Priority.CRITICAL)
+    assert set(cache.cache) == {"high", "high2", "crit"}
+
+    # only strictly lower priorities are evicted
+    assert not cache.put("high3", "g", Priority.HIGH)
+    assert cache.get_stats()["evictions"] == 3
+
+    # memory pressure: nothing is evicted unless enough lower-priority bytes exist
+    small = ContextCacheManager(max_size=10, max_memory_mb=1)
+    small.max_memory_bytes = 10
+    small.put("a", "xxxx", Priority.LOW)
+    small.put("b", "xxxx", Priority.MEDIUM)
+    assert not small.put("c", "xxxxxxxxx", Priority.MEDIUM)
+    assert set(small.cache) == {"a", "b"}
+    assert small.put("d", "xxxxxx", Priority.HIGH)
+    assert set(small.cache) == {"b", "d"} and small.current_memory_usage == 10
+
+
+def test_tinylfu_keeps_frequent_entries_against_one_off_keys():
+    cache = ContextCacheManager(max_size=100, max_memory_mb=1, policy="tinylfu")
+    hot = [f"hot{i}" for i in range(10)]
+    for _ in range(5):
+        for key in hot:
+            if cache.get(key) is None:
+                cache.put(key, key)
+    # a scan of one-off keys must not flush the frequently used entries
+    for i in range(300):
+        if cache.get(f"scan{i}") is None:
+            cache.put(f"scan{i}", "x")
+    assert all(key in cache.cache for key in hot)
+    assert len(cache.cache) == 100
+
+    stats = cache.get_stats()
+    assert stats["policy"] == "tinylfu"
+    assert stats["tinylfu"]["rejected"] > 0
+    assert stats["hits"] == 40 and stats["total_requests"] == 350
+
+    sketch = cache._tinylfu.sketch
+    assert sketch.estimate("hot0") >= 5 > sketch.estimate("scan1")
+
+
+def test_count_min_sketch_ages_counters():
+    sketch = CountMinSketch(capacity=4)
+    for _ in range(10):
+        sketch.increment("a")
+    assert sketch.estimate("a") == 10
+    for i in range(30):
+        sketch.increment(f"k{i}")
+    # 40 additions reached the sample size: every counter was halved
+    assert sketch.estimate("a") == 5
+
+
+def test_count_min_sketch_slots_do_not_depend_on_hash_seed():
+    import os
+    import subprocess
+    import sys
+
+    code = (
+        "from solo_mcp.tools.memory import CountMinSketch;"
+        "print(CountMinSketch(64)._slots('deploy staging'))"
+    )
+    outputs = {
+        subprocess.run(
+            [sys.executable, "-c", code],
+            env={**os.environ, "PYTHONHASHSEED": seed},
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+        for seed in ("1", "2", "3")
+    }
+    assert outputs == {f"{CountMinSketch(64)._slots('deploy staging')}\n"}
+
+
+def test_memory_tool_cache_policy(tmp_path):
+    tool = MemoryTool(SoloConfig.load(root=tmp_path), cache_policy="tinylfu")
+    tool.store("deploy script for staging")
+    first = tool.load("deploy staging")
+    assert tool.load("deploy staging") == first
+    stats = tool.get_memory_stats()["cache_stats"]
+    assert stats["policy"] == "tinylfu" and stats["hits"] == 1
+    tool.close()
+
+
+def test_cache_size_accounting_and_serialized_values(monkeypatch):
+    cache = ContextCacheManager(max_size=10, max_memory_mb=1)
+    assert cache._calculate_size(b"\x00" * 100) == 100
+    assert cache._calculate_size("abc") == 3
+    assert cache._calculate_size("中文") == 6
+    nested = {"id": 1, "tags": ["ab", None], "context": {"attempt": 3}}
+    assert 20 < cache._calculate_size(nested) < 200
+    assert cache._calculate_size(object()) > 0
+
+    # without serialize, sizing a value never pickles it
+    with monkeypatch.context() as m:
+        m.setattr("solo_mcp.tools.memory.pickle.dumps", None)
+        cache.put("unpicklable", {"callback": lambda: None, "n": [1, 2]})
+    assert cache.cache["unpicklable"].size > 0
+    cache.remove("unpicklable")
+
+    result = [{"id": "m1", "content": "deploy", "context": {"attempt": 3}}]
+    cache.put("q", result)
+    assert cache.current_memory_usage == cache.cache["q"].size > 0
+    cache.remove("q")
+    assert cache.current_memory_usage == 0
+
+    serialized = ContextCacheManager(max_size=10, max_memory_mb=1, serialize=True)
+    serialized.put("q", result)
+    item = serialized.cache["q"]
+    assert isinstance(item.value, bytes) and item.size == len(item.value)
+    first = serialized.get("q")
+    assert first == result
+    first[0]["content"] = "changed"
+    assert serialized.get("q") == result
+
+
+def test_timer_wheel_expires_cache_entries_and_memories():
+    offset = [0.0]
+    wheel = TimerWheel(tick=1.0, clock=lambda: time.time() + offset[0])
+
+    cache = ContextCacheManager(max_size=10, max_memory_mb=1, timer_wheel=wheel)
+    cache.put("short", "a", ttl_hours=1)
+    cache.put("long", "b", ttl_hours=2)
+    cache.put("forever", "c")
+    assert len(wheel) == 2
+    cache.remove("long")
+    assert len(wheel) == 1
+
+    manager = SmartMemoryManager(timer_wheel=wheel)
+    evicted = []
+    manager.on_evict = evicted.append
+    expired = make_memory("old", "deploy script for staging")
+    expired.created_at = expired.last_accessed = datetime.now()
+    expired.expiry_date = datetime.now() - timedelta(seconds=1)
+    kept = make_memory("new", "deploy notes for production")
+    kept.created_at = kept.last_accessed = datetime.now()
+    kept.expiry_date = datetime.now() + timedelta(days=365)
+    # already expired memories are dropped as soon as they are tracked
+    manager.store_memory(expired)
+    manager.store_memory(kept)
+    assert evicted == ["old"] and "old" not in manager.memories
+    assert [m.id for m in manager.search_memories("deploy")] == ["new"]
+
+    # no timers for the wheel: an expired memory is still never returned
+    unmanaged = SmartMemoryManager()
+    unmanaged.store_memory(expired)
+    assert unmanaged.search_memories("deploy staging") == []
+
+    # entries go away once the wheel is advanced past their TTL, without a scan
+    offset[0] = 3601
+    wheel.advance()
+    assert set(cache.cache) == {"forever"}
+    assert cache.get_stats()["expirations"] == 1
+    assert "new" in manager.memories
@@ -0,0 +1,226 @@
+import json
+from pathlib import Path
+
+from solo_mcp.config import SoloConfig
+from solo_mcp.tools.memory import MemoryTool
+from solo_mcp.tools.memory_store import MemoryJournal
+
+
+def item(i: int, **extra) -> dict:
+    return {"id": f"m{i}", "content": f"memory {i}", "access_count": 0, **extra}
+
+
+def test_journal_replays_and_compacts(tmp_path: Path):
+    snapshot = tmp_path / "memories.json"
+    journal = MemoryJournal(snapshot, compact_threshold=10_000)
+    assert journal.load() == {}
+    for i in range(5):
+        journal.put(item(i))
+    journal.delete("m1")
+    journal.access("m2", "2024-01-01T00:00:00", 3)
+    journal.put(item(3, content="updated"))
+    journal.close(compact=False)
+    assert not snapshot.exists()
+
+    reopened = MemoryJournal(snapshot)
+    state = reopened.load()
+    assert sorted(state) == ["m0", "m2", "m3", "m4"]
+    assert state["m2"]["access_count"] == 3
+    assert state["m3"]["content"] == "updated"
+
+    assert reopened.compact()
+    assert reopened.journal_path.stat().st_size == 0
+    assert not reopened.rotated_path.exists()
+    # snapshot keeps the memories.json layout: a list of memory dicts
+    on_disk = json.loads(snapshot.read_text(encoding="utf-8"))
+    assert sorted(m["id"] for m in on_disk) == ["m0", "m2", "m3", "m4"]
+    reopened.put(item(9))
+    reopened.close(compact=False)
+    assert sorted(MemoryJournal(snapshot).load()) == ["m0", "m2", "m3", "m4", "m9"]
+
+
+def test_journal_recovers_from_torn_tail_and_interrupted_compaction(tmp_path: Path):
+    snapshot = tmp_path / "memories.json"
+    journal = MemoryJournal(snapshot)
+    journal.load()
+    journal.put(item(1))
+    journal.put(item(2))
+    journal.close(compact=False)
+    # a crash while compacting leaves the rotated journal behind
+    journal.journal_path.replace(journal.rotated_path)
+    with open(journal.journal_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "del", "id": "m1"}) + "\n")
+        f.write('{"op": "put", "item": {"id": "m3"')
+
+    recovered = MemoryJournal(snapshot)
+    assert sorted(recovered.load()) == ["m2"]
+    assert recovered.stats["discarded"] == 1
+    recovered.put(item(4))
+    recovered.close()
+    assert not recovered.rotated_path.exists()
+    assert sorted(MemoryJournal(snapshot).load()) == ["m2", "m4"]
+
+
+def test_background_compaction(tmp_path: Path):
+    journal = MemoryJournal(tmp_path / "memories.json", compact_threshold=20)
+    journal.load()
+    for i in range(50):
+        journal.put(item(i))
+    journal.wait()
+    assert journal.stats["compactions"] >= 1
+    journal.close()
+    assert len(MemoryJournal(tmp_path / "memories.json").load()) == 50
+
+
+def test_journal_errors_stay_off_stdout(tmp_path: Path, capsys):
+    # stdout is the stdio protocol channel; errors must go to stderr
+    snapshot = tmp_path / "memories.json"
+    snapshot.write_text("{not json", encoding="utf-8")
+    journal = MemoryJournal(snapshot)
+    assert journal.load() == {}
+    journal.close()
+    out, err = capsys.readouterr()
+    assert out == "" and "Error loading memory snapshot" in err
+
+
+def test_memory_tool_store_appends_instead_of_rewriting(tmp_path: Path):
+    config = SoloConfig.load(root=tmp_path)
+    tool = MemoryTool(config, enable_cache=False)
+    first = tool.store("the deploy script lives in tools", memory_type="context")
+    tool.store("database migrations run on startup", memory_type="context")
+    assert not tool.memory_file.exists()
+    assert len(tool.storage.journal_path.read_text(encoding="utf-8").splitlines()) == 2
+
+    hits = tool.load("deploy script")
+    assert [h["id"] for h in hits] == [first]
+    tool.close()
+    assert tool.memory_file.exists()
+
+    again = MemoryTool(config, enable_cache=False)
+    assert set(again.smart_manager.memories) == set(tool.smart_manager.memories)
+    assert again.smart_manager.memories[first].access_count == 1
+    again.close()
+
+
+def test_sqlite_store_queries_without_preloading(tmp_path: Path):
+    from solo_mcp.tools.memory_store import SQLiteMemoryStore
+
+    store = SQLiteMemoryStore(tmp_path / "memories.db", pool_size=2)
+    base = {
+        "memory_type": "context",
+        "priority": 2,
+        "context": {},
+        "created_at": "2024-01-01T00:00:00",
+        "last_accessed": "2024-01-01T00:00:00",
+        "access_count": 0,
+        "relevance_score": 0.0,
+        "expiry_date": None,
+        "metadata": {},
+    }
+    store.put({**base, "id": "a", "content": "retry_policy for http client", "tags": ["net"]})
+    store.put({**base, "id": "b", "content": "database schema notes", "tags": []})
+    store.put(
+        {
+            **base,
+            "id": "c",
+            "content": "old http notes",
+            "tags": ["net"],
+            "memory_type": "learning",
+            "expiry_date": "2024-01-02T00:00:00",
+        }
+    )
+    assert store.load() == {}
+    assert store.count() == 3
+    assert {m["id"] for m in store.search(["http"])} == {"a", "c"}
+    assert [m["id"] for m in store.search(["retry_policy"])] == ["a"]
+    assert [m["id"] for m in store.search([], tags=["net"], memory_type="learning")] == ["c"]
+    assert store.get("a")["tags"] == ["net"]
+
+    store.access("a", "2024-02-01T00:00:00", 5)
+    assert store.get("a")["access_count"] == 5
+    assert store.delete_expired("2024-03-01T00:00:00") == ["c"]
+    store.delete("b")
+    assert store.count() == 1 and store.search(["database"]) == []
+    stats = store.get_stats()
+    assert stats["memories"] == 1 and stats["pool_size"] == 2
+    store.close()
+
+
+def test_sqlite_fts_rows_follow_memory_rowids(tmp_path: Path):
+    import sqlite3
+
+    from solo_mcp.tools.memory_store import SQLiteMemoryStore
+
+    path = tmp_path / "memories.db"
+    store = SQLiteMemoryStore(path)
+    if not store.has_fts:
+        store.close()
+        return
+    base = {
+        "memory_type": "context",
+        "priority": 2,
+        "tags": [],
+        "context": {},
+        "created_at": "2024-01-01T00:00:00",
+        "last_accessed": "2024-01-01T00:00:00",
+        "access_count": 0,
+        "relevance_score": 0.0,
+        "expiry_date": None,
+        "metadata": {},
+    }
+    for i in range(5):
+        store.put({**base, "id": f"m{i}", "content": f"alpha note{i}"})
+    store.put({**base, "id": "m1", "content": "beta rewritten"})
+    store.put({**base, "id": "cn", "content": "数据库连接池配置"})
+    store.delete("m3")
+
+    def fts_pairs(conn):
+        return sorted(map(tuple, conn.execute("SELECT rowid, id FROM memories_fts")))
+
+    with store._connection() as conn:
+        memories = sorted(map(tuple, conn.execute("SELECT rowid, id FROM memories")))
+        assert fts_pairs(conn) == memories
+    assert {m["id"] for m in store.search(["alpha"])} == {"m0", "m2", "m4"}
+    assert [m["id"] for m in store.search(["beta"])] == ["m1"]
+    assert [m["id"] for m in store.search(["连接"])] == ["cn"]
+    assert store.get_contents(["m1", "cn", "missing"]) == {
+        "m1": "beta rewritten",
+        "cn": "数据库连接池配置",
+    }
+    assert sorted(store.ids()) == ["cn", "m0", "m1", "m2", "m4"]
+    store.close()
+
+    # databases written before the rowid keying get their FTS table rebuilt
+    conn = sqlite3.connect(str(path))
+    conn.execute("DELETE FROM memories_fts")
+    conn.execute("INSERT INTO memories_fts (rowid, id, keywords) VALUES (999, 'm0', 'alpha')")
+    conn.execute("PRAGMA user_version = 0")
+    conn.commit()
+    conn.close()
+    store = SQLiteMemoryStore(path)
+    with store._connection() as conn:
+        assert fts_pairs(conn) == memories
+    assert [m["id"] for m in store.search(["beta"])] == ["m1"]
+    store.close()
+
+
+def test_memory_tool_sqlite_backend_imports_and_serves(tmp_path: Path):
+    config = SoloConfig.load(root=tmp_path)
+    legacy = MemoryTool(config, enable_cache=False)
+    kept = legacy.store("the deploy script lives in tools", memory_type="context")
+    legacy.close()
+
+    tool = MemoryTool(config, enable_cache=False, storage="sqlite")
+    assert tool.smart_manager.memories == {}
+    assert tool.get_memory_stats()["total_memories"] == 1
+    other = tool.store("database migrations run on startup", memory_type="learning")
+    hits = tool.load("deploy script")
+    assert [h["id"] for h in hits] == [kept]
+    assert [h["id"] for h in tool.load("migrations", memory_type="learning")] == [other]
+    assert tool.get_memory_summary()["total_memories"] == 2
+    tool.close()
+
+    again = MemoryTool(config, enable_cache=False, storage="sqlite")
+    assert again.smart_manager.memories == {}
+    assert again.smart_manager.retrieve_memory(kept).access_count == 2
+    again.close()
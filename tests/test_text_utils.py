@@ -0,0 +1,96 @@
+from solo_mcp.utils.text_utils import (
+    CODE_TOKENIZER,
+    KEYWORD_TOKENIZER,
+    QUERY_KEYWORD_TOKENIZER,
+    Tokenizer,
+    tokenize_code,
+)
+
+
+def test_code_tokenizer_splits_identifiers_and_punctuation():
+    assert tokenize_code("foo.bar(baz)") == ["foo", "bar", "baz"]
+    assert tokenize_code("getUserName") == ["getusername", "get", "user", "name"]
+    assert tokenize_code("HTTPServer_error") == [
+        "httpserver_error",
+        "http",
+        "server",
+        "error",
+    ]
+    assert tokenize_code("Foo FOO foo") == ["foo", "foo", "foo"]
+    assert tokenize_code("retry 404 times") == ["retry", "404", "times"]
+
+
+def test_tokens_are_interned_and_cached():
+    a = CODE_TOKENIZER.tokenize("someIdentifier")
+    b = CODE_TOKENIZER.tokenize("x = someIdentifier")
+    assert a[0] is b[1]
+    assert "someIdentifier" in CODE_TOKENIZER._cache
+
+
+def test_keyword_tokenizers_keep_previous_semantics():
+    text = "The user asked how to configure the Database connection pool 42 times"
+    assert KEYWORD_TOKENIZER.tokenize(text) == [
+        "user",
+        "asked",
+        "how",
+        "configure",
+        "database",
+        "connection",
+        "pool",
+        "times",
+    ]
+    assert "how" not in QUERY_KEYWORD_TOKENIZER.tokenize(text)
+    assert KEYWORD_TOKENIZER.tokenize("snake_case camelCase") == [
+        "snake_case",
+        "camelcase",
+    ]
+
+
+def test_keyword_tokenizers_keep_non_ascii_text():
+    assert tokenize_code("中文 mixed文本") == ["中文", "mixed", "文本"]
+    assert tokenize_code("数据库") == ["数据", "据库"]
+    assert tokenize_code("naïveParser café_Bar") == [
+        "naïveparser",
+        "café_bar",
+        "café",
+        "bar",
+    ]
+    assert KEYWORD_TOKENIZER.tokenize("中文 mixed文本") == ["中文", "mixed", "文本"]
+    assert KEYWORD_TOKENIZER.tokenize("数据库连接池") == ["数据", "据库", "库连", "连接", "接池"]
+    assert KEYWORD_TOKENIZER.tokenize("Café naïve 42") == ["café", "naïve"]
+    assert QUERY_KEYWORD_TOKENIZER.tokenize("how 配置 pool") == ["配置", "pool"]
+
+
+def test_optional_stemming_and_stop_words():
+    tok = Tokenizer(stem=True, stop_words={"the"})
+    assert tok.tokenize("The queries indexes classes files") == [
+        "query",
+        "indexe",
+        "classe",
+        "file",
+    ]
+    assert Tokenizer(lowercase=False, split_identifiers=False).tokenize("FooBar") == [
+        "FooBar"
+    ]
+
+
+def test_offsets_and_spans_follow_tokenize():
+    text = "x = getUserName(中文, 42, user)"
+    tokens, first = CODE_TOKENIZER.tokenize_with_offsets(text)
+    assert tokens == CODE_TOKENIZER.tokenize(text)
+    assert first == {
+        "x": 0,
+        "getusername": 4,
+        "get": 4,
+        "user": 4,
+        "name": 4,
+        "中文": 16,
+        "42": 20,
+    }
+    assert CODE_TOKENIZER.spans(text) == [
+        (0, 1, ("x",)),
+        (4, 15, ("getusername", "get", "user", "name")),
+        (16, 18, ("中文",)),
+        (20, 22, ("42",)),
+        (24, 28, ("user",)),
+    ]
@@ -0,0 +1,47 @@
+import random
+
+from solo_mcp.utils.timer_wheel import TimerWheel
+
+
+class FakeClock:
+    def __init__(self, now: float = 1000.0):
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_timer_wheel_fires_each_timer_once_at_its_deadline():
+    clock = FakeClock()
+    wheel = TimerWheel(tick=1.0, slots=8, levels=3, clock=clock)
+    fired = {}
+
+    def on_fire(key):
+        fired[key] = clock.now
+
+    rng = random.Random(7)
+    deadlines = {f"t{i}": clock.now + rng.randint(1, 900) for i in range(300)}
+    for key, deadline in deadlines.items():
+        wheel.schedule(key, deadline, on_fire)
+    wheel.cancel("t0")
+    wheel.schedule("t1", clock.now + 5, on_fire)  # rescheduling replaces
+    deadlines["t1"] = clock.now + 5
+    del deadlines["t0"]
+
+    # deadlines beyond 8 ** 3 ticks overflow the top level and are re-placed
+    while clock.now < 2000:
+        clock.now += rng.choice([1, 1, 3, 17])
+        wheel.advance()
+        for key in list(fired):
+            assert deadlines[key] <= fired[key] < deadlines[key] + 17
+
+    assert set(fired) == set(deadlines)
+    assert len(wheel) == 0 and wheel.fired == len(deadlines)
+
+
+def test_timer_wheel_past_deadline_fires_immediately():
+    clock = FakeClock()
+    wheel = TimerWheel(tick=1.0, clock=clock)
+    fired = []
+    wheel.schedule("old", clock.now - 5, fired.append)
+    assert fired == ["old"] and len(wheel) == 0
@@ -0,0 +1,172 @@
+import asyncio
+import struct
+from pathlib import Path
+
+from solo_mcp.config import SoloConfig
+from solo_mcp.tools.context import ContextTool
+from solo_mcp.tools.index import IndexTool
+from solo_mcp.tools.memory import MemoryTool
+from solo_mcp.tools.vector import HashingEmbedder, VectorStore, get_embedder, write_npy
+
+
+def test_write_npy_header_and_mapped_reload(tmp_path: Path):
+    path = tmp_path / "m.npy"
+    write_npy(path, [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]], 2, 3)
+    data = path.read_bytes()
+    assert data[:8] == b"\x93NUMPY\x01\x00"
+    (header_len,) = struct.unpack("<H", data[8:10])
+    assert (10 + header_len) % 64 == 0
+    assert b"'shape': (2, 3)" in data[10 : 10 + header_len]
+    assert struct.unpack("<6f", data[10 + header_len :]) == (1, 2, 3, 4, 5, 6)
+
+
+def test_vector_store_search_remove_and_persist(tmp_path: Path):
+    embedder = HashingEmbedder(dim=64)
+    texts = {
+        "deploy": "deploy the staging cluster",
+        "parser": "parse tokens into a syntax tree",
+        "cache": "evict cache entries by priority",
+    }
+    path = tmp_path / "vectors.npy"
+    store = VectorStore(path, embedder.dim, embedder.name)
+    store.upsert(list(texts), embedder.encode(list(texts.values())), ["1", "1", "1"])
+
+    query = embedder.encode(["staging deploy"])[0]
+    hits = store.search(query, k=2)
+    assert hits[0][0] == "deploy"
+    assert 0.0 < hits[0][1] <= 1.0 + 1e-6
+    assert store.search(query, k=3, accept=lambda key: key != "deploy")[0][0] != "deploy"
+
+    store.remove("parser")
+    store.save()
+    store.close()
+
+    again = VectorStore(path, embedder.dim, embedder.name)
+    assert len(again) == 2 and "parser" not in again
+    assert again.tag("deploy") == "1"
+    assert again.search(query, k=1)[0][0] == "deploy"
+    # rows on disk and rows added after loading are searched together
+    again.upsert(["tree"], embedder.encode(["syntax tree walker"]))
+    tree_query = embedder.encode(["syntax tree"])[0]
+    assert again.search(tree_query, k=1)[0][0] == "tree"
+    again.close()
+
+    # a different model invalidates the stored vectors
+    assert len(VectorStore(path, embedder.dim, "other-model")) == 0
+
+
+def test_hashing_embedder_handles_chinese_text(tmp_path: Path):
+    embedder = HashingEmbedder(dim=64)
+    assert any(embedder.encode(["数据库连接池"])[0])
+
+    tool = MemoryTool(SoloConfig.load(root=tmp_path), enable_cache=False)
+    tool.store("数据库连接池的超时配置")
+    tool.store("前端按钮的样式调整")
+    hits = tool.load("数据库 超时", mode="vector", limit=1)
+    assert hits[0]["content"].startswith("数据库")
+    tool.close()
+
+
+def test_numpy_is_not_imported_with_the_tools():
+    import subprocess
+    import sys
+
+    code = (
+        "import solo_mcp.tools.index, solo_mcp.tools.memory, sys\n"
+        "from solo_mcp.tools.vector import _numpy\n"
+        "assert _numpy.cache_info().currsize == 0\n"
+        "assert 'numpy' not in sys.modules\n"
+    )
+    subprocess.run([sys.executable, "-c", code], check=True)
+
+
+def test_index_and_memory_vector_mode(tmp_path: Path):
+    for name, content in {
+        "deploy.py": "def deploy_staging():\n    run_cluster_rollout()\n",
+        "parser.py": "def parse_tokens(tokens):\n    return build_syntax_tree(tokens)\n",
+    }.items():
+        (tmp_path / name).write_text(content, encoding="utf-8")
+    config = SoloConfig.load(root=tmp_path)
+    assert isinstance(get_embedder(config), HashingEmbedder)
+
+    index = IndexTool(config)
+    res = asyncio.run(index.search("syntax tree parse", k=1, mode="vector"))
+    assert Path(res["hits"][0]["path"]).name == "parser.py"
+    assert index.get_stats()["vectors"] == 2
+    index.close()
+
+    tool = MemoryTool(config, enable_cache=False)
+    tool.store("rollout of the staging cluster", tags=["ops"])
+    tool.store("syntax tree for the token parser", memory_type="learning")
+    hits = tool.load("cluster rollout", mode="vector", limit=1)
+    assert hits[0]["content"].startswith("rollout")
+    hits = tool.load("cluster rollout", memory_type="learning", mode="vector")
+    assert [h["type"] for h in hits] == ["learning"]
+    # stored after the vector store exists: embedded on store
+    tool.store("rollback plan for the cluster")
+    assert tool.get_memory_stats()["vectors"]["count"] == 3
+    tool.close()
+
+
+def test_vector_search_survives_concurrent_rebuild(tmp_path: Path, monkeypatch):
+    import threading
+    import time
+
+    from solo_mcp.tools import index as index_module
+
+    for i in range(6):
+        (tmp_path / f"mod{i}.py").write_text(
+            f"def parse_tokens_{i}(tokens):\n    return build_syntax_tree(tokens)\n",
+            encoding="utf-8",
+        )
+    index = IndexTool(SoloConfig.load(root=tmp_path))
+    asyncio.run(index.build())
+
+    embedding = threading.Event()
+    read_head = index_module._read_head
+
+    def slow_read_head(path):
+        embedding.set()
+        time.sleep(0.2)
+        return read_head(path)
+
+    monkeypatch.setattr(index_module, "_read_head", slow_read_head)
+
+    async def scenario():
+        search = asyncio.create_task(index.search("syntax tree", k=10, mode="vector"))
+        while not embedding.is_set():
+            await asyncio.sleep(0.01)
+        # swap the index (and unmap the old file) while search awaits embeddings
+        (tmp_path / "mod0.py").unlink()
+        (tmp_path / "extra.py").write_text("def extra():\n    pass\n", encoding="utf-8")
+        await index.build(full=True)
+        return await search
+
+    res = asyncio.run(scenario())
+    names = {Path(h["path"]).name for h in res["hits"]}
+    assert names == {f"mod{i}.py" for i in range(1, 6)}
+    index.close()
+
+
+def test_context_collect_fuses_lexical_and_vector_hits(tmp_path: Path):
+    files = {
+        "deploy.py": "def deploy_staging():\n    run_cluster_rollout()\n",
+        "parser.py": "def parse_tokens(tokens):\n    return build_syntax_tree(tokens)\n",
+        "notes.md": "release checklist and rollout notes\n",
+    }
+    for name, content in files.items():
+        (tmp_path / name).write_text(content, encoding="utf-8")
+    tool = ContextTool(SoloConfig.load(root=tmp_path))
+
+    result = asyncio.run(tool.collect("cluster rollout", limit=1000))
+    paths = [Path(f["path"]).name for f in result["files"]]
+    assert paths[0] == "deploy.py"
+    assert set(result["files"][0]["sources"]) == {"bm25", "vector"}
+    assert "文件:" in result["content"] and 0 < result["tokens"] <= 1000
+
+    # the fused ranking is served from the cache until the index changes
+    asyncio.run(tool.collect("cluster rollout", limit=1000))
+    assert tool.get_collection_stats()["cache"]["hits"] == 1
+    tiny = asyncio.run(tool.collect("cluster rollout", limit=5))
+    assert tiny["files"] == [] and tiny["tokens"] == 0
+    tool.index.close()